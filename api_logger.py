@@ -5,218 +5,510 @@ Houdt alle API calls bij voor debugging en monitoring
 
 from flask import Flask, request, g
 from datetime import datetime
+import argparse
+import atexit
+import glob
+import gzip
 import json
+import math
 import logging
+import multiprocessing
+import os
+import queue
+import random
+import re
+import threading
 from functools import wraps
 import time
 from pathlib import Path
 
 class APILogger:
-    """Log alle API requests en responses"""
-    
-    def __init__(self, app=None, log_file="api_calls.log"):
+    """Log alle API requests en responses
+
+    Records are put on a bounded in-memory queue and written in batches by a
+    background thread, so the request thread never formats or writes log
+    lines. When the queue is full records are dropped and counted instead of
+    blocking the request.
+    """
+
+    def __init__(self, app=None, log_file="api_calls.log", issues_file="api_issues.log",
+                 queue_size=10000, batch_size=200, flush_interval=0.5,
+                 sample_rate=1.0, max_body_bytes=2048, log_bodies=True):
         self.log_file = log_file
-        self.setup_logger()
+        self.issues_file = issues_file
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sample_rate = sample_rate
+        self.max_body_bytes = max_body_bytes
+        self.log_bodies = log_bodies
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.sampled_out = 0
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._writer = None
+        self._pid = None
+        self._closed = False
+        atexit.register(self.close)
+
         if app:
             self.init_app(app)
-    
-    def setup_logger(self):
-        """Setup dedicated API logger"""
-        self.logger = logging.getLogger('api_logger')
-        self.logger.setLevel(logging.INFO)
-        
-        # File handler
-        handler = logging.FileHandler(self.log_file)
-        formatter = logging.Formatter(
-            '%(asctime)s - %(levelname)s - %(message)s'
-        )
-        handler.setFormatter(formatter)
-        self.logger.addHandler(handler)
-    
+
     def init_app(self, app):
         """Initialize Flask middleware"""
+        self.sample_rate = app.config.get('API_LOG_SAMPLE_RATE', self.sample_rate)
+        self.max_body_bytes = app.config.get('API_LOG_MAX_BODY_BYTES', self.max_body_bytes)
+        self.log_bodies = app.config.get('API_LOG_BODIES', self.log_bodies)
         app.before_request(self.before_request)
         app.after_request(self.after_request)
         app.teardown_request(self.teardown_request)
-    
+        app.extensions['api_logger'] = self
+
     def before_request(self):
-        """Log incoming request"""
+        """Collect incoming request data"""
         g.start_time = time.time()
-        
+
         # Skip health checks
         if request.path == '/api/health':
             return
-        
+
         log_data = {
             "timestamp": datetime.now().isoformat(),
             "method": request.method,
             "path": request.path,
             "endpoint": request.endpoint,
+            "route": request.url_rule.rule if request.url_rule else None,
             "ip": request.remote_addr,
             "user_agent": request.user_agent.string
         }
-        
-        # Log request body if JSON
-        if request.is_json:
-            log_data["request_body"] = request.get_json()
-        
+
         # Log query parameters
         if request.args:
-            log_data["query_params"] = dict(request.args)
-        
+            log_data["query_params"] = request.args.to_dict()
+
         g.request_log = log_data
-    
+
     def after_request(self, response):
-        """Log response"""
-        if hasattr(g, 'request_log'):
-            # Calculate request duration
-            duration = time.time() - g.start_time
-            
-            g.request_log["response"] = {
-                "status_code": response.status_code,
-                "duration_ms": round(duration * 1000, 2)
-            }
-            
-            # Log response body if JSON
-            if response.is_json:
-                try:
-                    g.request_log["response_body"] = response.get_json()
-                except:
-                    pass
-            
-            # Log the complete request/response
-            self.logger.info(json.dumps(g.request_log))
-            
-            # Check for potential issues
-            self._check_for_issues(g.request_log)
-        
+        """Queue the request/response record"""
+        log_data = g.get('request_log')
+        if log_data is None:
+            return response
+
+        duration_ms = round((time.time() - g.start_time) * 1000, 2)
+        status_code = response.status_code
+        log_data["response"] = {
+            "status_code": status_code,
+            "duration_ms": duration_ms
+        }
+
+        # Errors and slow requests are always kept, the rest is sampled
+        if status_code < 400 and duration_ms <= 1000 and self.sample_rate < 1.0:
+            if random.random() >= self.sample_rate:
+                with self._lock:
+                    self.sampled_out += 1
+                return response
+
+        if self.log_bodies:
+            if request.is_json:
+                log_data["request_body"] = self._truncate(request.get_data(cache=True))
+            if response.is_json and not response.is_streamed:
+                log_data["response_body"] = self._truncate(response.get_data())
+
+        self._enqueue("INFO", log_data)
         return response
-    
+
     def teardown_request(self, exception=None):
         """Log any exceptions"""
         if exception:
-            if hasattr(g, 'request_log'):
-                g.request_log["exception"] = str(exception)
-                self.logger.error(json.dumps(g.request_log))
-    
+            log_data = g.get('request_log')
+            if log_data is not None:
+                self._enqueue("ERROR", dict(log_data, exception=str(exception)))
+
+    def _truncate(self, body):
+        """Raw body text, cut off at max_body_bytes"""
+        if len(body) > self.max_body_bytes:
+            return body[:self.max_body_bytes].decode('utf-8', 'replace') + f"...[{len(body)} bytes]"
+        return body.decode('utf-8', 'replace')
+
+    def _enqueue(self, level, log_data):
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait((level, log_data))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return
+        with self._lock:
+            self.enqueued += 1
+
+    def _ensure_writer(self):
+        # Start the writer lazily, and again in forked worker processes
+        if self._pid == os.getpid() or self._closed:
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._queue = queue.Queue(maxsize=self.queue_size)
+                self._writer = threading.Thread(
+                    target=self._run, name="api-logger-writer", daemon=True
+                )
+                self._writer.start()
+
+    def _run(self):
+        """Background writer: drain the queue in batches"""
+        log_file = open(self.log_file, "a", encoding="utf-8")
+        issues_file = open(self.issues_file, "a", encoding="utf-8")
+        try:
+            while True:
+                try:
+                    batch = [self._queue.get(timeout=self.flush_interval)]
+                except queue.Empty:
+                    continue
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                stop = None in batch
+                records = [record for record in batch if record is not None]
+                lines, issues = [], []
+                for level, log_data in records:
+                    asctime = datetime.now().strftime('%Y-%m-%d %H:%M:%S,%f')[:-3]
+                    lines.append(f"{asctime} - {level} - {json.dumps(log_data, default=str)}\n")
+                    if "response" in log_data:
+                        issues.extend(self._check_for_issues(log_data))
+                log_file.writelines(lines)
+                log_file.flush()
+                if issues:
+                    issues_file.writelines(issues)
+                    issues_file.flush()
+                self.written += len(records)
+
+                for _ in batch:
+                    self._queue.task_done()
+                if stop:
+                    return
+        except Exception:
+            logging.getLogger('api_logger').exception("API log writer stopped")
+        finally:
+            log_file.close()
+            issues_file.close()
+
+    def flush(self, timeout=5.0):
+        """Wait until all queued records are written"""
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.01)
+
+    def close(self, timeout=5.0):
+        """Write the remaining records and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._writer and self._writer.is_alive() and self._pid == os.getpid():
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                return
+            self._writer.join(timeout)
+
+    def stats(self):
+        """Counters of the logging pipeline"""
+        return {
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "sampled_out": self.sampled_out,
+            "queued": self._queue.qsize(),
+        }
+
     def _check_for_issues(self, log_data):
         """Detecteer potentiële problemen"""
         issues = []
-        
+
         # Check for 404s (missing endpoints)
         if log_data["response"]["status_code"] == 404:
             issues.append(f"404 NOT FOUND: {log_data['method']} {log_data['path']}")
-        
+
         # Check for slow requests
         if log_data["response"]["duration_ms"] > 1000:
             issues.append(f"SLOW REQUEST: {log_data['path']} took {log_data['response']['duration_ms']}ms")
-        
+
         # Check for authentication failures
         if log_data["response"]["status_code"] == 401:
             issues.append(f"AUTH FAILURE: {log_data['path']}")
-        
-        # Log issues to separate file
-        if issues:
-            with open("api_issues.log", "a") as f:
-                for issue in issues:
-                    f.write(f"{datetime.now().isoformat()} - {issue}\n")
+
+        return [f"{datetime.now().isoformat()} - {issue}\n" for issue in issues]
 
 
 # Development helper: API Call Analyzer
+class LatencySketch:
+    """Mergeable latency histogram with logarithmic buckets.
+
+    Quantiles are accurate to ``relative_accuracy`` (1% by default) and the
+    memory use only depends on the range of the values, not their number.
+    Sketches of different files or processes are combined with ``merge``.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value):
+        self.count += 1
+        if value <= 0.001:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def merge(self, other):
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        return self
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+class EndpointStats:
+    """Streaming counters for one route"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = {}
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.sketch = LatencySketch()
+
+    def add(self, status_code, duration_ms):
+        self.count += 1
+        if status_code >= 400:
+            self.errors[status_code] = self.errors.get(status_code, 0) + 1
+        if duration_ms is not None:
+            self.total_ms += duration_ms
+            self.max_ms = max(self.max_ms, duration_ms)
+            self.sketch.add(duration_ms)
+
+    def merge(self, other):
+        self.count += other.count
+        for status_code, count in other.errors.items():
+            self.errors[status_code] = self.errors.get(status_code, 0) + count
+        self.total_ms += other.total_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+        self.sketch.merge(other.sketch)
+        return self
+
+    @property
+    def avg_ms(self):
+        return self.total_ms / self.sketch.count if self.sketch.count else 0.0
+
+
+_ID_SEGMENT = re.compile(
+    r"/(?:[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|\d+)(?=/|$)"
+)
+
+# 404 paths are not routes; cap them so a scan cannot grow memory unbounded
+_MAX_MISSING = 1000
+
+
+def route_template(entry):
+    """Route template of a log entry, e.g. ``GET /api/invoices/<id>``"""
+    route = entry.get("route")
+    if not route:
+        route = _ID_SEGMENT.sub("/<id>", entry.get("path", ""))
+    return f"{entry.get('method', '?')} {route}"
+
+
+def _open_log(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, "r", encoding="utf-8", errors="replace")
+
+
+def _analyze_file(args):
+    """Aggregate one log file; runs in a worker process"""
+    path, since, until = args
+    endpoints = {}
+    missing = set()
+    total = 0
+    skipped = 0
+
+    with _open_log(path) as f:
+        for line in f:
+            json_start = line.find('{')
+            if json_start < 0:
+                continue
+            try:
+                entry = json.loads(line[json_start:])
+            except ValueError:
+                skipped += 1
+                continue
+            response = entry.get("response")
+            if not response:
+                continue
+            if since or until:
+                # ISO timestamps compare correctly as strings
+                timestamp = entry.get("timestamp", "")
+                if (since and timestamp < since) or (until and timestamp >= until):
+                    continue
+
+            total += 1
+            status_code = response.get("status_code", 200)
+            key = route_template(entry)
+            stats = endpoints.get(key)
+            if stats is None:
+                stats = endpoints[key] = EndpointStats()
+            stats.add(status_code, response.get("duration_ms"))
+            # A 404 from a matched route is a missing record, not a missing endpoint
+            if status_code == 404 and not entry.get("route") and len(missing) < _MAX_MISSING:
+                missing.add(key)
+
+    return {"total": total, "skipped": skipped, "endpoints": endpoints, "missing": missing}
+
+
 class APICallAnalyzer:
-    """Analyseer API logs voor patronen en problemen"""
-    
-    def __init__(self, log_file="api_calls.log"):
+    """Analyseer API logs voor patronen en problemen
+
+    Log files are streamed line by line, so memory use is constant in the
+    size of the logs. Rotated files (``api_calls.log.1``, ``*.gz``) are read
+    as well and can be analyzed in parallel worker processes.
+    """
+
+    def __init__(self, log_file="api_calls.log", files=None, since=None, until=None,
+                 processes=None):
         self.log_file = log_file
-    
+        self.files = files
+        self.since = since
+        self.until = until
+        self.processes = processes
+
+    def log_files(self):
+        """The log file and its rotated siblings"""
+        if self.files:
+            paths = []
+            for pattern in self.files:
+                paths.extend(sorted(glob.glob(pattern)) or [pattern])
+        else:
+            paths = [self.log_file] + sorted(glob.glob(f"{glob.escape(self.log_file)}.*"))
+        return [path for path in paths if Path(path).is_file()]
+
+    def collect(self):
+        """Aggregate all log files, in parallel when there are several"""
+        since = self.since.isoformat() if isinstance(self.since, datetime) else self.since
+        until = self.until.isoformat() if isinstance(self.until, datetime) else self.until
+        jobs = [(path, since, until) for path in self.log_files()]
+        if not jobs:
+            return None
+
+        processes = self.processes if self.processes is not None else min(len(jobs), os.cpu_count() or 1)
+        if processes > 1 and len(jobs) > 1:
+            with multiprocessing.Pool(processes) as pool:
+                parts = pool.map(_analyze_file, jobs)
+        else:
+            parts = map(_analyze_file, jobs)
+
+        result = {"total": 0, "skipped": 0, "endpoints": {}, "missing": set()}
+        for part in parts:
+            result["total"] += part["total"]
+            result["skipped"] += part["skipped"]
+            for key, stats in part["endpoints"].items():
+                if key in result["endpoints"]:
+                    result["endpoints"][key].merge(stats)
+                else:
+                    result["endpoints"][key] = stats
+            result["missing"].update(part["missing"])
+        return result
+
     def analyze(self):
         """Analyseer API logs"""
-        if not Path(self.log_file).exists():
+        result = self.collect()
+        if result is None:
             print("No API logs found")
             return
-        
-        calls = []
-        errors = []
-        
-        with open(self.log_file, 'r') as f:
-            for line in f:
-                try:
-                    # Extract JSON from log line
-                    json_start = line.find('{')
-                    if json_start >= 0:
-                        log_entry = json.loads(line[json_start:])
-                        calls.append(log_entry)
-                        
-                        # Collect errors
-                        if log_entry.get("response", {}).get("status_code", 200) >= 400:
-                            errors.append(log_entry)
-                except:
-                    continue
-        
+
+        endpoints = result["endpoints"]
+        error_count = sum(sum(stats.errors.values()) for stats in endpoints.values())
+
         # Generate report
         report = []
         report.append(f"# API Call Analysis - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        
+
         # Statistics
         report.append(f"## Statistics")
-        report.append(f"- Total API calls: {len(calls)}")
-        report.append(f"- Errors (4xx/5xx): {len(errors)}")
-        
+        report.append(f"- Total API calls: {result['total']}")
+        report.append(f"- Errors (4xx/5xx): {error_count}")
+        if self.since or self.until:
+            report.append(f"- Window: {self.since or '...'} to {self.until or '...'}")
+
         # Endpoint usage
-        endpoint_counts = {}
-        for call in calls:
-            endpoint = f"{call['method']} {call['path']}"
-            endpoint_counts[endpoint] = endpoint_counts.get(endpoint, 0) + 1
-        
         report.append(f"\n## Most Used Endpoints")
-        for endpoint, count in sorted(endpoint_counts.items(), key=lambda x: x[1], reverse=True)[:10]:
-            report.append(f"- {endpoint}: {count} calls")
-        
+        for endpoint, stats in sorted(endpoints.items(), key=lambda x: x[1].count, reverse=True)[:10]:
+            report.append(f"- {endpoint}: {stats.count} calls")
+
         # Error summary
-        if errors:
+        if error_count:
             report.append(f"\n## Errors")
             error_summary = {}
-            for error in errors:
-                key = f"{error['response']['status_code']} - {error['method']} {error['path']}"
-                error_summary[key] = error_summary.get(key, 0) + 1
-            
+            for endpoint, stats in endpoints.items():
+                for status_code, count in stats.errors.items():
+                    error_summary[f"{status_code} - {endpoint}"] = count
+
             for error, count in sorted(error_summary.items(), key=lambda x: x[1], reverse=True):
                 report.append(f"- {error}: {count} times")
-        
+
         # Frontend/Backend mismatches
         report.append(f"\n## Potential Issues")
-        
+
         # Find 404s (endpoint mismatches)
-        not_found = [e for e in errors if e['response']['status_code'] == 404]
-        if not_found:
+        if result["missing"]:
             report.append(f"\n### Missing Endpoints (404s)")
-            unique_404s = set()
-            for e in not_found:
-                unique_404s.add(f"{e['method']} {e['path']}")
-            for endpoint in sorted(unique_404s):
+            for endpoint in sorted(result["missing"]):
                 report.append(f"- {endpoint}")
-        
-        # Average response times
+
+        # Response time percentiles
         report.append(f"\n## Performance")
-        endpoint_times = {}
-        for call in calls:
-            if 'response' in call and 'duration_ms' in call['response']:
-                endpoint = f"{call['method']} {call['path']}"
-                if endpoint not in endpoint_times:
-                    endpoint_times[endpoint] = []
-                endpoint_times[endpoint].append(call['response']['duration_ms'])
-        
-        slow_endpoints = []
-        for endpoint, times in endpoint_times.items():
-            avg_time = sum(times) / len(times)
-            if avg_time > 500:  # Slower than 500ms
-                slow_endpoints.append((endpoint, avg_time))
-        
+        report.append("\n| Endpoint | Calls | p50 ms | p95 ms | p99 ms | max ms |")
+        report.append("|---|---|---|---|---|---|")
+        for endpoint, stats in sorted(endpoints.items(), key=lambda x: x[1].sketch.quantile(0.95) or 0, reverse=True):
+            if not stats.sketch.count:
+                continue
+            p50, p95, p99 = (stats.sketch.quantile(q) for q in (0.5, 0.95, 0.99))
+            report.append(
+                f"| {endpoint} | {stats.count} | {p50:.0f} | {p95:.0f} | {p99:.0f} | {stats.max_ms:.0f} |"
+            )
+
+        slow_endpoints = [
+            (endpoint, stats.avg_ms) for endpoint, stats in endpoints.items()
+            if stats.avg_ms > 500  # Slower than 500ms
+        ]
+
         if slow_endpoints:
             report.append(f"\n### Slow Endpoints (>500ms average)")
             for endpoint, avg_time in sorted(slow_endpoints, key=lambda x: x[1], reverse=True):
                 report.append(f"- {endpoint}: {avg_time:.0f}ms average")
-        
+
         return "\n".join(report)
 
 
@@ -228,17 +520,32 @@ app = Flask(__name__)
 api_logger = APILogger(app)
 
 # Of voor meer controle:
-api_logger = APILogger(log_file="my_api_calls.log")
+api_logger = APILogger(log_file="my_api_calls.log", sample_rate=0.1, max_body_bytes=1024)
 api_logger.init_app(app)
+
+# Config keys (override the constructor arguments):
+#   API_LOG_SAMPLE_RATE, API_LOG_MAX_BODY_BYTES, API_LOG_BODIES
+# api_logger.stats() reports enqueued/written/dropped/sampled_out counters.
 """
 
 # Command line analyzer
 if __name__ == "__main__":
-    analyzer = APICallAnalyzer()
+    parser = argparse.ArgumentParser(description="Analyze API call logs")
+    parser.add_argument("files", nargs="*", help="log files or glob patterns (default: api_calls.log*)")
+    parser.add_argument("--since", help="ISO timestamp, inclusive")
+    parser.add_argument("--until", help="ISO timestamp, exclusive")
+    parser.add_argument("--processes", type=int, help="worker processes (default: one per file, up to CPU count)")
+    parser.add_argument("--output", default="api_analysis_report.md")
+    args = parser.parse_args()
+
+    analyzer = APICallAnalyzer(files=args.files or None, since=args.since, until=args.until,
+                               processes=args.processes)
     report = analyzer.analyze()
+    if report is None:
+        raise SystemExit(1)
     print(report)
-    
-    with open("api_analysis_report.md", "w") as f:
+
+    with open(args.output, "w") as f:
         f.write(report)
-    
-    print("\n📄 Report saved to api_analysis_report.md")
+
+    print(f"\n📄 Report saved to {args.output}")
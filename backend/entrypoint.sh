@@ -1,5 +1,10 @@
 #!/bin/sh
 set -e
 
+# Per-worker metric files, aggregated by /metrics; gunicorn.conf.py empties
+# the directory when the server starts
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus_multiproc}"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
 # Start Gunicorn with the correct application module
 exec gunicorn --bind 0.0.0.0:$PORT --workers 1 --threads 8 --timeout 0 "src.main:create_app()"
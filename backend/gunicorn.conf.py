@@ -0,0 +1,33 @@
+"""Gunicorn settings picked up automatically from the working directory."""
+import os
+import shutil
+
+
+def on_starting(server):
+    # Start every deploy with an empty directory of per-worker metric files
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    # Drop the live gauges of workers that exited from the /metrics output
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def post_worker_init(worker):
+    # Periodic jobs run in the workers; a lock per job picks one of them
+    from src.services import scheduler
+
+    scheduler.start()
+
+
+def worker_exit(server, worker):
+    # Write the last-login times the worker still holds in memory
+    from src.services import activity
+
+    activity.shutdown()
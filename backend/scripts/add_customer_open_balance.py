@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Add the customers.open_balance column to an existing database and fill it
+from the invoices. The column is added only when it is missing and the
+balances are set with the same reconciliation as ``flask reconcile_balances
+--fix``, so the script can be run again safely. Stop the app while it runs:
+invoices written between adding the column and filling it would be counted
+twice.
+Run this script inside the backend project directory:
+
+    python scripts/add_customer_open_balance.py
+"""
+
+import sys
+
+sys.path.insert(0, ".")
+
+import sqlalchemy as sa  # noqa: E402
+
+from src.main import create_app  # noqa: E402
+from src.models.database import db  # noqa: E402
+from src.services.ledger import reconcile  # noqa: E402
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        columns = {column["name"] for column in sa.inspect(db.engine).get_columns("customers")}
+        if "open_balance" not in columns:
+            with db.engine.begin() as connection:
+                connection.execute(sa.text(
+                    "ALTER TABLE customers ADD COLUMN open_balance NUMERIC(12, 2) NOT NULL DEFAULT 0"
+                ))
+            print("Added customers.open_balance")
+        drift = reconcile(fix=True)
+        print(f"Set the open balance of {len(drift)} customers")
+
+
+if __name__ == "__main__":
+    main()
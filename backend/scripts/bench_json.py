@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark serializing a 100-row customer page with Flask's default JSON
+provider (with the former per-field float/isoformat conversions) against
+the FastJSONProvider. Run this script inside the backend project directory:
+
+    python scripts/bench_json.py [pages]
+"""
+
+import sys
+import timeit
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, ".")
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+from src.services.json_provider import FastJSONProvider, orjson  # noqa: E402
+
+
+def customer_rows(count=100):
+    created = datetime(2024, 1, 1, 8, 0, 0, 123456)
+    return [
+        {
+            "id": uuid.uuid4(),
+            "company_name": f"Klant {i} B.V.",
+            "contact_person": "Jan Jansen",
+            "email": f"info{i}@klant.nl",
+            "phone": "+31 20 123 4567",
+            "mobile": None,
+            "address": f"Dorpsstraat {i}",
+            "postal_code": "1234 AB",
+            "city": "Amsterdam",
+            "country": "Nederland",
+            "vat_number": "NL123456789B01",
+            "payment_terms": 30,
+            "credit_limit": Decimal("2500.00") + i,
+            "notes": None,
+            "is_active": True,
+            "created_at": created + timedelta(minutes=i),
+            "location_count": i % 4,
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_page(rows):
+    """The conversions the to_dict() methods did before handing off to jsonify."""
+    return {
+        "customers": [
+            dict(
+                row,
+                id=str(row["id"]),
+                credit_limit=float(row["credit_limit"]) if row["credit_limit"] else None,
+                created_at=row["created_at"].isoformat(),
+            )
+            for row in rows
+        ],
+        "pagination": {"page": 1, "pages": 10, "per_page": 100, "total": 1000},
+    }
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    rows = customer_rows()
+    app = Flask(__name__)
+    default_provider = DefaultJSONProvider(app)
+    fast_provider = FastJSONProvider(app)
+    page = {"customers": rows, "pagination": {"page": 1, "pages": 10, "per_page": 100, "total": 1000}}
+
+    cases = [
+        ("default provider + per-field conversion", lambda: default_provider.response(legacy_page(rows))),
+        ("FastJSONProvider, model values", lambda: fast_provider.response(page)),
+    ]
+    with app.app_context():
+        print(f"{count} pages of 100 customers, best of 5 runs ({'orjson' if orjson else 'stdlib json'})")
+        for label, run in cases:
+            best = min(timeit.repeat(run, number=count, repeat=5))
+            print(f"- {label}: {best / count * 1e6:.0f} µs/page, {count / best:.0f} pages/s")
+
+
+if __name__ == "__main__":
+    main()
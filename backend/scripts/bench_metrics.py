@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Measure the per-request overhead of the metrics hooks.
+Run this script inside the backend project directory:
+
+    python scripts/bench_metrics.py [requests]
+
+Set PROMETHEUS_MULTIPROC_DIR to a scratch directory to measure the
+multiprocess (gunicorn) mode.
+"""
+
+import sys
+import timeit
+
+sys.path.insert(0, ".")
+
+from src.services import metrics  # noqa: E402
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    from flask import Flask, Response
+
+    app = Flask(__name__)
+    app.add_url_rule("/api/customers/", "customers.get_customers", lambda: "")
+    response = Response(status=200)
+
+    def one_request():
+        metrics._before_request()
+        for _ in range(5):
+            metrics._before_cursor_execute(None, None, None, None, None, False)
+            metrics._after_cursor_execute(None, None, None, None, None, False)
+        metrics._after_request(response)
+
+    with app.test_request_context("/api/customers/"):
+        runs = 5
+        best = min(timeit.repeat(one_request, number=count, repeat=runs))
+    print(f"{count} requests with 5 queries each, best of {runs} runs")
+    print(f"- metrics overhead per request: {best / count * 1e6:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark password verification under concurrent logins: 8 request threads
+verify passwords while another thread runs a small pure-Python task,
+standing in for the other requests served by the same worker. Reports the
+login throughput and how much the bystander task slows down.
+Run this script inside the backend project directory:
+
+    python scripts/bench_passwords.py [logins]
+"""
+
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, ".")
+
+from flask import Flask  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from src.services import passwords  # noqa: E402
+
+THREADS = 8
+
+
+def bystander(stop, samples):
+    """Time a ~1 ms pure-Python task over and over until stopped."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        sum(i * i for i in range(20_000))
+        samples.append(time.perf_counter() - start)
+
+
+def run(label, config, logins, legacy_hash=None):
+    app = Flask(__name__)
+    app.config.update(config)
+    passwords.init_app(app)
+    password_hash = legacy_hash or passwords.hash_password("correct horse")
+    passwords.verify_password(password_hash, "correct horse")  # start the pool
+
+    baseline = []
+    stop = threading.Event()
+    thread = threading.Thread(target=bystander, args=(stop, baseline))
+    thread.start()
+    time.sleep(0.5)
+    stop.set()
+    thread.join()
+
+    samples = []
+    stop = threading.Event()
+    thread = threading.Thread(target=bystander, args=(stop, samples))
+    thread.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(THREADS) as executor:
+        results = list(executor.map(lambda _: passwords.verify_password(password_hash, "correct horse"), range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    thread.join()
+    assert all(results)
+
+    print(
+        f"- {label:<34} {logins / elapsed:7.1f} logins/s, "
+        f"bystander {statistics.median(samples) * 1000:.2f} ms (alone {statistics.median(baseline) * 1000:.2f} ms)"
+    )
+    passwords.shutdown()
+
+
+def main():
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"{logins} logins on {THREADS} threads")
+    run("werkzeug scrypt, inline", {"PASSWORD_HASH_WORKERS": 0}, logins, generate_password_hash("correct horse"))
+    for workers in (0, 4):
+        where = f"pool of {workers}" if workers else "inline"
+        run(f"bcrypt 12 rounds, {where}", {"PASSWORD_HASHER": "bcrypt", "PASSWORD_HASH_WORKERS": workers}, logins)
+        if passwords.argon2 is not None:
+            run(f"argon2id 19 MiB t=2, {where}", {"PASSWORD_HASHER": "argon2id", "PASSWORD_HASH_WORKERS": workers}, logins)
+    if passwords.argon2 is None:
+        print("(argon2-cffi is not installed; pip install argon2-cffi to include argon2id)")
+
+
+if __name__ == "__main__":
+    main()
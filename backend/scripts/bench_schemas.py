@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark dumping a 100-row customer page with the module-level list schema
+against the hand-written to_dict() path and a schema built per request.
+Run this script inside the backend project directory:
+
+    python scripts/bench_schemas.py [pages]
+"""
+
+import sys
+import timeit
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+sys.path.insert(0, ".")
+
+from src.models.database import Article, ArticleCategory, Customer  # noqa: E402
+from src.schemas import (  # noqa: E402
+    ARTICLE_LIST_FIELDS,
+    CUSTOMER_LIST_FIELDS,
+    ArticleSchema,
+    CustomerSchema,
+    article_list_schema,
+    customer_list_schema,
+)
+
+
+def customers(count=100):
+    rows = []
+    for i in range(count):
+        customer = Customer(
+            id=uuid.uuid4(),
+            company_name=f"Klant {i} B.V.",
+            contact_person="Jan Jansen",
+            email=f"info{i}@klant.nl",
+            city="Amsterdam",
+            country="Nederland",
+            payment_terms=30,
+            credit_limit=Decimal("2500.00"),
+            is_active=True,
+            created_at=datetime(2024, 1, 1, 8, 0),
+        )
+        # Loaded by the list query with undefer()
+        customer.location_count = i % 4
+        rows.append(customer)
+    return rows
+
+
+def articles(count=100):
+    category = ArticleCategory(id=uuid.uuid4(), name="Leidingwerk")
+    return [
+        Article(
+            id=uuid.uuid4(),
+            code=f"A-{i:04d}",
+            name=f"Artikel {i}",
+            unit="stuks",
+            selling_price=Decimal("12.50"),
+            vat_rate=Decimal("21.00"),
+            stock_quantity=Decimal("4"),
+            min_stock_level=Decimal("10"),
+            is_active=True,
+            category=category,
+            category_id=category.id,
+            created_at=datetime(2024, 1, 1, 8, 0),
+        )
+        for i in range(count)
+    ]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    pages = {"customers": customers(), "articles": articles()}
+    cases = {
+        "customers": [
+            ("to_dict()", lambda rows: [row.to_dict() for row in rows]),
+            ("CustomerSchema built per request", lambda rows: CustomerSchema(many=True, only=CUSTOMER_LIST_FIELDS).dump(rows)),
+            ("customer_list_schema", customer_list_schema.dump),
+        ],
+        "articles": [
+            ("to_dict()", lambda rows: [row.to_dict() for row in rows]),
+            ("ArticleSchema built per request", lambda rows: ArticleSchema(many=True, only=ARTICLE_LIST_FIELDS).dump(rows)),
+            ("article_list_schema", article_list_schema.dump),
+        ],
+    }
+
+    print(f"{count} pages of 100 rows, best of 5 runs")
+    for name, variants in cases.items():
+        rows = pages[name]
+        for label, dump in variants:
+            best = min(timeit.repeat(lambda: dump(rows), number=count, repeat=5))
+            print(f"- {name}, {label}: {best / count * 1e6:.0f} µs/page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark inserting invoice lines with random (version 4) and time-ordered
+(version 7) primary keys. Each run fills a copy of the invoice_items table
+(same columns and indexes, without the foreign keys) in batches and prints
+the insert rate per slice of the run, so a rate that drops as the table
+outgrows the cache shows up, followed by the size of the primary key index
+where the database can report it.
+
+By default it runs against a temporary SQLite file. Set DATABASE_URL to run
+it against PostgreSQL; the interesting numbers come from a table larger than
+shared_buffers, e.g. the default of 10 million rows:
+
+    DATABASE_URL=postgresql://... python scripts/bench_uuid_inserts.py [rows]
+
+Run this script inside the backend project directory.
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from decimal import Decimal
+
+sys.path.insert(0, ".")
+
+import sqlalchemy as sa  # noqa: E402
+
+from src.models.database import InvoiceItem, uuid7  # noqa: E402
+
+BATCH = 10_000
+SLICES = 10
+
+
+def lines_table(metadata, name):
+    """invoice_items without its foreign keys."""
+    columns = [
+        sa.Column(column.name, column.type, primary_key=column.primary_key, nullable=column.nullable)
+        for column in InvoiceItem.__table__.columns
+    ]
+    table = sa.Table(name, metadata, *columns)
+    sa.Index(f"ix_{name}_invoice_id", table.c.invoice_id)
+    return table
+
+
+def batches(make_id, rows):
+    invoice_id = make_id()
+    for start in range(0, rows, BATCH):
+        batch = []
+        for i in range(start, min(start + BATCH, rows)):
+            # About eight lines per invoice, like the real data
+            if i % 8 == 0:
+                invoice_id = make_id()
+            price = Decimal(random.randint(100, 99_999)) / 100
+            batch.append({
+                "id": make_id(),
+                "invoice_id": invoice_id,
+                "description": "Montage cv-ketel",
+                "quantity": Decimal(1),
+                "unit_price": price,
+                "vat_rate": Decimal(21),
+                "line_total": price,
+                "sort_order": i % 8,
+            })
+        yield batch
+
+
+def index_size(connection, table):
+    if connection.dialect.name != "postgresql":
+        return None
+    return connection.execute(sa.text("SELECT pg_relation_size(CAST(:index AS regclass))"), {"index": f"{table.name}_pkey"}).scalar()
+
+
+def run(engine, label, make_id, rows):
+    metadata = sa.MetaData()
+    table = lines_table(metadata, f"bench_lines_{label}")
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+
+    insert = table.insert()
+    slice_rows = max(rows // SLICES, BATCH)
+    rates = []
+    done = 0
+    start = slice_start = time.perf_counter()
+    for batch in batches(make_id, rows):
+        with engine.begin() as connection:
+            connection.execute(insert, batch)
+        done += len(batch)
+        if done % slice_rows == 0 or done == rows:
+            now = time.perf_counter()
+            rates.append(f"{slice_rows / (now - slice_start):,.0f}")
+            slice_start = now
+    elapsed = time.perf_counter() - start
+
+    with engine.connect() as connection:
+        size = index_size(connection, table)
+    print(f"- {label}: {rows / elapsed:,.0f} rows/s overall, {elapsed:.1f} s")
+    print(f"  rows/s per {slice_rows:,} rows: {' '.join(rates)}")
+    if size is not None:
+        print(f"  primary key index: {size / 2**20:,.0f} MiB")
+    metadata.drop_all(engine)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    url = os.getenv("DATABASE_URL")
+    if url:
+        engine = sa.create_engine(url)
+    else:
+        directory = tempfile.mkdtemp()
+        engine = sa.create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+    print(f"{rows:,} invoice lines on {engine.dialect.name}, batches of {BATCH:,}")
+    run(engine, "uuid4", uuid.uuid4, rows)
+    run(engine, "uuid7", uuid7, rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark the shared VAT kernel against the per-line Decimal loops it replaced.
+Run this script inside the backend project directory:
+
+    python scripts/bench_vat_totals.py [lines]
+"""
+
+import random
+import sys
+import timeit
+from decimal import Decimal
+
+sys.path.insert(0, ".")
+
+import numpy as np  # noqa: E402
+
+from src.services.vat import compute_totals, compute_totals_cents  # noqa: E402
+
+
+def legacy_quote_totals(lines):
+    """The loop formerly in calculate_quote_totals/calculate_work_order_totals."""
+    subtotal = Decimal("0")
+    vat_amount = Decimal("0")
+    for quantity, unit_price, vat_rate in lines:
+        line_total = quantity * unit_price
+        line_subtotal = line_total / (1 + vat_rate / 100)
+        subtotal += line_subtotal
+        vat_amount += line_total - line_subtotal
+    return subtotal, vat_amount
+
+
+def legacy_invoice_totals(lines):
+    """The loop formerly in create_invoice/update_invoice."""
+    subtotal = Decimal("0")
+    vat_amount = Decimal("0")
+    for quantity, unit_price, vat_rate in lines:
+        line_total = quantity * unit_price
+        subtotal += line_total
+        vat_amount += line_total * (vat_rate / 100)
+    return subtotal, vat_amount
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    rng = random.Random(42)
+    lines = [
+        (
+            Decimal(rng.randint(1, 400)) / 4,
+            Decimal(rng.randint(1, 100_000)) / 100,
+            Decimal(rng.choice([0, 9, 21])),
+        )
+        for _ in range(count)
+    ]
+    quantities, prices, rates = (list(column) for column in zip(*lines))
+    quantity_h, price_c, rate_h = (
+        np.array([int(value * 100) for value in column], dtype=np.int64)
+        for column in (quantities, prices, rates)
+    )
+
+    runs = 20
+    cases = [
+        ("legacy quote/work order loop", lambda: legacy_quote_totals(lines)),
+        ("kernel on cent arrays, incl. VAT", lambda: compute_totals_cents(quantity_h, price_c, rate_h, True)),
+        ("kernel from Decimals, incl. VAT", lambda: compute_totals(quantities, prices, rates, True)),
+        ("legacy invoice loop", lambda: legacy_invoice_totals(lines)),
+        ("kernel on cent arrays, excl. VAT", lambda: compute_totals_cents(quantity_h, price_c, rate_h)),
+        ("kernel from Decimals, excl. VAT", lambda: compute_totals(quantities, prices, rates)),
+    ]
+    print(f"{count} lines, best of {runs} runs")
+    for name, fn in cases:
+        best = min(timeit.repeat(fn, number=1, repeat=runs))
+        print(f"- {name:34s} {best * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Convert the ids of a SQLite database from 36-character text to 16-byte blobs,
+the representation GUID columns use on SQLite. Rows that are already
+converted are left alone, so the script can be run again safely. It keeps a
+copy of the database next to it (<name>.bak) and compacts the file
+afterwards. Stop the app while it runs.
+
+The declared column types stay CHAR(36); SQLite stores blobs in such columns
+unchanged, so only the values and indexes shrink.
+Run this script inside the backend project directory:
+
+    python scripts/migrate_sqlite_guids.py [path/to/app.db]
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import uuid
+
+sys.path.insert(0, ".")
+
+from src.main import create_app  # noqa: E402
+from src.models.database import GUID, db  # noqa: E402
+
+
+def guid_columns():
+    for table in db.metadata.sorted_tables:
+        for column in table.columns:
+            if isinstance(column.type, GUID):
+                yield table.name, column.name
+
+
+def to_blob(value):
+    return uuid.UUID(value).bytes
+
+
+def text_ids(connection):
+    """Columns still holding text ids, as (table, column) pairs."""
+    existing = {name for (name,) in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    return [
+        (table, column)
+        for table, column in guid_columns()
+        if table in existing
+        and connection.execute(f'SELECT 1 FROM "{table}" WHERE typeof("{column}") = \'text\' LIMIT 1').fetchone()
+    ]
+
+
+def migrate(path):
+    connection = sqlite3.connect(path, isolation_level=None)
+    columns = text_ids(connection)
+    if not columns:
+        print("All ids are stored as blobs already.")
+        connection.close()
+        return
+
+    backup = f"{path}.bak"
+    shutil.copy2(path, backup)
+    print(f"Copied {path} to {backup}")
+    connection.create_function("guid_blob", 1, to_blob, deterministic=True)
+    before = os.path.getsize(path)
+    # Parents and children are converted in one transaction, so the
+    # references match again when it commits
+    connection.execute("PRAGMA foreign_keys = OFF")
+    connection.execute("BEGIN")
+    try:
+        for table, column in columns:
+            converted = connection.execute(
+                f'UPDATE "{table}" SET "{column}" = guid_blob("{column}") WHERE typeof("{column}") = \'text\''
+            ).rowcount
+            print(f"- {table}.{column}: {converted} rows")
+        connection.execute("COMMIT")
+    except Exception:
+        connection.execute("ROLLBACK")
+        raise
+    connection.execute("VACUUM")
+    connection.close()
+    print(f"Database size {before / 2**20:.1f} MiB -> {os.path.getsize(path) / 2**20:.1f} MiB")
+
+
+def main():
+    if len(sys.argv) > 1:
+        path = sys.argv[1]
+    else:
+        app = create_app()
+        with app.app_context():
+            url = db.engine.url
+        if url.get_backend_name() != "sqlite":
+            print("The app is not configured for SQLite; nothing to convert.")
+            sys.exit(1)
+        path = url.database
+    if not path or not os.path.exists(path):
+        print(f"Database file not found: {path}")
+        sys.exit(1)
+    migrate(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Report bytes on the wire for a 100-row customer page: uncompressed, gzip,
+brotli (when installed) and with a sparse fieldset. Uses an in-memory
+SQLite database with generated customers.
+Run this script inside the backend project directory:
+
+    python scripts/report_payload_sizes.py
+"""
+
+import random
+import sys
+
+sys.path.insert(0, ".")
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+
+from src.main import create_app  # noqa: E402
+from src.models.database import Company, Customer, Location, User, db  # noqa: E402
+from src.services import compression  # noqa: E402
+
+CITIES = ["Amsterdam", "Rotterdam", "Utrecht", "Eindhoven", "Groningen", "Zwolle"]
+NOTES = [
+    "Onderhoudscontract CV-ketel, jaarlijkse beurt in oktober.",
+    "Sleutel ligt bij de buren op nummer 12. Hond aanwezig.",
+    "Factuur per e-mail naar de administratie, t.a.v. crediteuren.",
+    "Parkeren achter het pand, toegang via de laadperron.",
+]
+
+
+def seed():
+    rng = random.Random(7)
+    company = Company(name="Demo Installatiebedrijf B.V.")
+    db.session.add(company)
+    db.session.flush()
+    user = User(company_id=company.id, username="admin", email="admin@demo.nl", first_name="Admin", last_name="User", role="admin")
+    user.set_password("admin123")
+    db.session.add(user)
+    for i in range(100):
+        customer = Customer(
+            company_id=company.id,
+            company_name=f"Klant {i:03d} B.V.",
+            contact_person="Jan Jansen",
+            email=f"info@klant{i:03d}.nl",
+            phone="+31 20 123 4567",
+            address=f"Dorpsstraat {i}",
+            postal_code="1234 AB",
+            city=rng.choice(CITIES),
+            vat_number="NL123456789B01",
+            notes=" ".join(rng.sample(NOTES, 3)),
+        )
+        db.session.add(customer)
+        db.session.flush()
+        db.session.add(Location(
+            customer_id=customer.id, name="Hoofdlocatie", address=f"Dorpsstraat {i}",
+            access_instructions=rng.choice(NOTES),
+        ))
+    db.session.commit()
+    return create_access_token(identity=user.id, additional_claims={"company_id": str(company.id)})
+
+
+def main():
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        "SECRET_KEY": "payload-size-report-secret-key-0001",
+        "JWT_SECRET_KEY": "payload-size-report-jwt-secret-0001",
+    })
+    with app.app_context():
+        db.create_all()
+        token = seed()
+        client = app.test_client()
+
+        cases = [("full page", "/api/customers/?per_page=100")]
+        cases.append(("?fields=id,company_name,city", "/api/customers/?per_page=100&fields=id,company_name,city"))
+        encodings = ["identity", "gzip"] + (["br"] if compression.brotli else [])
+
+        print("Customer list, 100 rows, bytes on the wire")
+        for label, url in cases:
+            sizes = []
+            for encoding in encodings:
+                response = client.get(url, headers={"Authorization": f"Bearer {token}", "Accept-Encoding": encoding})
+                sizes.append(f"{encoding} {len(response.data):>6}")
+            print(f"- {label:<30} " + "  ".join(sizes))
+        if not compression.brotli:
+            print("(brotli is not installed; pip install brotli to report it)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Report what a fresh worker costs: the time to import the app and run
+create_app(), its resident memory afterwards, and which of the heavy optional
+libraries it loaded. A second line shows the same worker after the excel and
+documents modules pulled in pandas and the Google client. Each measurement
+runs in its own interpreter; the median of several runs is printed.
+Run this script inside the backend project directory:
+
+    python scripts/report_worker_rss.py [runs]
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+
+HEAVY = ("pandas", "numpy", "googleapiclient", "google.oauth2")
+
+WORKER = """
+import json, resource, sys, time
+start = time.perf_counter()
+from src.main import create_app
+create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": "sqlite://",
+            "SECRET_KEY": "x" * 32, "JWT_SECRET_KEY": "x" * 32})
+elapsed = time.perf_counter() - start
+if %(touch)r:
+    import pandas, googleapiclient.discovery, google.oauth2.credentials
+rss = None
+try:
+    with open("/proc/self/status") as status:
+        rss = next(int(line.split()[1]) for line in status if line.startswith("VmRSS:"))
+except OSError:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"seconds": elapsed, "rss_kb": rss,
+                  "loaded": [name for name in %(heavy)r if name in sys.modules]}))
+"""
+
+
+def measure(touch, runs):
+    results = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", WORKER % {"touch": touch, "heavy": HEAVY}],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return (
+        statistics.median(result["seconds"] for result in results),
+        statistics.median(result["rss_kb"] for result in results),
+        results[-1]["loaded"],
+    )
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for label, touch in (("after create_app()", False), ("after excel/documents", True)):
+        seconds, rss_kb, loaded = measure(touch, runs)
+        print(f"- {label:<22} startup {seconds * 1000:5.0f} ms, RSS {rss_kb / 1024:5.1f} MiB, loaded: {', '.join(loaded) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
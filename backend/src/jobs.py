@@ -0,0 +1,104 @@
+"""Periodic jobs, run by the scheduler in one worker at a time.
+
+See ``src/services/scheduler.py`` for how jobs are scheduled and locked.
+A job returns a small JSON-serializable summary, stored in its run history.
+"""
+import logging
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from flask import current_app
+from sqlalchemy import text
+
+from src.models.database import db
+from src.services.billing import mark_overdue_invoices
+from src.services.ledger import reconcile
+from src.services.scheduler import job
+
+logger = logging.getLogger(__name__)
+
+
+@job("mark_overdue_invoices", cron="10 * * * *", jitter=120)
+def mark_overdue():
+    """Mark sent invoices past their due date as overdue.
+
+    Hourly, so a failed run is retried the same day; runs without work only
+    touch the small partial index of sent invoices.
+    """
+    counts = mark_overdue_invoices()
+    by_company = {str(company_id): count for company_id, count in counts.items()}
+    for company_id, count in by_company.items():
+        logger.info("Marked %d invoices overdue for company %s", count, company_id)
+    return {"invoices": sum(by_company.values()), "companies": by_company}
+
+
+@job("reconcile_balances", cron="0 4 * * *", jitter=600)
+def reconcile_balances():
+    """Check the customers' open balances against their invoices.
+
+    Only reports drift, which points at a write path bypassing the ledger;
+    ``flask reconcile_balances --fix`` corrects it.
+    """
+    drift = reconcile()
+    for row in drift:
+        logger.warning(
+            "Open balance of customer %s is %s, its invoices add up to %s",
+            row["customer_id"], row["open_balance"], row["expected"],
+        )
+    return {"customers": len(drift), "drift": str(sum((row["difference"] for row in drift), Decimal("0")))}
+
+
+@job("refresh_statistics", cron="30 3 * * *", jitter=600)
+def refresh_statistics():
+    """Refresh the query planner statistics.
+
+    Billing runs insert and update many rows at once, after which the
+    planner's row estimates lag behind until autovacuum catches up.
+    """
+    dialect = db.engine.dialect.name
+    if dialect == "postgresql":
+        # ANALYZE cannot run inside a transaction block
+        with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text("ANALYZE"))
+    elif dialect == "sqlite":
+        db.session.execute(text("PRAGMA optimize"))
+        db.session.commit()
+    return {"dialect": dialect}
+
+
+@job("cleanup_drive_copies", every=3600, jitter=300)
+def cleanup_drive_copies():
+    """Delete Google Docs copies left behind by document generation.
+
+    ``generate_document`` copies a template for every document and keeps the
+    copy for ``/api/documents/download``. Copies older than
+    ``DRIVE_COPY_RETENTION_HOURS`` (default 24) are deleted; only files named
+    like such a copy are touched, never the templates.
+    """
+    from src.routes.documents import DOCUMENT_COPY_NAME, get_google_drive_service
+
+    service = get_google_drive_service()
+    if service is None:
+        return {"deleted": 0, "skipped": "no Google credentials"}
+
+    hours = current_app.config.get("DRIVE_COPY_RETENTION_HOURS", 24)
+    cutoff = (datetime.utcnow() - timedelta(hours=hours)).strftime("%Y-%m-%dT%H:%M:%S")
+    query = (
+        "mimeType = 'application/vnd.google-apps.document' and trashed = false "
+        f"and 'me' in owners and createdTime < '{cutoff}'"
+    )
+    deleted = 0
+    page_token = None
+    while True:
+        page = (
+            service.files()
+            .list(q=query, fields="nextPageToken, files(id, name)", pageSize=100, pageToken=page_token)
+            .execute()
+        )
+        for document in page.get("files", []):
+            if DOCUMENT_COPY_NAME.match(document["name"]):
+                service.files().delete(fileId=document["id"]).execute()
+                deleted += 1
+        page_token = page.get("nextPageToken")
+        if not page_token:
+            return {"deleted": deleted}
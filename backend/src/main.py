@@ -8,8 +8,15 @@ load_dotenv(find_dotenv())
 from flask import Flask, send_from_directory, jsonify
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
+import sqlalchemy as sa
 
 from src.models.database import db
+from src.services import (
+    activity, cache, compression, http_cache, invalidation, ledger, metrics, passwords, scheduler,
+    sql_profiler,
+)
+from src.services.json_provider import FastJSONProvider
+import src.jobs  # noqa: F401 - registers the periodic jobs
 from src.routes.auth import auth_bp
 from src.routes.companies import companies_bp
 from src.routes.customers import customers_bp
@@ -26,6 +33,7 @@ def create_app(config_override=None):
     app = Flask(
         __name__, static_folder=os.path.join(os.path.dirname(__file__), 'static')
     )
+    app.json = FastJSONProvider(app)
 
     # Default configuration
     app.config.from_mapping(
@@ -33,6 +41,9 @@ def create_app(config_override=None):
         JWT_SECRET_KEY=os.getenv('JWT_SECRET_KEY'),
         JWT_ACCESS_TOKEN_EXPIRES=timedelta(hours=24),
         SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        SQL_PROFILER=os.getenv('SQL_PROFILER', '').lower() in ('1', 'true', 'yes'),
+        CACHE_REDIS_URL=os.getenv('CACHE_REDIS_URL'),
+        PASSWORD_HASHER=os.getenv('PASSWORD_HASHER', 'argon2id'),
     )
 
     if config_override:
@@ -63,6 +74,11 @@ def create_app(config_override=None):
             app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
             print("CRITICAL WARNING: One or more PG... variables not found. Falling back to SQLite.")
 
+    if os.getenv('SCHEDULER_ENABLED'):
+        app.config['SCHEDULER_ENABLED'] = os.getenv('SCHEDULER_ENABLED').lower() in ('1', 'true', 'yes')
+    if os.getenv('PASSWORD_HASH_WORKERS'):
+        app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS'))
+
     # Initialize extensions
     CORS(
         app,
@@ -82,6 +98,16 @@ def create_app(config_override=None):
         return jsonify({'error': reason}), 401
 
     db.init_app(app)
+    compression.init_app(app)
+    metrics.init_app(app, db)
+    sql_profiler.init_app(app, db)
+    http_cache.init_app(app)
+    cache.init_app(app)
+    invalidation.init_app(app)
+    passwords.init_app(app)
+    activity.init_app(app)
+    ledger.init_app(app)
+    scheduler.init_app(app)
 
     # Register API blueprints
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -98,6 +124,15 @@ def create_app(config_override=None):
         if not app.config.get('TESTING'):
             db.create_all()
             print("Database tables checked/created. Automatic seeding is disabled.")
+            if db.engine.dialect.name == 'sqlite' and db.session.execute(
+                sa.text("SELECT 1 FROM companies WHERE typeof(id) = 'text' LIMIT 1")
+            ).first():
+                print("WARNING: this SQLite database stores ids as text; "
+                      "convert it with scripts/migrate_sqlite_guids.py")
+            if 'open_balance' not in {column['name'] for column in sa.inspect(db.engine).get_columns('customers')}:
+                print("WARNING: customers.open_balance is missing; "
+                      "add it with scripts/add_customer_open_balance.py")
+            db.session.remove()
 
     # Health check
     @app.route('/health')
@@ -1,44 +1,109 @@
 from flask_sqlalchemy import SQLAlchemy
 from .scoped_query import ScopedQuery
+from src.services.passwords import hash_password, verify_password
 from datetime import datetime, date
+import os
+import sqlite3
+import threading
+import time
 import uuid
 from sqlalchemy.types import TypeDecorator, CHAR
 import sqlalchemy as sa
-from werkzeug.security import generate_password_hash, check_password_hash
 
 db = SQLAlchemy(query_class=ScopedQuery)
 
 
+@sa.event.listens_for(sa.engine.Engine, "connect")
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite ignores foreign keys unless enabled per connection; the models
+    # rely on their ON DELETE actions (see passive_deletes below)
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys = ON")
+        cursor.close()
+
+
 class GUID(TypeDecorator):
-    """Platform-independent GUID type."""
+    """Platform-independent GUID type.
+
+    Native ``UUID`` on PostgreSQL, a 16-byte ``BLOB`` on SQLite and
+    ``CHAR(36)`` elsewhere. On SQLite, text values written by older versions
+    still load, so a database keeps working until it is converted with
+    ``scripts/migrate_sqlite_guids.py``; queries only match rows that have
+    been converted, though.
+    """
     impl = CHAR
     cache_ok = True
 
     def load_dialect_impl(self, dialect):
         if dialect.name == "postgresql":
             return dialect.type_descriptor(sa.dialects.postgresql.UUID())
-        else:
-            return dialect.type_descriptor(CHAR(36))
+        if dialect.name == "sqlite":
+            return dialect.type_descriptor(sa.LargeBinary(16))
+        return dialect.type_descriptor(CHAR(36))
 
     def process_bind_param(self, value, dialect):
         if value is None:
             return None
-        if not isinstance(value, uuid.UUID):
-            return str(uuid.UUID(value))
+        # Ids are nearly always UUID instances already: skip the re-parse
+        if value.__class__ is not uuid.UUID:
+            value = uuid.UUID(str(value))
+        if dialect.name == "sqlite":
+            return value.bytes
         return str(value)
 
     def process_result_value(self, value, dialect):
-        if value is None:
-            return None
-        if isinstance(value, uuid.UUID):
+        if value is None or value.__class__ is uuid.UUID:
             return value
+        if value.__class__ is bytes:
+            return uuid.UUID(bytes=value)
         return uuid.UUID(value)
 
 
+_uuid7_lock = threading.Lock()
+_uuid7_last_ms = 0
+_uuid7_counter = 0
+
+
+def uuid7():
+    """Time-ordered UUID (RFC 9562 version 7), the default for new primary keys.
+
+    48 bits of Unix time in milliseconds, then a 42-bit counter that starts
+    at a random value every millisecond and 32 random bits. Ids made by one
+    process are strictly increasing, also when the clock steps back, so new
+    rows are appended at the right edge of the primary key index instead of
+    at a random page. Version 4 ids of existing rows stay valid.
+    """
+    global _uuid7_last_ms, _uuid7_counter
+    with _uuid7_lock:
+        timestamp_ms = time.time_ns() // 1_000_000
+        if timestamp_ms > _uuid7_last_ms:
+            # Top bit clear leaves room for at least 2**41 ids in this millisecond
+            counter = int.from_bytes(os.urandom(6), "big") & 0x1FF_FFFF_FFFF
+        else:
+            timestamp_ms = _uuid7_last_ms
+            counter = _uuid7_counter + 1
+            if counter > 0x3FF_FFFF_FFFF:
+                timestamp_ms += 1
+                counter = int.from_bytes(os.urandom(6), "big") & 0x1FF_FFFF_FFFF
+        _uuid7_last_ms, _uuid7_counter = timestamp_ms, counter
+
+    tail = int.from_bytes(os.urandom(4), "big")
+    value = (
+        (timestamp_ms & 0xFFFF_FFFF_FFFF) << 80
+        | 0x7 << 76  # version
+        | (counter >> 30) << 64
+        | 0b10 << 62  # variant
+        | (counter & 0x3FFF_FFFF) << 32
+        | tail
+    )
+    return uuid.UUID(int=value)
+
+
 class Company(db.Model):
     __tablename__ = "companies"
 
-    id = db.Column(GUID(), primary_key=True, default=uuid.uuid4)
+    id = db.Column(GUID(), primary_key=True, default=uuid7)
     name = db.Column(db.String(255), nullable=False, index=True)
     address = db.Column(db.String(255), nullable=True)
     postal_code = db.Column(db.String(20), nullable=True)
@@ -59,15 +124,18 @@ class Company(db.Model):
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    users = db.relationship("User", backref="company", lazy="joined", cascade="all, delete-orphan")
-    customers = db.relationship("Customer", backref="company", lazy="dynamic", cascade="all, delete-orphan")
-    articles = db.relationship("Article", backref="company", lazy="dynamic", cascade="all, delete-orphan")
+    # Unbounded collections are never loaded implicitly: query them, or add a
+    # loader option to the query that needs them. Deleting a company leaves
+    # the child rows to the foreign keys' ON DELETE CASCADE.
+    users = db.relationship("User", backref="company", lazy="raise", cascade="all, delete-orphan", passive_deletes=True)
+    customers = db.relationship("Customer", backref="company", lazy="raise", cascade="all, delete-orphan", passive_deletes=True)
+    articles = db.relationship("Article", backref="company", lazy="raise", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class User(db.Model):
     __tablename__ = "users"
 
-    id = db.Column(GUID(), primary_key=True, default=uuid.uuid4)
+    id = db.Column(GUID(), primary_key=True, default=uuid7)
     company_id = db.Column(GUID(), db.ForeignKey("companies.id", ondelete='CASCADE'), nullable=False, index=True)
     username = db.Column(db.String(100), unique=True, nullable=False)
     email = db.Column(db.String(255), unique=True, nullable=False, index=True)
@@ -81,10 +149,10 @@ class User(db.Model):
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
 
     @property
     def full_name(self):
@@ -94,7 +162,7 @@ class User(db.Model):
 class Customer(db.Model):
     __tablename__ = "customers"
 
-    id = db.Column(GUID(), primary_key=True, default=uuid.uuid4)
+    id = db.Column(GUID(), primary_key=True, default=uuid7)
     company_id = db.Column(GUID(), db.ForeignKey("companies.id", ondelete='CASCADE'), nullable=False, index=True)
     company_name = db.Column(db.String(255), nullable=False, index=True)
     contact_person = db.Column(db.String(255), nullable=True)
@@ -108,6 +176,8 @@ class Customer(db.Model):
     vat_number = db.Column(db.String(50), nullable=True)
     payment_terms = db.Column(db.Integer, nullable=False, default=30)
     credit_limit = db.Column(db.Numeric(10, 2), nullable=True)
+    # Sum of the open amounts of sent and overdue invoices, see services/ledger.py
+    open_balance = db.Column(db.Numeric(12, 2), nullable=False, default=0, server_default="0")
     notes = db.Column(db.Text, nullable=True)
     is_active = db.Column(db.Boolean, nullable=False, default=True, index=True)
     created_by_id = db.Column(GUID(), db.ForeignKey("users.id", ondelete='SET NULL'), nullable=True, index=True)
@@ -115,10 +185,10 @@ class Customer(db.Model):
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     created_by = db.relationship("User")
-    locations = db.relationship("Location", backref="customer", lazy="dynamic", cascade="all, delete-orphan")
-    quotes = db.relationship("Quote", backref="customer", lazy="dynamic", cascade="all, delete-orphan")
-    work_orders = db.relationship("WorkOrder", backref="customer", lazy="dynamic", cascade="all, delete-orphan")
-    invoices = db.relationship("Invoice", backref="customer", lazy="dynamic", cascade="all, delete-orphan")
+    locations = db.relationship("Location", backref="customer", lazy="raise", cascade="all, delete-orphan", passive_deletes=True)
+    quotes = db.relationship("Quote", backref="customer", lazy="raise", cascade="all, delete-orphan", passive_deletes=True)
+    work_orders = db.relationship("WorkOrder", backref="customer", lazy="raise", cascade="all, delete-orphan", passive_deletes=True)
+    invoices = db.relationship("Invoice", backref="customer", lazy="raise", cascade="all, delete-orphan", passive_deletes=True)
 
     def to_dict(self, include_locations=False):
         """Serializes the Customer object to a dictionary."""
@@ -135,21 +205,22 @@ class Customer(db.Model):
             "country": self.country,
             "vat_number": self.vat_number,
             "payment_terms": self.payment_terms,
-            "credit_limit": float(self.credit_limit) if self.credit_limit else None,
+            "credit_limit": self.credit_limit,
+            "open_balance": self.open_balance,
             "notes": self.notes,
             "is_active": self.is_active,
-            "created_at": self.created_at.isoformat(),
-            "location_count": self.locations.count()
+            "created_at": self.created_at,
+            "location_count": self.location_count
         }
         if include_locations:
-            customer_dict['locations'] = [loc.to_dict() for loc in self.locations.filter_by(is_active=True).all()]
+            customer_dict['locations'] = [loc.to_dict() for loc in self.locations if loc.is_active]
         return customer_dict
 
 
 class Location(db.Model):
     __tablename__ = "locations"
 
-    id = db.Column(GUID(), primary_key=True, default=uuid.uuid4)
+    id = db.Column(GUID(), primary_key=True, default=uuid7)
     customer_id = db.Column(GUID(), db.ForeignKey("customers.id", ondelete='CASCADE'), nullable=False, index=True)
     name = db.Column(db.String(255), nullable=False)
     address = db.Column(db.String(255), nullable=False)
@@ -181,16 +252,28 @@ class Location(db.Model):
         }
 
 
+# Deferred, so single customers count on access; list queries undefer() it
+# to get every count in the same SELECT.
+Customer.location_count = db.column_property(
+    sa.select(sa.func.count(Location.id))
+    .where(Location.customer_id == Customer.id)
+    .correlate_except(Location)
+    .scalar_subquery(),
+    deferred=True,
+)
+
+
 class ArticleCategory(db.Model):
     __tablename__ = "article_categories"
 
-    id = db.Column(GUID(), primary_key=True, default=uuid.uuid4)
+    id = db.Column(GUID(), primary_key=True, default=uuid7)
     company_id = db.Column(GUID(), db.ForeignKey("companies.id", ondelete='CASCADE'), nullable=False, index=True)
     name = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    articles = db.relationship("Article", backref="category", lazy="dynamic")
+    articles = db.relationship("Article", backref="category", lazy="raise", passive_deletes=True)
 
     def to_dict(self):
         """Serializes the ArticleCategory object to a dictionary."""
@@ -198,14 +281,14 @@ class ArticleCategory(db.Model):
             "id": self.id,
             "name": self.name,
             "description": self.description,
-            "article_count": self.articles.count()
+            "article_count": Article.query.filter_by(category_id=self.id).count()
         }
 
 
 class Article(db.Model):
     __tablename__ = "articles"
 
-    id = db.Column(GUID(), primary_key=True, default=uuid.uuid4)
+    id = db.Column(GUID(), primary_key=True, default=uuid7)
     company_id = db.Column(GUID(), db.ForeignKey("companies.id", ondelete='CASCADE'), nullable=False, index=True)
     category_id = db.Column(GUID(), db.ForeignKey("article_categories.id", ondelete='SET NULL'), nullable=True, index=True)
     code = db.Column(db.String(100), nullable=False)
@@ -235,25 +318,25 @@ class Article(db.Model):
             "name": self.name,
             "description": self.description,
             "unit": self.unit,
-            "purchase_price": float(self.purchase_price) if self.purchase_price else None,
-            "selling_price": float(self.selling_price),
-            "vat_rate": float(self.vat_rate),
-            "stock_quantity": float(self.stock_quantity),
-            "min_stock_level": float(self.min_stock_level),
+            "purchase_price": self.purchase_price,
+            "selling_price": self.selling_price,
+            "vat_rate": self.vat_rate,
+            "stock_quantity": self.stock_quantity,
+            "min_stock_level": self.min_stock_level,
             "supplier": self.supplier,
             "supplier_code": self.supplier_code,
             "is_active": self.is_active,
             "category_id": self.category_id,
             "category_name": self.category.name if self.category else None,
             "is_low_stock": self.stock_quantity <= self.min_stock_level,
-            "created_at": self.created_at.isoformat()
+            "created_at": self.created_at
         }
 
 
 class Quote(db.Model):
     __tablename__ = "quotes"
 
-    id = db.Column(GUID(), primary_key=True, default=uuid.uuid4)
+    id = db.Column(GUID(), primary_key=True, default=uuid7)
     company_id = db.Column(GUID(), db.ForeignKey("companies.id", ondelete='CASCADE'), nullable=False, index=True)
     quote_number = db.Column(db.String(50), nullable=False, index=True)
     customer_id = db.Column(GUID(), db.ForeignKey("customers.id", ondelete='CASCADE'), nullable=False, index=True)
@@ -273,15 +356,17 @@ class Quote(db.Model):
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     created_by = db.relationship("User")
-    lines = db.relationship("QuoteLine", backref="quote", lazy="dynamic", cascade="all, delete-orphan")
-    work_orders = db.relationship("WorkOrder", backref="quote", lazy="dynamic")
+    location = db.relationship("Location")
+    # Lines are small and needed wherever the document is (totals, detail, copies)
+    lines = db.relationship("QuoteLine", backref="quote", lazy="selectin", cascade="all, delete-orphan")
+    work_orders = db.relationship("WorkOrder", backref="quote", lazy="raise", passive_deletes=True)
     __table_args__ = (db.UniqueConstraint("company_id", "quote_number", name="unique_company_quote_number"),)
 
 
 class QuoteLine(db.Model):
     __tablename__ = "quote_lines"
 
-    id = db.Column(GUID(), primary_key=True, default=uuid.uuid4)
+    id = db.Column(GUID(), primary_key=True, default=uuid7)
     quote_id = db.Column(GUID(), db.ForeignKey("quotes.id", ondelete='CASCADE'), nullable=False, index=True)
     article_id = db.Column(GUID(), db.ForeignKey("articles.id", ondelete='SET NULL'), nullable=True, index=True)
     description = db.Column(db.Text, nullable=False)
@@ -291,11 +376,13 @@ class QuoteLine(db.Model):
     line_total = db.Column(db.Numeric(10, 2), nullable=False)
     sort_order = db.Column(db.Integer, nullable=False, default=0)
 
+    article = db.relationship("Article")
+
 
 class WorkOrder(db.Model):
     __tablename__ = "work_orders"
 
-    id = db.Column(GUID(), primary_key=True, default=uuid.uuid4)
+    id = db.Column(GUID(), primary_key=True, default=uuid7)
     company_id = db.Column(GUID(), db.ForeignKey("companies.id", ondelete='CASCADE'), nullable=False, index=True)
     work_order_number = db.Column(db.String(50), nullable=False, index=True)
     quote_id = db.Column(GUID(), db.ForeignKey("quotes.id", ondelete='SET NULL'), nullable=True, index=True)
@@ -320,15 +407,16 @@ class WorkOrder(db.Model):
 
     created_by = db.relationship("User", foreign_keys=[created_by_id])
     technician = db.relationship("User", foreign_keys=[technician_id])
-    lines = db.relationship("WorkOrderLine", backref="work_order", lazy="dynamic", cascade="all, delete-orphan")
-    time_entries = db.relationship("WorkOrderTimeEntry", backref="work_order", lazy="dynamic", cascade="all, delete-orphan")
+    location = db.relationship("Location")
+    lines = db.relationship("WorkOrderLine", backref="work_order", lazy="selectin", cascade="all, delete-orphan")
+    time_entries = db.relationship("WorkOrderTimeEntry", backref="work_order", lazy="selectin", cascade="all, delete-orphan")
     __table_args__ = (db.UniqueConstraint("company_id", "work_order_number", name="unique_company_work_order_number"),)
 
 
 class WorkOrderLine(db.Model):
     __tablename__ = "work_order_lines"
 
-    id = db.Column(GUID(), primary_key=True, default=uuid.uuid4)
+    id = db.Column(GUID(), primary_key=True, default=uuid7)
     work_order_id = db.Column(GUID(), db.ForeignKey("work_orders.id", ondelete='CASCADE'), nullable=False, index=True)
     article_id = db.Column(GUID(), db.ForeignKey("articles.id", ondelete='SET NULL'), nullable=True, index=True)
     description = db.Column(db.Text, nullable=False)
@@ -338,11 +426,13 @@ class WorkOrderLine(db.Model):
     line_total = db.Column(db.Numeric(10, 2), nullable=False)
     sort_order = db.Column(db.Integer, nullable=False, default=0)
 
+    article = db.relationship("Article")
+
 
 class WorkOrderTimeEntry(db.Model):
     __tablename__ = "time_registrations"
 
-    id = db.Column(GUID(), primary_key=True, default=uuid.uuid4)
+    id = db.Column(GUID(), primary_key=True, default=uuid7)
     company_id = db.Column(GUID(), db.ForeignKey("companies.id", ondelete='CASCADE'), nullable=False, index=True)
     user_id = db.Column(GUID(), db.ForeignKey("users.id", ondelete='RESTRICT'), nullable=False, index=True)
     work_order_id = db.Column(GUID(), db.ForeignKey("work_orders.id", ondelete='CASCADE'), nullable=False, index=True)
@@ -355,16 +445,27 @@ class WorkOrderTimeEntry(db.Model):
     is_billable = db.Column(db.Boolean, nullable=False, default=True)
     billable_amount = db.Column(db.Numeric(10, 2), nullable=False, default=0)
     vat_rate = db.Column(db.Numeric(5, 2), nullable=False, default=21.00)
-    is_invoiced = db.Column(db.Boolean, nullable=False, default=False, index=True)
+    is_invoiced = db.Column(db.Boolean, nullable=False, default=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Billing queue: only billable hours that still have to be invoiced
+    __table_args__ = (
+        db.Index(
+            "idx_time_registrations_unbilled",
+            "company_id",
+            "work_order_id",
+            postgresql_where=db.and_(is_billable == db.true(), is_invoiced == db.false()),
+            sqlite_where=db.and_(is_billable == db.true(), is_invoiced == db.false()),
+        ),
+    )
+
     user = db.relationship("User")
 
 class Invoice(db.Model):
     __tablename__ = "invoices"
 
-    id = db.Column(GUID(), primary_key=True, default=uuid.uuid4)
+    id = db.Column(GUID(), primary_key=True, default=uuid7)
     company_id = db.Column(GUID(), db.ForeignKey("companies.id", ondelete='CASCADE'), nullable=False, index=True)
     invoice_number = db.Column(db.String(50), nullable=False, index=True)
     customer_id = db.Column(GUID(), db.ForeignKey("customers.id", ondelete='CASCADE'), nullable=False, index=True)
@@ -384,14 +485,24 @@ class Invoice(db.Model):
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     created_by = db.relationship("User")
-    items = db.relationship("InvoiceItem", backref="invoice", lazy="dynamic", cascade="all, delete-orphan")
-    __table_args__ = (db.UniqueConstraint("company_id", "invoice_number", name="unique_company_invoice_number"),)
+    items = db.relationship("InvoiceItem", backref="invoice", lazy="selectin", cascade="all, delete-orphan")
+    __table_args__ = (
+        db.UniqueConstraint("company_id", "invoice_number", name="unique_company_invoice_number"),
+        # Overdue detection: only invoices still waiting for payment
+        db.Index(
+            "idx_invoices_sent_due_date",
+            "company_id",
+            "due_date",
+            postgresql_where=status == "sent",
+            sqlite_where=status == "sent",
+        ),
+    )
 
 
 class InvoiceItem(db.Model):
     __tablename__ = "invoice_lines"
 
-    id = db.Column(GUID(), primary_key=True, default=uuid.uuid4)
+    id = db.Column(GUID(), primary_key=True, default=uuid7)
     invoice_id = db.Column(GUID(), db.ForeignKey("invoices.id", ondelete='CASCADE'), nullable=False, index=True)
     work_order_id = db.Column(GUID(), db.ForeignKey("work_orders.id", ondelete='SET NULL'), nullable=True, index=True)
     article_id = db.Column(GUID(), db.ForeignKey("articles.id", ondelete='SET NULL'), nullable=True, index=True)
@@ -402,14 +513,14 @@ class InvoiceItem(db.Model):
     line_total = db.Column(db.Numeric(10, 2), nullable=False)
     sort_order = db.Column(db.Integer, nullable=False, default=0)
 
-    article = db.relationship("Article", backref="invoice_items", lazy="dynamic")
-    work_order = db.relationship("WorkOrder", backref="invoice_items", lazy="dynamic")
+    article = db.relationship("Article", backref=db.backref("invoice_items", lazy="raise", passive_deletes=True))
+    work_order = db.relationship("WorkOrder", backref=db.backref("invoice_items", lazy="raise", passive_deletes=True))
 
 
 class Attachment(db.Model):
     __tablename__ = "attachments"
 
-    id = db.Column(GUID(), primary_key=True, default=uuid.uuid4)
+    id = db.Column(GUID(), primary_key=True, default=uuid7)
     company_id = db.Column(GUID(), db.ForeignKey("companies.id", ondelete='CASCADE'), nullable=False, index=True)
     entity_type = db.Column(db.String(50), nullable=False, index=True)
     entity_id = db.Column(GUID(), nullable=False, index=True)
@@ -428,7 +539,7 @@ class Attachment(db.Model):
 class DocumentTemplate(db.Model):
     __tablename__ = "document_templates"
 
-    id = db.Column(GUID(), primary_key=True, default=uuid.uuid4)
+    id = db.Column(GUID(), primary_key=True, default=uuid7)
     company_id = db.Column(GUID(), db.ForeignKey("companies.id", ondelete='CASCADE'), nullable=False, index=True)
     name = db.Column(db.String(255), nullable=False)
     document_type = db.Column(db.String(50), nullable=False, index=True)
@@ -445,7 +556,7 @@ class DocumentTemplate(db.Model):
 class AuditLog(db.Model):
     __tablename__ = "audit_log"
 
-    id = db.Column(GUID(), primary_key=True, default=uuid.uuid4)
+    id = db.Column(GUID(), primary_key=True, default=uuid7)
     company_id = db.Column(GUID(), db.ForeignKey("companies.id", ondelete='CASCADE'), nullable=False, index=True)
     user_id = db.Column(GUID(), db.ForeignKey("users.id", ondelete='SET NULL'), nullable=True, index=True)
     entity_type = db.Column(db.String(50), nullable=False, index=True)
@@ -455,4 +566,32 @@ class AuditLog(db.Model):
     new_values = db.Column(db.JSON, nullable=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
 
-    user = db.relationship("User")
\ No newline at end of file
+    user = db.relationship("User")
+
+class JobRun(db.Model):
+    """One run of a scheduled job (see services/scheduler.py)."""
+    __tablename__ = "job_runs"
+    __table_args__ = (db.Index("ix_job_runs_job_name_started_at", "job_name", "started_at"),)
+
+    id = db.Column(GUID(), primary_key=True, default=uuid7)
+    job_name = db.Column(db.String(100), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="running")
+    instance = db.Column(db.String(100), nullable=True)
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    duration_ms = db.Column(db.Integer, nullable=True)
+    result = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "job_name": self.job_name,
+            "status": self.status,
+            "instance": self.instance,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration_ms": self.duration_ms,
+            "result": self.result,
+            "error": self.error,
+        }
@@ -1,3 +1,5 @@
+import uuid
+
 from flask import has_request_context
 from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
 from flask_sqlalchemy.query import Query as BaseQuery
@@ -17,6 +19,14 @@ class ScopedQuery(BaseQuery):
         if not user_id:
             return None
         # avoid circular import at module load
+        from src.services.cache import cache
+
+        company_id = cache.get_or_set(
+            None, f"user_company:{user_id}", lambda: self._load_company_id(user_id)
+        )
+        return uuid.UUID(company_id) if company_id else None
+
+    def _load_company_id(self, user_id):
         from src.models.database import User
 
         try:
@@ -24,8 +34,8 @@ class ScopedQuery(BaseQuery):
             user = self.session.get(User, user_id)
         except Exception:
             return None
-        if user:
-            return user.company_id
+        if user and user.company_id:
+            return str(user.company_id)
         return None
 
     def _apply_company_scope(self):
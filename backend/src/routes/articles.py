@@ -1,7 +1,23 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from src.models.database import db, Article, ArticleCategory, User
-from sqlalchemy import or_
+from src.services.http_cache import conditional, article_validator, categories_validator
+from src.services import invalidation
+from src.services.cache import cache
+from src.schemas import (
+    ARTICLE_FIELD_COLUMNS,
+    ARTICLE_LIST_FIELDS,
+    ArticleSchema,
+    article_list_schema,
+    article_schema,
+    list_schema,
+    projection,
+    sparse_fieldset,
+    validation_error,
+)
+from marshmallow import ValidationError
+from sqlalchemy import func, or_
+from sqlalchemy.orm import joinedload
 
 articles_bp = Blueprint('articles', __name__)
 
@@ -15,6 +31,30 @@ def _parse_int_arg(name, default=None, max_value=None):
         value = min(value, max_value)
     return value
 
+def _load_categories(company_id):
+    """Categories with their article counts in one grouped query."""
+    rows = (
+        db.session.query(ArticleCategory, func.count(Article.id))
+        .outerjoin(Article, Article.category_id == ArticleCategory.id)
+        .filter(ArticleCategory.company_id == company_id)
+        .group_by(ArticleCategory.id)
+        .order_by(ArticleCategory.name)
+        .all()
+    )
+    return [
+        {
+            "id": str(category.id),
+            "name": category.name,
+            "description": category.description,
+            "article_count": article_count,
+        }
+        for category, article_count in rows
+    ]
+
+# The cached categories include the article counts
+invalidation.subscribe('article_categories', lambda company_id, _: [(company_id, 'categories')])
+invalidation.subscribe('articles', lambda company_id, _: [(company_id, 'categories')])
+
 def _parse_bool_arg(name, default=False):
     raw = request.args.get(name)
     if raw is None:
@@ -37,8 +77,19 @@ def get_articles():
         category_id = request.args.get('category_id')
         active_only = _parse_bool_arg('active_only', True)
         low_stock = _parse_bool_arg('low_stock', False)
-        
-        query = Article.query
+        try:
+            only = sparse_fieldset(request.args.get('fields'), ARTICLE_LIST_FIELDS)
+        except ValidationError as err:
+            return jsonify(validation_error(err)), 400
+        
+        if only:
+            schema = list_schema(ArticleSchema, only)
+            query = Article.query.options(projection(Article, only, ARTICLE_FIELD_COLUMNS))
+            if 'category_name' in only:
+                query = query.options(joinedload(Article.category).load_only(ArticleCategory.name))
+        else:
+            schema = article_list_schema
+            query = Article.query.options(joinedload(Article.category))
         if active_only:
             query = query.filter(Article.is_active == True)
         if category_id:
@@ -60,7 +111,7 @@ def get_articles():
         )
         
         return jsonify({
-            'articles': [article.to_dict() for article in articles.items],
+            'articles': schema.dump(articles.items),
             'pagination': {
                 'page': articles.page,
                 'pages': articles.pages,
@@ -76,6 +127,7 @@ def get_articles():
 
 @articles_bp.route('/<article_id>', methods=['GET'])
 @jwt_required()
+@conditional(article_validator)
 def get_article(article_id):
     """Get a specific article, adhering to the API contract."""
     try:
@@ -97,33 +149,22 @@ def create_article():
         company_id = claims.get('company_id')
         user_id = get_jwt_identity()
         
-        data = request.get_json()
+        data = request.get_json() or {}
         
-        required_fields = ['code', 'name', 'selling_price']
-        if not data or not all(field in data for field in required_fields):
-            return jsonify({'error': 'Missing required fields'}), 400
+        try:
+            article = article_schema.load(data, session=db.session, transient=True)
+        except ValidationError as err:
+            return jsonify(validation_error(err)), 400
         
-        if Article.query.filter_by(code=data['code']).first():
+        if Article.query.filter_by(code=article.code).first():
             return jsonify({'error': 'Article code already exists'}), 400
         
-        article = Article(
-            company_id=company_id,
-            category_id=data.get('category_id'),
-            code=data['code'],
-            name=data['name'],
-            description=data.get('description'),
-            unit=data.get('unit', 'stuks'),
-            purchase_price=data.get('purchase_price'),
-            selling_price=data['selling_price'],
-            vat_rate=data.get('vat_rate', 21.00),
-            stock_quantity=data.get('stock_quantity', 0),
-            min_stock_level=data.get('min_stock_level', 0),
-            supplier=data.get('supplier'),
-            supplier_code=data.get('supplier_code'),
-            created_by=user_id
-        )
+        article.company_id = company_id
+        article.created_by_id = user_id
         
         db.session.add(article)
+        db.session.flush()
+        invalidation.publish('articles', company_id, article.id)
         db.session.commit()
         
         return jsonify({
@@ -163,6 +204,7 @@ def update_article(article_id):
             if field in data:
                 setattr(article, field, data[field])
         
+        invalidation.publish('articles', article.company_id, article.id)
         db.session.commit()
         
         return jsonify({'message': 'Article updated successfully'}), 200
@@ -173,11 +215,13 @@ def update_article(article_id):
 
 @articles_bp.route('/categories', methods=['GET'])
 @jwt_required()
+@conditional(categories_validator)
 def get_categories():
     """Get all article categories, adhering to the API contract."""
     try:
-        categories = ArticleCategory.query.order_by(ArticleCategory.name).all()
-        return jsonify({'categories': [category.to_dict() for category in categories]}), 200
+        company_id = get_jwt().get('company_id')
+        categories = cache.get_or_set(company_id, 'categories', lambda: _load_categories(company_id))
+        return jsonify({'categories': categories}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -201,6 +245,8 @@ def create_category():
         )
         
         db.session.add(category)
+        db.session.flush()
+        invalidation.publish('article_categories', company_id, category.id)
         db.session.commit()
         
         return jsonify({
@@ -237,7 +283,7 @@ def adjust_stock():
         
         return jsonify({
             'message': 'Stock adjusted successfully',
-            'new_quantity': float(article.stock_quantity)
+            'new_quantity': article.stock_quantity
         }), 200
         
     except Exception as e:
@@ -1,8 +1,11 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 import uuid
+from sqlalchemy.orm import joinedload
 from src.models.database import User
 from src.models.database import db, Company
+from src.services import activity
+from src.services.passwords import needs_rehash
 from datetime import datetime
 
 auth_bp = Blueprint("auth", __name__)
@@ -105,9 +108,11 @@ def login():
             return jsonify({"error": "Email/username and password are required"}), 400
 
         # Find the user by either email or username
-        user = User.query.filter(
-            (User.email == login_identifier) | (User.username == login_identifier)
-        ).first()
+        user = (
+            User.query.options(joinedload(User.company))
+            .filter((User.email == login_identifier) | (User.username == login_identifier))
+            .first()
+        )
 
         if not user or not user.check_password(password):
             return jsonify({"error": "Invalid credentials"}), 401
@@ -115,32 +120,36 @@ def login():
         if not getattr(user, "is_active", True):
             return jsonify({"error": "Account is deactivated"}), 401
 
-        if hasattr(user, "last_login"):
-            user.last_login = datetime.utcnow()
-        db.session.commit()
+        # Upgrade hashes of older schemes or parameters while we have the password
+        rehashed = needs_rehash(user.password_hash)
+        if rehashed:
+            user.set_password(password)
 
         token = create_access_token(
             identity=str(user.id), additional_claims={"company_id": user.company_id}
         )
-
-        return (
-            jsonify(
-                {
-                    "message": "Login successful",
-                    "token": token,
-                    "user": {
-                        "id": user.id,
-                        "username": user.username,
-                        "email": user.email,
-                        "full_name": user.full_name,
-                        "role": user.role,
-                        "company_id": user.company_id,
-                        "company_name": user.company.name,
-                    },
-                }
-            ),
-            200,
-        )
+        # Built before the commit expires the user, which would reload it
+        body = {
+            "message": "Login successful",
+            "token": token,
+            "user": {
+                "id": user.id,
+                "username": user.username,
+                "email": user.email,
+                "full_name": user.full_name,
+                "role": user.role,
+                "company_id": user.company_id,
+                "company_name": user.company.name,
+            },
+        }
+
+        # last_login is written in bulk by the activity buffer, so a plain
+        # login does not write to the database
+        activity.record_login(user.id)
+        if rehashed:
+            db.session.commit()
+
+        return jsonify(body), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -163,7 +172,7 @@ def get_current_user():
             user_id = uuid.UUID(identity)
         except (TypeError, ValueError):
             user_id = identity
-        user = User.query.get(user_id)
+        user = User.query.options(joinedload(User.company)).get(user_id)
 
         if not user:
             return jsonify({"error": "User not found"}), 404
@@ -179,11 +188,7 @@ def get_current_user():
                         "role": user.role,
                         "company_id": user.company_id,
                         "company_name": user.company.name,
-                        "last_login": (
-                            user.last_login.isoformat()
-                            if hasattr(user, "last_login") and user.last_login
-                            else None
-                        ),
+                        "last_login": activity.last_login(user),
                     }
                 }
             ),
@@ -1,10 +1,51 @@
+import uuid
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models.database import db, Company, User
+from src.services import invalidation
+from src.services.cache import cache
 from sqlalchemy.exc import IntegrityError
 
 companies_bp = Blueprint('companies', __name__)
 
+def _company_dict(company):
+    return {
+        'id': str(company.id),
+        'name': company.name,
+        'email': company.email,
+        'phone': company.phone,
+        'address': company.address,
+        'city': company.city,
+        'postal_code': company.postal_code,
+        'country': company.country,
+        'vat_number': company.vat_number,
+        'chamber_of_commerce': company.chamber_of_commerce,
+        'bank_account': company.bank_account,
+        'logo_url': company.logo_url,
+        'created_at': company.created_at
+    }
+
+def _load_company(company_id):
+    """Company details and settings, cached per company."""
+    company = db.session.get(Company, company_id)
+    if not company:
+        return None
+    return {
+        'company': _company_dict(company),
+        'document_settings': {
+            'default_vat_rate': company.default_vat_rate,
+            'invoice_prefix': company.invoice_prefix,
+            'quote_prefix': company.quote_prefix,
+            'work_order_prefix': company.workorder_prefix,
+            'payment_terms_days': 30
+        }
+    }
+
+invalidation.subscribe('companies', lambda company_id, _: [(company_id, 'company')])
+
+def _same_company(user, company_id):
+    return str(user.company_id) == str(company_id)
+
 @companies_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_companies():
@@ -22,26 +63,12 @@ def get_companies():
         else:
             companies = [user.company] if user.company else []
             
-        return jsonify([{
-            'id': company.id,
-            'name': company.name,
-            'email': company.email,
-            'phone': company.phone,
-            'address': company.address,
-            'city': company.city,
-            'postal_code': company.postal_code,
-            'country': company.country,
-            'vat_number': company.vat_number,
-            'chamber_of_commerce': company.chamber_of_commerce,
-            'bank_account': company.bank_account,
-            'logo_url': company.logo_url,
-            'created_at': company.created_at.isoformat() if company.created_at else None
-        } for company in companies]), 200
+        return jsonify([_company_dict(company) for company in companies]), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@companies_bp.route('/<int:company_id>', methods=['GET'])
+@companies_bp.route('/<company_id>', methods=['GET'])
 @jwt_required()
 def get_company(company_id):
     """Get specific company details"""
@@ -52,30 +79,19 @@ def get_company(company_id):
         if not user:
             return jsonify({'error': 'User not found'}), 404
             
-        company = Company.query.get(company_id)
-        if not company:
+        company_id = str(uuid.UUID(company_id))
+        cached = cache.get_or_set(company_id, 'company', lambda: _load_company(company_id))
+        if not cached:
             return jsonify({'error': 'Company not found'}), 404
             
         # Check if user has access to this company
-        if user.role != 'admin' and user.company_id != company_id:
+        if user.role != 'admin' and not _same_company(user, company_id):
             return jsonify({'error': 'Access denied'}), 403
             
-        return jsonify({
-            'id': company.id,
-            'name': company.name,
-            'email': company.email,
-            'phone': company.phone,
-            'address': company.address,
-            'city': company.city,
-            'postal_code': company.postal_code,
-            'country': company.country,
-            'vat_number': company.vat_number,
-            'chamber_of_commerce': company.chamber_of_commerce,
-            'bank_account': company.bank_account,
-            'logo_url': company.logo_url,
-            'created_at': company.created_at.isoformat() if company.created_at else None
-        }), 200
+        return jsonify(cached['company']), 200
         
+    except ValueError:
+        return jsonify({'error': 'Company not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -129,7 +145,7 @@ def create_company():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
-@companies_bp.route('/<int:company_id>', methods=['PUT'])
+@companies_bp.route('/<company_id>', methods=['PUT'])
 @jwt_required()
 def update_company(company_id):
     """Update company details"""
@@ -145,7 +161,7 @@ def update_company(company_id):
             return jsonify({'error': 'Company not found'}), 404
             
         # Check if user has access to update this company
-        if user.role not in ['admin', 'manager'] or (user.role == 'manager' and user.company_id != company_id):
+        if user.role not in ['admin', 'manager'] or (user.role == 'manager' and not _same_company(user, company_id)):
             return jsonify({'error': 'Access denied'}), 403
             
         data = request.get_json()
@@ -174,6 +190,7 @@ def update_company(company_id):
         if 'logo_url' in data:
             company.logo_url = data['logo_url']
             
+        invalidation.publish('companies', company.id, company.id)
         db.session.commit()
         
         return jsonify({
@@ -189,7 +206,7 @@ def update_company(company_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
-@companies_bp.route('/<int:company_id>', methods=['DELETE'])
+@companies_bp.route('/<company_id>', methods=['DELETE'])
 @jwt_required()
 def delete_company(company_id):
     """Delete company (admin only)"""
@@ -205,10 +222,11 @@ def delete_company(company_id):
             return jsonify({'error': 'Company not found'}), 404
             
         # Check if company has users
-        if company.users:
+        if db.session.query(User.id).filter(User.company_id == company.id).first():
             return jsonify({'error': 'Cannot delete company with active users'}), 400
             
         db.session.delete(company)
+        invalidation.publish('companies', company.id, company.id)
         db.session.commit()
         
         return jsonify({'message': 'Company deleted successfully'}), 200
@@ -217,7 +235,7 @@ def delete_company(company_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
-@companies_bp.route('/<int:company_id>/settings', methods=['GET'])
+@companies_bp.route('/<company_id>/settings', methods=['GET'])
 @jwt_required()
 def get_company_settings(company_id):
     """Get company settings and configuration"""
@@ -228,36 +246,23 @@ def get_company_settings(company_id):
         if not user:
             return jsonify({'error': 'User not found'}), 404
             
-        company = Company.query.get(company_id)
-        if not company:
+        company_id = str(uuid.UUID(company_id))
+        cached = cache.get_or_set(company_id, 'company', lambda: _load_company(company_id))
+        if not cached:
             return jsonify({'error': 'Company not found'}), 404
             
         # Check if user has access to this company
-        if user.role not in ['admin', 'manager'] or (user.role == 'manager' and user.company_id != company_id):
+        if user.role not in ['admin', 'manager'] or (user.role == 'manager' and not _same_company(user, company_id)):
             return jsonify({'error': 'Access denied'}), 403
             
+        company_info = dict(cached['company'])
+        for key in ('id', 'created_at'):
+            company_info.pop(key)
+            
         # Return company settings (can be extended with more configuration options)
         settings = {
-            'company_info': {
-                'name': company.name,
-                'email': company.email,
-                'phone': company.phone,
-                'address': company.address,
-                'city': company.city,
-                'postal_code': company.postal_code,
-                'country': company.country,
-                'vat_number': company.vat_number,
-                'chamber_of_commerce': company.chamber_of_commerce,
-                'bank_account': company.bank_account,
-                'logo_url': company.logo_url
-            },
-            'document_settings': {
-                'default_vat_rate': 21.0,
-                'invoice_prefix': 'F',
-                'quote_prefix': 'O',
-                'work_order_prefix': 'W',
-                'payment_terms_days': 30
-            },
+            'company_info': company_info,
+            'document_settings': cached['document_settings'],
             'system_settings': {
                 'timezone': 'Europe/Amsterdam',
                 'currency': 'EUR',
@@ -267,6 +272,7 @@ def get_company_settings(company_id):
         
         return jsonify(settings), 200
         
+    except ValueError:
+        return jsonify({'error': 'Company not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-
@@ -1,8 +1,20 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from src.models.database import db, Customer, Location, User
+from src.schemas import (
+    CUSTOMER_LIST_FIELDS,
+    CustomerSchema,
+    customer_list_schema,
+    customer_schema,
+    list_schema,
+    projection,
+    sparse_fieldset,
+    validation_error,
+)
+from src.services.http_cache import conditional, customer_validator
+from marshmallow import ValidationError
 from sqlalchemy import or_
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import selectinload, undefer
 
 customers_bp = Blueprint('customers', __name__)
 
@@ -36,8 +48,17 @@ def get_customers():
         per_page = _parse_int_arg('per_page', 50, max_value=100)
         search = request.args.get('search', '').strip()
         active_only = _parse_bool_arg('active_only', True)
-        
-        query = Customer.query
+        try:
+            only = sparse_fieldset(request.args.get('fields'), CUSTOMER_LIST_FIELDS)
+        except ValidationError as err:
+            return jsonify(validation_error(err)), 400
+        
+        if only:
+            schema = list_schema(CustomerSchema, only)
+            query = Customer.query.options(projection(Customer, only))
+        else:
+            schema = customer_list_schema
+            query = Customer.query.options(undefer(Customer.location_count))
         if active_only:
             query = query.filter(Customer.is_active == True)
         
@@ -55,7 +76,7 @@ def get_customers():
         )
         
         return jsonify({
-            'customers': [customer.to_dict() for customer in customers.items],
+            'customers': schema.dump(customers.items),
             'pagination': {
                 'page': customers.page,
                 'pages': customers.pages,
@@ -71,10 +92,13 @@ def get_customers():
 
 @customers_bp.route('/<customer_id>', methods=['GET'])
 @jwt_required()
+@conditional(customer_validator)
 def get_customer(customer_id):
     """Get a specific customer with locations, adhering to the API contract."""
     try:
-        customer = Customer.query.get(customer_id)
+        customer = Customer.query.options(
+            selectinload(Customer.locations), undefer(Customer.location_count)
+        ).get(customer_id)
         if not customer:
             return jsonify({'error': 'Customer not found'}), 404
         
@@ -94,28 +118,15 @@ def create_customer():
         company_id = claims.get('company_id')
         user_id = get_jwt_identity()
         
-        data = request.get_json()
+        data = request.get_json() or {}
         
-        if not data or not data.get('company_name'):
-            return jsonify({'error': 'Company name is required'}), 400
+        try:
+            customer = customer_schema.load(data, session=db.session, transient=True)
+        except ValidationError as err:
+            return jsonify(validation_error(err)), 400
         
-        customer = Customer(
-            company_id=company_id,
-            company_name=data['company_name'],
-            contact_person=data.get('contact_person'),
-            email=data.get('email'),
-            phone=data.get('phone'),
-            mobile=data.get('mobile'),
-            address=data.get('address'),
-            postal_code=data.get('postal_code'),
-            city=data.get('city'),
-            country=data.get('country', 'Nederland'),
-            vat_number=data.get('vat_number'),
-            payment_terms=data.get('payment_terms', 30),
-            credit_limit=data.get('credit_limit'),
-            notes=data.get('notes'),
-            created_by=user_id
-        )
+        customer.company_id = company_id
+        customer.created_by_id = user_id
         
         db.session.add(customer)
         db.session.flush()
@@ -160,7 +171,7 @@ def update_customer(customer_id):
 
         # Update fields
         for field, value in data.items():
-            if hasattr(customer, field) and field not in ['id', 'company_id', 'created_at']:
+            if hasattr(customer, field) and field not in ['id', 'company_id', 'created_at', 'open_balance']:
                 setattr(customer, field, value)
         
         db.session.commit()
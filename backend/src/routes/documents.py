@@ -3,12 +3,9 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models.database import db, User, Customer, Quote, WorkOrder, Invoice, Company, DocumentTemplate
 import os
 import json
+import re
 import tempfile
 from datetime import datetime
-import requests
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
 
 documents_bp = Blueprint("documents", __name__)
 
@@ -21,6 +18,32 @@ TEMPLATE_IDS = {
 }
 
 
+# Generated documents are copies of a template named after the entity and
+# the time; the scheduler deletes copies older than DRIVE_COPY_RETENTION_HOURS
+DOCUMENT_COPY_NAME = re.compile(
+    r"^(quote|work_order|invoice|invoice_combined)_[0-9a-f-]{36}_\d{8}_\d{6}$"
+)
+
+
+# Documents are created by copying templates in Drive, then filled in
+GOOGLE_SCOPES = [
+    "https://www.googleapis.com/auth/documents",
+    "https://www.googleapis.com/auth/drive",
+]
+
+
+def _build_google_service(name, version, credentials_info):
+    # The Google client libraries take about as long to import as the rest
+    # of the app; only workers that generate documents pay for them
+    from google.oauth2 import service_account
+    from googleapiclient.discovery import build
+
+    credentials = service_account.Credentials.from_service_account_info(
+        credentials_info, scopes=GOOGLE_SCOPES
+    )
+    return build(name, version, credentials=credentials)
+
+
 def get_google_docs_service():
     """Get Google Docs service with credentials"""
     try:
@@ -31,9 +54,7 @@ def get_google_docs_service():
             return None
 
         credentials_info = json.loads(credentials_json)
-        credentials = Credentials.from_service_account_info(credentials_info)
-        service = build("docs", "v1", credentials=credentials)
-        return service
+        return _build_google_service("docs", "v1", credentials_info)
     except Exception as e:
         print(f"Error creating Google Docs service: {e}")
         return None
@@ -47,9 +68,7 @@ def get_google_drive_service():
             return None
 
         credentials_info = json.loads(credentials_json)
-        credentials = Credentials.from_service_account_info(credentials_info)
-        service = build("drive", "v3", credentials=credentials)
-        return service
+        return _build_google_service("drive", "v3", credentials_info)
     except Exception as e:
         print(f"Error creating Google Drive service: {e}")
         return None
@@ -1,7 +1,6 @@
 from flask import Blueprint, request, jsonify, send_file
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models.database import db, User, Customer, Article
-import pandas as pd
 import tempfile
 import os
 from datetime import datetime
@@ -9,10 +8,15 @@ from sqlalchemy.exc import IntegrityError
 
 excel_bp = Blueprint('excel', __name__)
 
+# pandas is imported inside the views: it is the slowest import of the app
+# and only these endpoints use it, so other workers never load it
+
 @excel_bp.route('/customers/export', methods=['GET'])
 @jwt_required()
 def export_customers():
     """Export customers to Excel file"""
+    import pandas as pd
+
     try:
         current_user_id = get_jwt_identity()
         user = User.query.get(current_user_id)
@@ -67,6 +71,8 @@ def export_customers():
 @jwt_required()
 def import_customers():
     """Import customers from Excel file"""
+    import pandas as pd
+
     try:
         current_user_id = get_jwt_identity()
         user = User.query.get(current_user_id)
@@ -177,6 +183,8 @@ def import_customers():
 @jwt_required()
 def export_articles():
     """Export articles to Excel file"""
+    import pandas as pd
+
     try:
         current_user_id = get_jwt_identity()
         user = User.query.get(current_user_id)
@@ -233,6 +241,8 @@ def export_articles():
 @jwt_required()
 def import_articles():
     """Import articles from Excel file"""
+    import pandas as pd
+
     try:
         current_user_id = get_jwt_identity()
         user = User.query.get(current_user_id)
@@ -347,6 +357,8 @@ def import_articles():
 @jwt_required()
 def download_customer_template():
     """Download Excel template for customer import"""
+    import pandas as pd
+
     try:
         # Create sample data
         template_data = [{
@@ -384,6 +396,8 @@ def download_customer_template():
 @jwt_required()
 def download_article_template():
     """Download Excel template for article import"""
+    import pandas as pd
+
     try:
         # Create sample data
         template_data = [{
@@ -1,4 +1,7 @@
-from flask import Blueprint, request, jsonify
+import csv
+import io
+
+from flask import Blueprint, Response, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models.database import (
     db,
@@ -10,12 +13,41 @@ from src.models.database import (
     WorkOrder,
 )
 from sqlalchemy.exc import IntegrityError
-from datetime import datetime, timedelta
+from sqlalchemy.orm import joinedload, selectinload
+from datetime import date, datetime, timedelta
 from decimal import Decimal
+from src.services.document_lines import (
+    bulk_insert_lines,
+    build_line_row,
+    find_missing_article,
+    prefetch_articles,
+)
+from src.services.vat import compute_totals
+from src.services import invalidation, ledger
+from src.services.billing import (
+    AGING_BUCKETS,
+    BILLABLE_STATUSES,
+    aging_report,
+    allocate_invoice_numbers,
+    billing_queue,
+    collect_billable,
+    create_invoices,
+    run_billing,
+)
+from src.services.cache import cache
+from src.services.http_cache import conditional, invoice_validator
 
 invoices_bp = Blueprint("invoices", __name__)
 
 
+def _aging_cache_name(today=None):
+    # The buckets shift at midnight, so each day gets its own entry
+    return f"aging:{(today or date.today()).isoformat()}"
+
+
+invalidation.subscribe("invoices", lambda company_id, _: [(company_id, _aging_cache_name())])
+
+
 def _parse_int_arg(name, default=None, max_value=None):
     raw = request.args.get(name, default)
     try:
@@ -57,10 +89,12 @@ def get_invoices():
         page = _parse_int_arg("page", 1)
         per_page = _parse_int_arg("per_page", 20, max_value=100)
         status = request.args.get("status", None)
-        customer_id = _parse_int_arg("customer_id", None)
+        customer_id = request.args.get("customer_id")
 
         # Build query
-        query = Invoice.query.filter_by(company_id=user.company_id)
+        query = Invoice.query.options(joinedload(Invoice.customer)).filter_by(
+            company_id=user.company_id
+        )
 
         if status:
             query = query.filter_by(status=status)
@@ -82,37 +116,21 @@ def get_invoices():
                             "invoice_number": invoice.invoice_number,
                             "customer_id": invoice.customer_id,
                             "customer_name": (
-                                invoice.customer.name if invoice.customer else None
-                            ),
-                            "invoice_date": (
-                                invoice.invoice_date.isoformat()
-                                if invoice.invoice_date
-                                else None
-                            ),
-                            "due_date": (
-                                invoice.due_date.isoformat()
-                                if invoice.due_date
-                                else None
+                                invoice.customer.company_name if invoice.customer else None
                             ),
+                            "invoice_date": invoice.invoice_date,
+                            "due_date": invoice.due_date,
                             "status": invoice.status,
-                            "subtotal": (
-                                float(invoice.subtotal) if invoice.subtotal else 0
-                            ),
-                            "vat_amount": (
-                                float(invoice.vat_amount) if invoice.vat_amount else 0
-                            ),
-                            "total_amount": (
-                                float(invoice.total_amount)
-                                if invoice.total_amount
-                                else 0
-                            ),
-                            "payment_terms": invoice.payment_terms,
-                            "notes": invoice.notes,
-                            "created_at": (
-                                invoice.created_at.isoformat()
-                                if invoice.created_at
+                            "subtotal": invoice.subtotal or 0,
+                            "vat_amount": invoice.vat_amount or 0,
+                            "total_amount": invoice.total_amount or 0,
+                            "payment_terms": (
+                                (invoice.due_date - invoice.invoice_date).days
+                                if invoice.due_date and invoice.invoice_date
                                 else None
                             ),
+                            "notes": invoice.notes,
+                            "created_at": invoice.created_at,
                             "items_count": len(invoice.items) if invoice.items else 0,
                         }
                         for invoice in invoices.items
@@ -134,8 +152,9 @@ def get_invoices():
         return jsonify({"error": str(e)}), 500
 
 
-@invoices_bp.route("/<int:invoice_id>", methods=["GET"])
+@invoices_bp.route("/<invoice_id>", methods=["GET"])
 @jwt_required()
+@conditional(invoice_validator)
 def get_invoice(invoice_id):
     """Get specific invoice with items"""
     try:
@@ -148,12 +167,19 @@ def get_invoice(invoice_id):
                 404,
             )
 
-        invoice = Invoice.query.filter_by(
-            id=invoice_id, company_id=user.company_id
-        ).first()
+        invoice = (
+            Invoice.query.options(
+                joinedload(Invoice.customer),
+                selectinload(Invoice.items).joinedload(InvoiceItem.article),
+            )
+            .filter_by(id=invoice_id, company_id=user.company_id)
+            .first()
+        )
         if not invoice:
             return jsonify({"error": "Invoice not found"}), 404
 
+        items = sorted(invoice.items, key=lambda item: item.sort_order)
+
         return (
             jsonify(
                 {
@@ -163,7 +189,7 @@ def get_invoice(invoice_id):
                     "customer": (
                         {
                             "id": invoice.customer.id,
-                            "name": invoice.customer.name,
+                            "name": invoice.customer.company_name,
                             "email": invoice.customer.email,
                             "phone": invoice.customer.phone,
                             "address": invoice.customer.address,
@@ -173,26 +199,23 @@ def get_invoice(invoice_id):
                         if invoice.customer
                         else None
                     ),
-                    "invoice_date": (
-                        invoice.invoice_date.isoformat()
-                        if invoice.invoice_date
-                        else None
-                    ),
-                    "due_date": (
-                        invoice.due_date.isoformat() if invoice.due_date else None
-                    ),
+                    "invoice_date": invoice.invoice_date,
+                    "due_date": invoice.due_date,
                     "status": invoice.status,
-                    "subtotal": float(invoice.subtotal) if invoice.subtotal else 0,
-                    "vat_rate": float(invoice.vat_rate) if invoice.vat_rate else 0,
-                    "vat_amount": (
-                        float(invoice.vat_amount) if invoice.vat_amount else 0
-                    ),
-                    "total_amount": (
-                        float(invoice.total_amount) if invoice.total_amount else 0
+                    "subtotal": invoice.subtotal or 0,
+                    "vat_amount": invoice.vat_amount or 0,
+                    "total_amount": invoice.total_amount or 0,
+                    "payment_terms": (
+                        (invoice.due_date - invoice.invoice_date).days
+                        if invoice.due_date and invoice.invoice_date
+                        else None
                     ),
-                    "payment_terms": invoice.payment_terms,
                     "notes": invoice.notes,
-                    "work_order_ids": invoice.work_order_ids,
+                    "work_order_ids": list(
+                        dict.fromkeys(
+                            item.work_order_id for item in items if item.work_order_id
+                        )
+                    ),
                     "invoice_lines": (
                         [
                             {
@@ -204,22 +227,16 @@ def get_invoice(invoice_id):
                                     else item.description
                                 ),
                                 "description": item.description,
-                                "quantity": float(item.quantity),
-                                "unit_price": float(item.unit_price),
-                                "line_total": float(item.line_total),
-                                "vat_rate": float(item.vat_rate),
+                                "quantity": item.quantity,
+                                "unit_price": item.unit_price,
+                                "line_total": item.line_total,
+                                "vat_rate": item.vat_rate,
                             }
-                            for item in invoice.items
+                            for item in items
                         ]
-                        if invoice.items
-                        else []
-                    ),
-                    "created_at": (
-                        invoice.created_at.isoformat() if invoice.created_at else None
-                    ),
-                    "updated_at": (
-                        invoice.updated_at.isoformat() if invoice.updated_at else None
                     ),
+                    "created_at": invoice.created_at,
+                    "updated_at": invoice.updated_at,
                 }
             ),
             200,
@@ -262,20 +279,24 @@ def create_invoice():
         if not customer:
             return jsonify({"error": "Customer not found"}), 404
 
-        # Generate invoice number
-        year = datetime.now().year
-        last_invoice = (
-            Invoice.query.filter_by(company_id=user.company_id)
-            .filter(Invoice.invoice_number.like(f"F{year}-%"))
-            .order_by(Invoice.invoice_number.desc())
-            .first()
-        )
+        # Validate item data
+        lines_data = data["invoice_lines"]
+        if not all(
+            all(k in item_data for k in ["quantity", "unit_price"])
+            for item_data in lines_data
+        ):
+            return (
+                jsonify({"error": "Item quantity and unit_price are required"}),
+                400,
+            )
 
-        if last_invoice:
-            last_number = int(last_invoice.invoice_number.split("-")[1])
-            invoice_number = f"F{year}-{last_number + 1:04d}"
-        else:
-            invoice_number = f"F{year}-0001"
+        # Get all referenced articles in one query
+        articles = prefetch_articles(
+            user.company_id, [item_data.get("article_id") for item_data in lines_data]
+        )
+        missing_article = find_missing_article(lines_data, articles)
+        if missing_article:
+            return jsonify({"error": f"Article {missing_article} not found"}), 404
 
         # Create invoice
         invoice_date = (
@@ -283,6 +304,9 @@ def create_invoice():
             if data.get("invoice_date")
             else datetime.now().date()
         )
+        invoice_number = allocate_invoice_numbers(
+            user.company_id, 1, invoice_date.year
+        )[0]
         payment_terms = data.get("payment_terms", 30)
         due_date = invoice_date + timedelta(days=payment_terms)
 
@@ -293,69 +317,41 @@ def create_invoice():
             invoice_date=invoice_date,
             due_date=due_date,
             status=data.get("status", "draft"),
-            payment_terms=payment_terms,
             notes=data.get("notes"),
-            work_order_ids=data.get("work_order_ids", []),
-            created_by=current_user_id,
+            created_by_id=current_user_id,
         )
 
         db.session.add(invoice)
         db.session.flush()  # Get invoice ID
 
         # Add invoice items
-        subtotal = Decimal("0")
-        vat_amount = Decimal("0")
-
-        for item_data in data["invoice_lines"]:
-            # Validate item data
-            if not all(k in item_data for k in ["quantity", "unit_price"]):
-                return (
-                    jsonify({"error": "Item quantity and unit_price are required"}),
-                    400,
-                )
-
-            quantity = Decimal(str(item_data["quantity"]))
-            unit_price = Decimal(str(item_data["unit_price"]))
-            line_total = quantity * unit_price
-            item_vat_rate = Decimal(str(item_data.get("vat_rate", 21)))
-
-            # Get article if specified
-            article = None
-            if item_data.get("article_id"):
-                article = Article.query.filter_by(
-                    id=item_data["article_id"], company_id=user.company_id
-                ).first()
-                if not article:
-                    return (
-                        jsonify(
-                            {"error": f'Article {item_data["article_id"]} not found'}
-                        ),
-                        404,
-                    )
-
-            item = InvoiceItem(
-                invoice_id=invoice.id,
-                article_id=item_data.get("article_id"),
-                description=item_data.get(
-                    "description", article.name if article else ""
-                ),
-                quantity=quantity,
-                unit_price=unit_price,
-                line_total=line_total,
-                vat_rate=item_vat_rate,
-            )
-
-            db.session.add(item)
-
-            subtotal += line_total
-            vat_amount += line_total * (item_vat_rate / 100)
+        rows = [
+            build_line_row("invoice_id", invoice.id, item_data, i, articles)
+            for i, item_data in enumerate(lines_data)
+        ]
+        bulk_insert_lines(InvoiceItem, rows)
+
+        totals = compute_totals(
+            [row["quantity"] for row in rows],
+            [row["unit_price"] for row in rows],
+            [row["vat_rate"] for row in rows],
+        )
 
         # Update invoice totals
-        invoice.subtotal = subtotal
+        invoice.subtotal = totals["subtotal"]
         invoice.vat_rate = Decimal("21")  # Default VAT rate
-        invoice.vat_amount = vat_amount
-        invoice.total_amount = subtotal + vat_amount
+        invoice.vat_amount = totals["vat_amount"]
+        invoice.total_amount = totals["total_amount"]
+
+        # Once flushed, an open invoice is part of the balance, a draft is not
+        db.session.flush()
+        if ledger.over_credit_limit(
+            customer.id, invoice.total_amount - ledger.open_amount(invoice)
+        ):
+            db.session.rollback()
+            return jsonify({"error": "Customer credit limit exceeded"}), 400
 
+        invalidation.publish("invoices", invoice.company_id, invoice.id)
         db.session.commit()
 
         return (
@@ -363,7 +359,7 @@ def create_invoice():
                 {
                     "id": invoice.id,
                     "invoice_number": invoice.invoice_number,
-                    "total_amount": float(invoice.total_amount),
+                    "total_amount": invoice.total_amount,
                     "message": "Invoice created successfully",
                 }
             ),
@@ -378,7 +374,7 @@ def create_invoice():
         return jsonify({"error": str(e)}), 500
 
 
-@invoices_bp.route("/<int:invoice_id>", methods=["PUT"])
+@invoices_bp.route("/<invoice_id>", methods=["PUT"])
 @jwt_required()
 def update_invoice(invoice_id):
     """Update invoice"""
@@ -417,49 +413,42 @@ def update_invoice(invoice_id):
             invoice.due_date = datetime.strptime(data["due_date"], "%Y-%m-%d").date()
         if "status" in data:
             invoice.status = data["status"]
-        if "payment_terms" in data:
-            invoice.payment_terms = data["payment_terms"]
         if "notes" in data:
             invoice.notes = data["notes"]
-        if "work_order_ids" in data:
-            invoice.work_order_ids = data["work_order_ids"]
 
         # Update items if provided
         if "invoice_lines" in data:
-            # Delete existing items
-            InvoiceItem.query.filter_by(invoice_id=invoice.id).delete()
-
-            # Add new items
-            subtotal = Decimal("0")
-            vat_amount = Decimal("0")
-
-            for item_data in data["invoice_lines"]:
-                quantity = Decimal(str(item_data["quantity"]))
-                unit_price = Decimal(str(item_data["unit_price"]))
-                line_total = quantity * unit_price
-                item_vat_rate = Decimal(str(item_data.get("vat_rate", 21)))
-
-                item = InvoiceItem(
-                    invoice_id=invoice.id,
-                    article_id=item_data.get("article_id"),
-                    description=item_data.get("description", ""),
-                    quantity=quantity,
-                    unit_price=unit_price,
-                    line_total=line_total,
-                    vat_rate=item_vat_rate,
-                )
+            lines_data = data["invoice_lines"]
+            articles = prefetch_articles(
+                user.company_id,
+                [item_data.get("article_id") for item_data in lines_data],
+            )
+            missing_article = find_missing_article(lines_data, articles)
+            if missing_article:
+                db.session.rollback()
+                return jsonify({"error": f"Article {missing_article} not found"}), 404
 
-                db.session.add(item)
+            # Replace existing items
+            InvoiceItem.query.filter_by(invoice_id=invoice.id).delete()
+            rows = [
+                build_line_row("invoice_id", invoice.id, item_data, i, articles)
+                for i, item_data in enumerate(lines_data)
+            ]
+            bulk_insert_lines(InvoiceItem, rows)
 
-                subtotal += line_total
-                vat_amount += line_total * (item_vat_rate / 100)
+            totals = compute_totals(
+                [row["quantity"] for row in rows],
+                [row["unit_price"] for row in rows],
+                [row["vat_rate"] for row in rows],
+            )
 
             # Update invoice totals
-            invoice.subtotal = subtotal
-            invoice.vat_amount = vat_amount
-            invoice.total_amount = subtotal + vat_amount
+            invoice.subtotal = totals["subtotal"]
+            invoice.vat_amount = totals["vat_amount"]
+            invoice.total_amount = totals["total_amount"]
 
         invoice.updated_at = datetime.utcnow()
+        invalidation.publish("invoices", invoice.company_id, invoice.id)
         db.session.commit()
 
         return (
@@ -481,7 +470,7 @@ def update_invoice(invoice_id):
         return jsonify({"error": str(e)}), 500
 
 
-@invoices_bp.route("/<int:invoice_id>", methods=["DELETE"])
+@invoices_bp.route("/<invoice_id>", methods=["DELETE"])
 @jwt_required()
 def delete_invoice(invoice_id):
     """Delete invoice (only if draft)"""
@@ -514,6 +503,7 @@ def delete_invoice(invoice_id):
 
         # Delete invoice
         db.session.delete(invoice)
+        invalidation.publish("invoices", invoice.company_id, invoice.id)
         db.session.commit()
 
         return jsonify({"message": "Invoice deleted successfully"}), 200
@@ -523,6 +513,79 @@ def delete_invoice(invoice_id):
         return jsonify({"error": str(e)}), 500
 
 
+@invoices_bp.route("/<invoice_id>/payments", methods=["POST"])
+@jwt_required()
+def register_payment(invoice_id):
+    """Register a (partial) payment of a sent or overdue invoice"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+
+        if not user or not user.company_id:
+            return (
+                jsonify({"error": "User not found or not associated with company"}),
+                404,
+            )
+
+        # Check permissions
+        if user.role not in ["admin", "manager", "financial"]:
+            return jsonify({"error": "Insufficient permissions"}), 403
+
+        invoice = Invoice.query.filter_by(
+            id=invoice_id, company_id=user.company_id
+        ).first()
+        if not invoice:
+            return jsonify({"error": "Invoice not found"}), 404
+
+        if invoice.status not in ["sent", "overdue"]:
+            return jsonify({"error": "Can only register payments of sent or overdue invoices"}), 400
+
+        data = request.get_json() or {}
+        if not data.get("amount"):
+            return jsonify({"error": "amount is required"}), 400
+        amount = Decimal(str(data["amount"]))
+        open_amount = invoice.total_amount - invoice.paid_amount
+        if amount <= 0 or amount > open_amount:
+            return (
+                jsonify({"error": f"Amount must be between 0 and the open amount {open_amount}"}),
+                400,
+            )
+
+        invoice.paid_amount += amount
+        invoice.payment_date = (
+            datetime.strptime(data["payment_date"], "%Y-%m-%d").date()
+            if data.get("payment_date")
+            else datetime.now().date()
+        )
+        if data.get("payment_reference"):
+            invoice.payment_reference = data["payment_reference"]
+        if invoice.paid_amount >= invoice.total_amount:
+            invoice.status = "paid"
+        invoice.updated_at = datetime.utcnow()
+
+        invalidation.publish("invoices", invoice.company_id, invoice.id)
+        db.session.commit()
+
+        return (
+            jsonify(
+                {
+                    "id": invoice.id,
+                    "paid_amount": invoice.paid_amount,
+                    "status": invoice.status,
+                    "message": "Payment registered successfully",
+                }
+            ),
+            200,
+        )
+
+    except (ArithmeticError, ValueError) as e:
+        db.session.rollback()
+        return jsonify({"error": f"Invalid data format: {str(e)}"}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+
 @invoices_bp.route("/from-work-orders", methods=["POST"])
 @jwt_required()
 def create_invoice_from_work_orders():
@@ -547,110 +610,134 @@ def create_invoice_from_work_orders():
         if not work_order_ids:
             return jsonify({"error": "work_order_ids is required"}), 400
 
-        # Get work orders
-        work_orders = WorkOrder.query.filter(
-            WorkOrder.id.in_(work_order_ids),
-            WorkOrder.company_id == user.company_id,
-            WorkOrder.status == "completed",
-        ).all()
+        # Get completed work orders with their lines and unbilled hours
+        groups = collect_billable(user.company_id, work_order_ids=work_order_ids)
 
-        if not work_orders:
+        if not groups:
             return jsonify({"error": "No completed work orders found"}), 404
 
         # Check if all work orders belong to same customer
-        customer_ids = list(set([wo.customer_id for wo in work_orders]))
-        if len(customer_ids) > 1:
+        if len(groups) > 1:
             return (
                 jsonify({"error": "All work orders must belong to the same customer"}),
                 400,
             )
 
-        customer_id = customer_ids[0]
+        invoice = create_invoices(
+            user.company_id,
+            groups,
+            user_id=user.id,
+            payment_terms=data.get("payment_terms"),
+        )[0]
 
-        # Generate invoice number
-        year = datetime.now().year
-        last_invoice = (
-            Invoice.query.filter_by(company_id=user.company_id)
-            .filter(Invoice.invoice_number.like(f"F{year}-%"))
-            .order_by(Invoice.invoice_number.desc())
-            .first()
+        return (
+            jsonify(
+                {
+                    "id": invoice.id,
+                    "invoice_number": invoice.invoice_number,
+                    "total_amount": invoice.total_amount,
+                    "work_orders_count": len(groups[0]["work_orders"]),
+                    "message": "Combined invoice created successfully",
+                }
+            ),
+            201,
         )
 
-        if last_invoice:
-            last_number = int(last_invoice.invoice_number.split("-")[1])
-            invoice_number = f"F{year}-{last_number + 1:04d}"
-        else:
-            invoice_number = f"F{year}-0001"
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
 
-        # Create invoice
-        invoice_date = datetime.now().date()
-        payment_terms = data.get("payment_terms", 30)
-        due_date = invoice_date + timedelta(days=payment_terms)
 
-        invoice = Invoice(
-            invoice_number=invoice_number,
-            company_id=user.company_id,
-            customer_id=customer_id,
-            invoice_date=invoice_date,
-            due_date=due_date,
-            status="draft",
-            payment_terms=payment_terms,
-            notes=f"Combined invoice for work orders: {', '.join([wo.work_order_number for wo in work_orders])}",
-            work_order_ids=work_order_ids,
-            created_by=current_user_id,
-        )
+def _parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d").date() if value else None
 
-        db.session.add(invoice)
-        db.session.flush()
 
-        # Add items from work orders
-        subtotal = Decimal("0")
-        vat_amount = Decimal("0")
+@invoices_bp.route("/billing-run", methods=["POST"])
+@jwt_required()
+def billing_run():
+    """Invoice all completed, uninvoiced work orders and hours, one invoice per customer"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
 
-        for work_order in work_orders:
-            for wo_item in work_order.items:
-                item = InvoiceItem(
-                    invoice_id=invoice.id,
-                    article_id=wo_item.article_id,
-                    description=f"{wo_item.description} (Work Order: {work_order.work_order_number})",
-                    quantity=wo_item.quantity,
-                    unit_price=wo_item.unit_price,
-                    line_total=wo_item.line_total,
-                    vat_rate=wo_item.vat_rate,
-                )
+        if not user or not user.company_id:
+            return (
+                jsonify({"error": "User not found or not associated with company"}),
+                404,
+            )
 
-                db.session.add(item)
+        # Check permissions
+        if user.role not in ["admin", "manager", "financial"]:
+            return jsonify({"error": "Insufficient permissions"}), 403
 
-                subtotal += wo_item.line_total
-                vat_amount += wo_item.line_total * (wo_item.vat_rate / 100)
+        data = request.get_json() or {}
+        statuses = data.get("statuses") or list(BILLABLE_STATUSES)
+        if "invoiced" in statuses:
+            return jsonify({"error": "Invoiced work orders cannot be billed again"}), 400
+
+        report = run_billing(
+            user.company_id,
+            user_id=user.id,
+            date_from=_parse_date(data.get("date_from")),
+            date_to=_parse_date(data.get("date_to")),
+            statuses=statuses,
+            customer_ids=data.get("customer_ids"),
+            dry_run=bool(data.get("dry_run", False)),
+            invoice_date=_parse_date(data.get("invoice_date")),
+            payment_terms=data.get("payment_terms"),
+            chunk_size=max(1, int(data.get("chunk_size", 50))),
+        )
 
-        # Update invoice totals
-        invoice.subtotal = subtotal
-        invoice.vat_rate = Decimal("21")
-        invoice.vat_amount = vat_amount
-        invoice.total_amount = subtotal + vat_amount
+        return (
+            jsonify(report),
+            200 if report["dry_run"] else 201,
+        )
 
-        # Mark work orders as invoiced
-        for work_order in work_orders:
-            work_order.status = "invoiced"
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"error": f"Invalid data format: {str(e)}"}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
 
-        db.session.commit()
 
-        return (
-            jsonify(
-                {
-                    "id": invoice.id,
-                    "invoice_number": invoice.invoice_number,
-                    "total_amount": float(invoice.total_amount),
-                    "work_orders_count": len(work_orders),
-                    "message": "Combined invoice created successfully",
-                }
-            ),
-            201,
+@invoices_bp.route("/billing-queue", methods=["GET"])
+@jwt_required()
+def get_billing_queue():
+    """Get billable, uninvoiced hours per customer"""
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+
+        if not user or not user.company_id:
+            return (
+                jsonify({"error": "User not found or not associated with company"}),
+                404,
+            )
+
+        queue = billing_queue(user.company_id)
+
+        return jsonify(
+            {
+                "customers": [
+                    {
+                        "customer_id": row["customer_id"],
+                        "customer_name": row["customer_name"],
+                        "time_entry_count": row["time_entry_count"],
+                        "work_order_count": row["work_order_count"],
+                        "hours": row["hours"],
+                        "amount": row["amount"],
+                        "oldest_date": row["oldest_date"],
+                        "newest_date": row["newest_date"],
+                    }
+                    for row in queue
+                ],
+                "total_hours": sum(row["hours"] for row in queue),
+                "total_amount": sum(row["amount"] for row in queue),
+            }
         )
 
     except Exception as e:
-        db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
 
@@ -717,3 +804,75 @@ def get_invoice_stats():
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+
+def _aging_csv(report):
+    """Yield the aging report as CSV, one customer per line."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def line(values):
+        writer.writerow(values)
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    def money(value):
+        return f"{Decimal(str(value)):.2f}"
+
+    names = [name for name, _ in AGING_BUCKETS] + ["total"]
+    yield line(["customer_id", "customer_name", "invoice_count", "oldest_due_date", *names])
+    for customer in report["customers"]:
+        yield line([
+            customer["customer_id"],
+            customer["customer_name"],
+            customer["invoice_count"],
+            customer["oldest_due_date"] or "",
+            *(money(customer[name]) for name in names),
+        ])
+    yield line(["", "Total", "", "", *(money(report["totals"][name]) for name in names)])
+
+
+@invoices_bp.route("/aging", methods=["GET"])
+@jwt_required()
+def get_aging_report():
+    """Get open amounts per customer by days past due
+
+    Pass ``format=csv`` for a CSV download.
+    """
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+
+        if not user or not user.company_id:
+            return (
+                jsonify({"error": "User not found or not associated with company"}),
+                404,
+            )
+
+        # Check permissions
+        if user.role not in ["admin", "manager", "financial"]:
+            return jsonify({"error": "Insufficient permissions"}), 403
+
+        company_id = user.company_id
+        today = date.today()
+        report = cache.get_or_set(
+            str(company_id),
+            _aging_cache_name(today),
+            lambda: aging_report(company_id, today),
+        )
+
+        if request.args.get("format") == "csv":
+            return Response(
+                _aging_csv(report),
+                mimetype="text/csv",
+                headers={
+                    "Content-Disposition": f'attachment; filename="aging-{today.isoformat()}.csv"'
+                },
+            )
+
+        return jsonify(report), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
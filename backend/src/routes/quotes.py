@@ -3,6 +3,20 @@ from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from src.models.database import db, Quote, QuoteLine, Customer, Location, Article, User, Company
 from datetime import datetime, date, timedelta
 from decimal import Decimal
+from src.services.document_lines import (
+    bulk_insert_lines,
+    build_line_row,
+    find_missing_article,
+    prefetch_articles,
+)
+from src.services.document_totals import (
+    maybe_verify_totals,
+    recalculate_totals,
+    reset_totals,
+    split_gross,
+)
+from src.services.http_cache import conditional, quote_validator
+from sqlalchemy.orm import joinedload, selectinload
 
 quotes_bp = Blueprint('quotes', __name__)
 
@@ -47,22 +61,13 @@ def generate_quote_number(company_id):
     return f"{prefix}{next_number:04d}"
 
 def calculate_quote_totals(quote):
-    """Calculate quote totals from lines"""
-    subtotal = Decimal('0')
-    vat_amount = Decimal('0')
-    
-    for line in quote.lines:
-        line_total = Decimal(line.line_total)
-        vat_rate = Decimal(line.vat_rate)
-        line_subtotal = line_total / (1 + vat_rate / 100)
-        line_vat = line_total - line_subtotal
-        
-        subtotal += line_subtotal
-        vat_amount += line_vat
-    
-    quote.subtotal = subtotal
-    quote.vat_amount = vat_amount
-    quote.total_amount = subtotal + vat_amount
+    """Calculate quote totals from lines (full recompute)"""
+    recalculate_totals(quote)
+
+def _set_totals_from_rows(quote, rows):
+    """Set quote totals from freshly inserted line rows without re-reading them"""
+    reset_totals(quote, [split_gross(row['line_total'], row['vat_rate']) for row in rows])
+    maybe_verify_totals(quote)
 
 @quotes_bp.route('/', methods=['GET'])
 @jwt_required()
@@ -74,7 +79,7 @@ def get_quotes():
         status = request.args.get('status')
         customer_id = request.args.get('customer_id')
 
-        query = Quote.query
+        query = Quote.query.options(joinedload(Quote.customer))
         
         if status:
             query = query.filter(Quote.status == status)
@@ -95,11 +100,11 @@ def get_quotes():
                 'customer_name': quote.customer.company_name,
                 'customer_id': quote.customer_id,
                 'title': quote.title,
-                'quote_date': quote.quote_date.isoformat(),
-                'valid_until': quote.valid_until.isoformat() if quote.valid_until else None,
+                'quote_date': quote.quote_date,
+                'valid_until': quote.valid_until,
                 'status': quote.status,
-                'total_amount': float(quote.total_amount),
-                'created_at': quote.created_at.isoformat(),
+                'total_amount': quote.total_amount,
+                'created_at': quote.created_at,
                 'line_count': len(quote.lines)
             } for quote in quotes.items],
             'pagination': {
@@ -117,10 +122,15 @@ def get_quotes():
 
 @quotes_bp.route('/<quote_id>', methods=['GET'])
 @jwt_required()
+@conditional(quote_validator)
 def get_quote(quote_id):
     """Get specific quote with lines"""
     try:
-        quote = Quote.query.get(quote_id)
+        quote = Quote.query.options(
+            joinedload(Quote.customer),
+            joinedload(Quote.location),
+            selectinload(Quote.lines).joinedload(QuoteLine.article),
+        ).get(quote_id)
         
         if not quote:
             return jsonify({'error': 'Quote not found'}), 404
@@ -135,25 +145,25 @@ def get_quote(quote_id):
                 'location_name': quote.location.name if quote.location else None,
                 'title': quote.title,
                 'description': quote.description,
-                'quote_date': quote.quote_date.isoformat(),
-                'valid_until': quote.valid_until.isoformat() if quote.valid_until else None,
+                'quote_date': quote.quote_date,
+                'valid_until': quote.valid_until,
                 'status': quote.status,
-                'subtotal': float(quote.subtotal),
-                'vat_amount': float(quote.vat_amount),
-                'total_amount': float(quote.total_amount),
+                'subtotal': quote.subtotal,
+                'vat_amount': quote.vat_amount,
+                'total_amount': quote.total_amount,
                 'notes': quote.notes,
                 'terms_conditions': quote.terms_conditions,
-                'created_at': quote.created_at.isoformat(),
+                'created_at': quote.created_at,
                 'lines': [{
                     'id': line.id,
                     'article_id': line.article_id,
                     'article_code': line.article.code if line.article else None,
                     'article_name': line.article.name if line.article else None,
                     'description': line.description,
-                    'quantity': float(line.quantity),
-                    'unit_price': float(line.unit_price),
-                    'vat_rate': float(line.vat_rate),
-                    'line_total': float(line.line_total),
+                    'quantity': line.quantity,
+                    'unit_price': line.unit_price,
+                    'vat_rate': line.vat_rate,
+                    'line_total': line.line_total,
                     'sort_order': line.sort_order
                 } for line in sorted(quote.lines, key=lambda x: x.sort_order)]
             }
@@ -179,6 +189,15 @@ def create_quote():
         if not Customer.query.get(data['customer_id']):
              return jsonify({'error': 'Customer not found'}), 404
         
+        lines_data = [
+            line_data for line_data in data.get('lines') or []
+            if all(k in line_data for k in ['description', 'quantity', 'unit_price'])
+        ]
+        articles = prefetch_articles(company_id, [l.get('article_id') for l in lines_data])
+        missing_article = find_missing_article(lines_data, articles)
+        if missing_article:
+            return jsonify({'error': f'Article {missing_article} not found'}), 404
+        
         quote_number = generate_quote_number(company_id)
         if not quote_number:
             return jsonify({'error': 'Could not generate quote number'}), 500
@@ -197,36 +216,18 @@ def create_quote():
             valid_until=valid_until,
             notes=data.get('notes'),
             terms_conditions=data.get('terms_conditions'),
-            created_by=user_id
+            created_by_id=user_id
         )
         
         db.session.add(quote)
         db.session.flush()
         
-        if data.get('lines'):
-            for i, line_data in enumerate(data['lines']):
-                if not all(k in line_data for k in ['description', 'quantity', 'unit_price']):
-                    continue
-                
-                quantity = Decimal(str(line_data['quantity']))
-                unit_price = Decimal(str(line_data['unit_price']))
-                vat_rate = Decimal(str(line_data.get('vat_rate', 21.00)))
-                line_total = quantity * unit_price
-                
-                line = QuoteLine(
-                    quote_id=quote.id,
-                    article_id=line_data.get('article_id'),
-                    description=line_data['description'],
-                    quantity=quantity,
-                    unit_price=unit_price,
-                    vat_rate=vat_rate,
-                    line_total=line_total,
-                    sort_order=i
-                )
-                db.session.add(line)
-        
-        db.session.flush()
-        calculate_quote_totals(quote)
+        rows = [
+            build_line_row('quote_id', quote.id, line_data, i, articles)
+            for i, line_data in enumerate(lines_data)
+        ]
+        bulk_insert_lines(QuoteLine, rows)
+        _set_totals_from_rows(quote, rows)
         
         db.session.commit()
         
@@ -267,31 +268,24 @@ def update_quote(quote_id):
                     setattr(quote, field, data[field])
         
         if 'lines' in data:
-            QuoteLine.query.filter_by(quote_id=quote.id).delete()
+            lines_data = [
+                line_data for line_data in data['lines'] or []
+                if all(k in line_data for k in ['description', 'quantity', 'unit_price'])
+            ]
+            articles = prefetch_articles(quote.company_id, [l.get('article_id') for l in lines_data])
+            missing_article = find_missing_article(lines_data, articles)
+            if missing_article:
+                db.session.rollback()
+                return jsonify({'error': f'Article {missing_article} not found'}), 404
             
-            for i, line_data in enumerate(data['lines']):
-                if not all(k in line_data for k in ['description', 'quantity', 'unit_price']):
-                    continue
-                
-                quantity = Decimal(str(line_data['quantity']))
-                unit_price = Decimal(str(line_data['unit_price']))
-                vat_rate = Decimal(str(line_data.get('vat_rate', 21.00)))
-                line_total = quantity * unit_price
-                
-                line = QuoteLine(
-                    quote_id=quote.id,
-                    article_id=line_data.get('article_id'),
-                    description=line_data['description'],
-                    quantity=quantity,
-                    unit_price=unit_price,
-                    vat_rate=vat_rate,
-                    line_total=line_total,
-                    sort_order=i
-                )
-                db.session.add(line)
-            
-            db.session.flush()
-            calculate_quote_totals(quote)
+            QuoteLine.query.filter_by(quote_id=quote.id).delete()
+            rows = [
+                build_line_row('quote_id', quote.id, line_data, i, articles)
+                for i, line_data in enumerate(lines_data)
+            ]
+            bulk_insert_lines(QuoteLine, rows)
+            _set_totals_from_rows(quote, rows)
+            quote.updated_at = datetime.utcnow()
         
         db.session.commit()
         
@@ -356,27 +350,24 @@ def duplicate_quote(quote_id):
             status='draft',
             notes=original_quote.notes,
             terms_conditions=original_quote.terms_conditions,
-            created_by=user_id
+            created_by_id=user_id
         )
         
         db.session.add(new_quote)
         db.session.flush()
         
-        for original_line in original_quote.lines:
-            new_line = QuoteLine(
-                quote_id=new_quote.id,
-                article_id=original_line.article_id,
-                description=original_line.description,
-                quantity=original_line.quantity,
-                unit_price=original_line.unit_price,
-                vat_rate=original_line.vat_rate,
-                line_total=original_line.line_total,
-                sort_order=original_line.sort_order
-            )
-            db.session.add(new_line)
-        
-        db.session.flush()
-        calculate_quote_totals(new_quote)
+        rows = [{
+            'quote_id': new_quote.id,
+            'article_id': original_line.article_id,
+            'description': original_line.description,
+            'quantity': original_line.quantity,
+            'unit_price': original_line.unit_price,
+            'vat_rate': original_line.vat_rate,
+            'line_total': original_line.line_total,
+            'sort_order': original_line.sort_order
+        } for original_line in original_quote.lines]
+        bulk_insert_lines(QuoteLine, rows)
+        _set_totals_from_rows(new_quote, rows)
         
         db.session.commit()
         
@@ -13,6 +13,23 @@ from src.models.database import (
 )
 from datetime import datetime, date
 from decimal import Decimal
+from src.services.document_lines import (
+    bulk_insert_lines,
+    build_line_row,
+    find_missing_article,
+    prefetch_articles,
+)
+from src.services.document_totals import (
+    apply_totals_delta,
+    item_contribution,
+    maybe_verify_totals,
+    recalculate_totals,
+    reset_totals,
+    split_gross,
+)
+from src.services import ledger
+from src.services.http_cache import conditional, work_order_validator
+from sqlalchemy.orm import joinedload, raiseload, selectinload
 
 work_orders_bp = Blueprint("work_orders", __name__)
 
@@ -60,32 +77,8 @@ def generate_work_order_number(company_id):
 
 
 def calculate_work_order_totals(work_order):
-    """Calculate work order totals from lines and time entries"""
-    subtotal = Decimal("0")
-    vat_amount = Decimal("0")
-
-    for line in work_order.lines:
-        line_total = Decimal(line.line_total)
-        vat_rate = Decimal(line.vat_rate)
-        line_subtotal = line_total / (1 + vat_rate / 100)
-        line_vat = line_total - line_subtotal
-
-        subtotal += line_subtotal
-        vat_amount += line_vat
-
-    for entry in work_order.time_entries:
-        if entry.is_billable:
-            billable_amount = Decimal(entry.billable_amount)
-            vat_rate = Decimal(entry.vat_rate)
-            entry_subtotal = billable_amount / (1 + vat_rate / 100)
-            entry_vat = billable_amount - entry_subtotal
-
-            subtotal += entry_subtotal
-            vat_amount += entry_vat
-
-    work_order.subtotal = subtotal
-    work_order.vat_amount = vat_amount
-    work_order.total_amount = subtotal + vat_amount
+    """Calculate work order totals from lines and time entries (full recompute)"""
+    recalculate_totals(work_order)
 
 
 @work_orders_bp.route("/", methods=["GET"])
@@ -99,7 +92,12 @@ def get_work_orders():
         customer_id = request.args.get("customer_id")
         technician_id = request.args.get("technician_id")
 
-        query = WorkOrder.query
+        query = WorkOrder.query.options(
+            joinedload(WorkOrder.customer),
+            joinedload(WorkOrder.location),
+            raiseload(WorkOrder.lines),
+            raiseload(WorkOrder.time_entries),
+        )
 
         if status:
             query = query.filter(WorkOrder.status == status)
@@ -125,12 +123,10 @@ def get_work_orders():
                             "customer_id": wo.customer_id,
                             "location_name": wo.location.name if wo.location else None,
                             "title": wo.title,
-                            "work_date": (
-                                wo.work_date.isoformat() if wo.work_date else None
-                            ),
+                            "work_date": wo.work_date,
                             "status": wo.status,
-                            "total_amount": float(wo.total_amount),
-                            "created_at": wo.created_at.isoformat(),
+                            "total_amount": wo.total_amount,
+                            "created_at": wo.created_at,
                         }
                         for wo in work_orders.items
                     ],
@@ -153,10 +149,16 @@ def get_work_orders():
 
 @work_orders_bp.route("/<work_order_id>", methods=["GET"])
 @jwt_required()
+@conditional(work_order_validator)
 def get_work_order(work_order_id):
     """Get specific work order with lines and time entries"""
     try:
-        work_order = WorkOrder.query.get(work_order_id)
+        work_order = WorkOrder.query.options(
+            joinedload(WorkOrder.customer),
+            joinedload(WorkOrder.location),
+            selectinload(WorkOrder.lines).joinedload(WorkOrderLine.article),
+            selectinload(WorkOrder.time_entries).joinedload(WorkOrderTimeEntry.user),
+        ).get(work_order_id)
 
         if not work_order:
             return jsonify({"error": "Work order not found"}), 404
@@ -176,18 +178,14 @@ def get_work_order(work_order_id):
                         ),
                         "title": work_order.title,
                         "description": work_order.description,
-                        "work_date": (
-                            work_order.work_date.isoformat()
-                            if work_order.work_date
-                            else None
-                        ),
+                        "work_date": work_order.work_date,
                         "status": work_order.status,
                         "technician_id": work_order.technician_id,
-                        "subtotal": float(work_order.subtotal),
-                        "vat_amount": float(work_order.vat_amount),
-                        "total_amount": float(work_order.total_amount),
+                        "subtotal": work_order.subtotal,
+                        "vat_amount": work_order.vat_amount,
+                        "total_amount": work_order.total_amount,
                         "notes": work_order.notes,
-                        "created_at": work_order.created_at.isoformat(),
+                        "created_at": work_order.created_at,
                         "lines": [
                             {
                                 "id": line.id,
@@ -199,10 +197,10 @@ def get_work_order(work_order_id):
                                     line.article.name if line.article else None
                                 ),
                                 "description": line.description,
-                                "quantity": float(line.quantity),
-                                "unit_price": float(line.unit_price),
-                                "vat_rate": float(line.vat_rate),
-                                "line_total": float(line.line_total),
+                                "quantity": line.quantity,
+                                "unit_price": line.unit_price,
+                                "vat_rate": line.vat_rate,
+                                "line_total": line.line_total,
                                 "sort_order": line.sort_order,
                             }
                             for line in sorted(
@@ -214,27 +212,15 @@ def get_work_order(work_order_id):
                                 "id": entry.id,
                                 "user_id": entry.user_id,
                                 "user_name": entry.user.full_name,
-                                "date": entry.date.isoformat(),
-                                "start_time": (
-                                    entry.start_time.isoformat()
-                                    if entry.start_time
-                                    else None
-                                ),
-                                "end_time": (
-                                    entry.end_time.isoformat()
-                                    if entry.end_time
-                                    else None
-                                ),
-                                "hours": float(entry.hours),
+                                "date": entry.date,
+                                "start_time": entry.start_time,
+                                "end_time": entry.end_time,
+                                "hours": entry.hours,
                                 "description": entry.description,
                                 "is_billable": entry.is_billable,
-                                "hourly_rate": (
-                                    float(entry.hourly_rate)
-                                    if entry.hourly_rate
-                                    else None
-                                ),
-                                "billable_amount": float(entry.billable_amount),
-                                "vat_rate": float(entry.vat_rate),
+                                "hourly_rate": entry.hourly_rate,
+                                "billable_amount": entry.billable_amount,
+                                "vat_rate": entry.vat_rate,
                             }
                             for entry in work_order.time_entries
                         ],
@@ -265,6 +251,21 @@ def create_work_order():
         if not Customer.query.get(data["customer_id"]):
             return jsonify({"error": "Customer not found"}), 404
 
+        if ledger.over_credit_limit(data["customer_id"]):
+            return jsonify({"error": "Customer credit limit exceeded"}), 400
+
+        lines_data = [
+            line_data
+            for line_data in data.get("lines") or []
+            if all(k in line_data for k in ["description", "quantity", "unit_price"])
+        ]
+        articles = prefetch_articles(
+            company_id, [line_data.get("article_id") for line_data in lines_data]
+        )
+        missing_article = find_missing_article(lines_data, articles)
+        if missing_article:
+            return jsonify({"error": f"Article {missing_article} not found"}), 404
+
         work_order_number = generate_work_order_number(company_id)
         if not work_order_number:
             return jsonify({"error": "Could not generate work order number"}), 500
@@ -285,38 +286,22 @@ def create_work_order():
             status=data.get("status", "planned"),
             technician_id=data.get("technician_id"),
             notes=data.get("notes"),
-            created_by=user_id,
+            created_by_id=user_id,
         )
 
         db.session.add(work_order)
         db.session.flush()
 
-        if data.get("lines"):
-            for i, line_data in enumerate(data["lines"]):
-                if not all(
-                    k in line_data for k in ["description", "quantity", "unit_price"]
-                ):
-                    continue
-
-                quantity = Decimal(str(line_data["quantity"]))
-                unit_price = Decimal(str(line_data["unit_price"]))
-                vat_rate = Decimal(str(line_data.get("vat_rate", 21.00)))
-                line_total = quantity * unit_price
-
-                line = WorkOrderLine(
-                    work_order_id=work_order.id,
-                    article_id=line_data.get("article_id"),
-                    description=line_data["description"],
-                    quantity=quantity,
-                    unit_price=unit_price,
-                    vat_rate=vat_rate,
-                    line_total=line_total,
-                    sort_order=i,
-                )
-                db.session.add(line)
-
-        db.session.flush()
-        calculate_work_order_totals(work_order)
+        rows = [
+            build_line_row("work_order_id", work_order.id, line_data, i, articles)
+            for i, line_data in enumerate(lines_data)
+        ]
+        bulk_insert_lines(WorkOrderLine, rows)
+        reset_totals(
+            work_order,
+            [split_gross(row["line_total"], row["vat_rate"]) for row in rows],
+        )
+        maybe_verify_totals(work_order)
 
         db.session.commit()
 
@@ -393,8 +378,9 @@ def add_time_entry(work_order_id):
 
         db.session.add(time_entry)
 
-        db.session.flush()
-        calculate_work_order_totals(work_order)
+        apply_totals_delta(work_order, added=[item_contribution(time_entry)])
+        maybe_verify_totals(work_order)
+        work_order.updated_at = datetime.utcnow()
 
         db.session.commit()
 
@@ -413,6 +399,99 @@ def add_time_entry(work_order_id):
         return jsonify({"error": str(e)}), 500
 
 
+@work_orders_bp.route("/<work_order_id>/time-entries/<entry_id>", methods=["PUT"])
+@jwt_required()
+def update_time_entry(work_order_id, entry_id):
+    """Update a time entry and adjust the work order totals by the difference"""
+    try:
+        work_order = WorkOrder.query.get(work_order_id)
+
+        if not work_order:
+            return jsonify({"error": "Work order not found"}), 404
+
+        time_entry = WorkOrderTimeEntry.query.filter_by(
+            id=entry_id, work_order_id=work_order.id
+        ).first()
+
+        if not time_entry:
+            return jsonify({"error": "Time entry not found"}), 404
+
+        if time_entry.is_invoiced:
+            return jsonify({"error": "Cannot modify an invoiced time entry"}), 400
+
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "Invalid request"}), 400
+
+        before = item_contribution(time_entry)
+
+        if "hours" in data:
+            time_entry.hours = Decimal(str(data["hours"]))
+        if "hourly_rate" in data:
+            time_entry.hourly_rate = Decimal(str(data["hourly_rate"]))
+        if "vat_rate" in data:
+            time_entry.vat_rate = Decimal(str(data["vat_rate"]))
+        if "is_billable" in data:
+            time_entry.is_billable = data["is_billable"]
+        if "description" in data:
+            time_entry.description = data["description"]
+        if "date" in data:
+            time_entry.date = datetime.strptime(data["date"], "%Y-%m-%d").date()
+
+        hourly_rate = Decimal(time_entry.hourly_rate or 0)
+        time_entry.billable_amount = Decimal("0")
+        if time_entry.is_billable and hourly_rate > 0:
+            time_entry.billable_amount = Decimal(time_entry.hours) * hourly_rate
+
+        apply_totals_delta(
+            work_order, added=[item_contribution(time_entry)], removed=[before]
+        )
+        maybe_verify_totals(work_order)
+        work_order.updated_at = datetime.utcnow()
+
+        db.session.commit()
+
+        return jsonify({"message": "Time entry updated successfully"}), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+
+@work_orders_bp.route("/<work_order_id>/time-entries/<entry_id>", methods=["DELETE"])
+@jwt_required()
+def delete_time_entry(work_order_id, entry_id):
+    """Remove a time entry and subtract it from the work order totals"""
+    try:
+        work_order = WorkOrder.query.get(work_order_id)
+
+        if not work_order:
+            return jsonify({"error": "Work order not found"}), 404
+
+        time_entry = WorkOrderTimeEntry.query.filter_by(
+            id=entry_id, work_order_id=work_order.id
+        ).first()
+
+        if not time_entry:
+            return jsonify({"error": "Time entry not found"}), 404
+
+        if time_entry.is_invoiced:
+            return jsonify({"error": "Cannot delete an invoiced time entry"}), 400
+
+        apply_totals_delta(work_order, removed=[item_contribution(time_entry)])
+        db.session.delete(time_entry)
+        maybe_verify_totals(work_order)
+        work_order.updated_at = datetime.utcnow()
+
+        db.session.commit()
+
+        return jsonify({"message": "Time entry deleted successfully"}), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+
 @work_orders_bp.route("/<work_order_id>/status", methods=["PUT"])
 @jwt_required()
 def update_work_order_status(work_order_id):
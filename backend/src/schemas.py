@@ -1,31 +1,53 @@
+from functools import lru_cache
+
 from marshmallow_sqlalchemy import SQLAlchemyAutoSchema, auto_field
-from marshmallow import fields, validate
+from marshmallow import ValidationError, fields, pre_load, validate
+from sqlalchemy.orm import load_only
 from src.models.database import (
     Customer, Article, ArticleCategory, Location, 
     Quote, QuoteLine, Invoice, InvoiceItem, 
     WorkOrder, WorkOrderLine, WorkOrderTimeEntry
 )
 
-class LocationSchema(SQLAlchemyAutoSchema):
+class ServerAssignedId:
+    """Ignore an ``id`` in the input.
+
+    With ``load_instance`` a loaded ``id`` would fetch that row and write the
+    input over it; the create endpoints must insert a new row instead.
+    """
+
+    @pre_load
+    def drop_id(self, data, **kwargs):
+        if isinstance(data, dict) and "id" in data:
+            data = {key: value for key, value in data.items() if key != "id"}
+        return data
+
+
+class LocationSchema(ServerAssignedId, SQLAlchemyAutoSchema):
     class Meta:
         model = Location
         load_instance = True
         include_fk = True
 
+    id = auto_field(dump_only=True)
     name = auto_field(required=True, validate=validate.Length(min=2, max=255))
     address = auto_field(required=True, validate=validate.Length(min=5, max=255))
 
-class CustomerSchema(SQLAlchemyAutoSchema):
+class CustomerSchema(ServerAssignedId, SQLAlchemyAutoSchema):
     class Meta:
         model = Customer
         load_instance = True
         include_fk = True
-        exclude = ("created_at", "updated_at", "created_by_id")
+        exclude = ("updated_at", "created_by_id")
 
+    id = auto_field(dump_only=True)
     company_name = auto_field(required=True, validate=validate.Length(min=2, max=255))
     email = auto_field(required=True, validate=validate.Email())
     locations = fields.Nested(LocationSchema, many=True, required=False)
     company_id = auto_field(dump_only=True)
+    open_balance = auto_field(dump_only=True)
+    created_at = auto_field(dump_only=True)
+    location_count = fields.Integer(dump_only=True)
 
 class ArticleCategorySchema(SQLAlchemyAutoSchema):
     class Meta:
@@ -35,17 +57,28 @@ class ArticleCategorySchema(SQLAlchemyAutoSchema):
 
     name = auto_field(required=True, validate=validate.Length(min=2, max=255))
 
-class ArticleSchema(SQLAlchemyAutoSchema):
+class ArticleSchema(ServerAssignedId, SQLAlchemyAutoSchema):
     class Meta:
         model = Article
         load_instance = True
         include_fk = True
-        exclude = ("created_at", "updated_at", "created_by_id")
+        exclude = ("updated_at", "created_by_id")
 
+    id = auto_field(dump_only=True)
     code = auto_field(required=True, validate=validate.Length(min=1, max=100))
     name = auto_field(required=True, validate=validate.Length(min=2, max=255))
     selling_price = auto_field(required=True, validate=validate.Range(min=0))
-    vat_rate = auto_field(required=True, validate=validate.Range(min=0, max=100))
+    vat_rate = auto_field(validate=validate.Range(min=0, max=100))
+    company_id = auto_field(dump_only=True)
+    created_at = auto_field(dump_only=True)
+    category_name = fields.Method("get_category_name")
+    is_low_stock = fields.Method("get_is_low_stock")
+
+    def get_category_name(self, article):
+        return article.category.name if article.category else None
+
+    def get_is_low_stock(self, article):
+        return article.stock_quantity <= article.min_stock_level
 
 class QuoteLineSchema(SQLAlchemyAutoSchema):
     class Meta:
@@ -118,3 +151,68 @@ class WorkOrderSchema(SQLAlchemyAutoSchema):
     title = auto_field(required=True, validate=validate.Length(min=3))
     lines = fields.Nested(WorkOrderLineSchema, many=True, required=False)
     time_entries = fields.Nested(WorkOrderTimeEntrySchema, many=True, required=False)
+
+
+# Compiled once at import time: building an auto schema inspects the model
+# and creates every field, which is too costly to repeat per request. The
+# list variants leave out nested relationships. Instances are shared between
+# threads, so pass per-call state as arguments (e.g. ``session=``), never as
+# attributes.
+CUSTOMER_LIST_FIELDS = (
+    "id", "company_name", "contact_person", "email", "phone", "mobile",
+    "address", "postal_code", "city", "country", "vat_number",
+    "payment_terms", "credit_limit", "open_balance", "notes", "is_active",
+    "created_at", "location_count",
+)
+ARTICLE_LIST_FIELDS = (
+    "id", "code", "name", "description", "unit", "purchase_price",
+    "selling_price", "vat_rate", "stock_quantity", "min_stock_level",
+    "supplier", "supplier_code", "is_active", "category_id", "category_name",
+    "is_low_stock", "created_at",
+)
+# Columns that dump-only list fields are computed from
+ARTICLE_FIELD_COLUMNS = {
+    "category_name": ("category_id",),
+    "is_low_stock": ("stock_quantity", "min_stock_level"),
+}
+
+customer_schema = CustomerSchema()
+customer_list_schema = CustomerSchema(many=True, only=CUSTOMER_LIST_FIELDS)
+article_schema = ArticleSchema()
+article_list_schema = ArticleSchema(many=True, only=ARTICLE_LIST_FIELDS)
+
+
+def validation_error(err):
+    """400 response body for a marshmallow ValidationError."""
+    return {"error": "Validation failed", "errors": err.messages}
+
+
+def sparse_fieldset(raw, allowed):
+    """Parse a ``?fields=a,b,c`` argument into a tuple of field names.
+
+    Returns None when no fieldset was requested. ``id`` is always included.
+    Raises ValidationError for unknown fields.
+    """
+    if not raw:
+        return None
+    requested = [name.strip() for name in raw.split(",") if name.strip()]
+    unknown = sorted(set(requested) - set(allowed))
+    if unknown:
+        raise ValidationError({"fields": [f"Unknown field: {name}" for name in unknown]})
+    return tuple(name for name in allowed if name == "id" or name in requested)
+
+
+@lru_cache(maxsize=64)
+def list_schema(schema_class, only):
+    """Shared list schema for a sparse fieldset (``only`` as returned by sparse_fieldset)."""
+    return schema_class(many=True, only=only)
+
+
+def projection(model, only, field_columns=None):
+    """``load_only`` option loading just the columns the fieldset needs."""
+    field_columns = field_columns or {}
+    column_names = set(model.__mapper__.column_attrs.keys())
+    names = set()
+    for name in only:
+        names.update(field_columns.get(name, (name,)))
+    return load_only(*(getattr(model, name) for name in sorted(names & column_names)))
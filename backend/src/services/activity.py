@@ -0,0 +1,165 @@
+"""Write-coalesced last-login timestamps.
+
+Logins record the time in memory instead of updating the user row. Each app
+keeps the latest time per user and writes them with one bulk UPDATE every
+``LAST_LOGIN_FLUSH_INTERVAL`` seconds (default 30), as soon as
+``LAST_LOGIN_FLUSH_SIZE`` users (default 500) are pending, and when the
+worker exits. On PostgreSQL the flush is a single
+``UPDATE users ... FROM (VALUES ...)``; other databases get an executemany.
+
+A killed worker loses at most one interval of last-login times, which is the
+price for keeping logins free of row writes. Times never move backwards:
+rows that already hold a later value are left alone.
+"""
+import atexit
+import logging
+import threading
+import weakref
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import DateTime, bindparam, column, or_, update, values
+
+from src.models.database import db, GUID, User
+
+logger = logging.getLogger(__name__)
+
+_buffers = weakref.WeakSet()
+
+
+class LastLoginBuffer:
+    """Pending last-login times per user id, flushed in bulk."""
+
+    def __init__(self, app, flush_size=500, interval=30):
+        self.app = app
+        self.flush_size = flush_size
+        self.interval = interval
+        self.flushed = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def record(self, user_id, when=None):
+        when = when or datetime.utcnow()
+        with self._lock:
+            self._merge({user_id: when})
+            full = len(self._pending) >= self.flush_size
+        if self.interval <= 0:
+            # No flush thread: the request that fills the buffer writes it
+            if full:
+                self.flush()
+            return
+        self._ensure_thread()
+        if full:
+            self._wakeup.set()
+
+    def pending(self, user_id):
+        """The buffered, not yet written, time for a user, if any."""
+        with self._lock:
+            return self._pending.get(user_id)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """Write the buffered times; returns the number of users written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            try:
+                with self.app.app_context():
+                    _write(batch)
+            except Exception:
+                logger.exception("Writing %d last-login times failed; retrying with the next flush", len(batch))
+                with self._lock:
+                    self._merge(batch)
+                return 0
+            self.flushed += len(batch)
+            return len(batch)
+
+    def _merge(self, times):
+        for user_id, when in times.items():
+            if when > self._pending.get(user_id, datetime.min):
+                self._pending[user_id] = when
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="last-login-flush", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+def _write(batch):
+    users = User.__table__
+    if db.engine.dialect.name == "postgresql":
+        pending = values(
+            column("user_id", GUID()), column("last_login", DateTime()), name="pending"
+        ).data(list(batch.items()))
+        statement = (
+            update(users)
+            .where(users.c.id == pending.c.user_id)
+            .where(or_(users.c.last_login.is_(None), users.c.last_login < pending.c.last_login))
+            .values(last_login=pending.c.last_login)
+        )
+        with db.engine.begin() as connection:
+            connection.execute(statement)
+        return
+
+    statement = (
+        update(users)
+        .where(users.c.id == bindparam("user_id"))
+        .where(or_(users.c.last_login.is_(None), users.c.last_login < bindparam("when")))
+        .values(last_login=bindparam("when"))
+    )
+    rows = [{"user_id": user_id, "when": when} for user_id, when in batch.items()]
+    with db.engine.begin() as connection:
+        connection.execute(statement, rows)
+
+
+def _buffer():
+    return current_app.extensions["last_login"]
+
+
+def record_login(user_id, when=None):
+    _buffer().record(user_id, when)
+
+
+def last_login(user):
+    """The user's last login, including a buffered one."""
+    return _buffer().pending(user.id) or user.last_login
+
+
+def flush():
+    return _buffer().flush()
+
+
+@atexit.register
+def shutdown():
+    """Write the pending times of every app in this process."""
+    for buffer in list(_buffers):
+        buffer.flush()
+
+
+def init_app(app):
+    """Create the app's buffer; its flush thread starts with the first login."""
+    app.config.setdefault("LAST_LOGIN_FLUSH_SIZE", 500)
+    app.config.setdefault("LAST_LOGIN_FLUSH_INTERVAL", 30)
+    buffer = LastLoginBuffer(
+        app,
+        flush_size=app.config["LAST_LOGIN_FLUSH_SIZE"],
+        interval=app.config["LAST_LOGIN_FLUSH_INTERVAL"],
+    )
+    _buffers.add(buffer)
+    app.extensions["last_login"] = buffer
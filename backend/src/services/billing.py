@@ -0,0 +1,461 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import and_, case, false, func, literal, select, true, update
+
+from src.models.database import (
+    db,
+    Company,
+    Customer,
+    Invoice,
+    InvoiceItem,
+    WorkOrder,
+    WorkOrderLine,
+    WorkOrderTimeEntry,
+)
+from src.services import invalidation
+from src.services.document_lines import bulk_insert_lines
+from src.services.vat import compute_totals
+
+BILLABLE_STATUSES = ("completed",)
+
+# Upper bound for the number of ids bound into a single IN (...) list.
+IN_CLAUSE_SIZE = 500
+
+OPEN_STATUSES = ("sent", "overdue")
+
+# Aging buckets as (name, most days past due); invoices not yet due count
+# as 0 days past due.
+AGING_BUCKETS = (
+    ("days_0_30", 30),
+    ("days_31_60", 60),
+    ("days_61_90", 90),
+    ("days_90_plus", None),
+)
+
+
+def unbilled_time_entries():
+    """Filter for billable, uninvoiced hours.
+
+    Matches the predicate of the ``idx_time_registrations_unbilled`` partial
+    index term for term, so the planner can use it.
+    """
+    return (
+        WorkOrderTimeEntry.is_billable == true(),
+        WorkOrderTimeEntry.is_invoiced == false(),
+    )
+
+
+def overdue_invoices(today):
+    """Filter for sent invoices past their due date that are not fully paid.
+
+    The status is rendered inline so the predicate implies the one of the
+    ``idx_invoices_sent_due_date`` partial index, also for SQLite.
+    """
+    return (
+        Invoice.status == literal("sent", literal_execute=True),
+        Invoice.due_date < today,
+        Invoice.paid_amount < Invoice.total_amount,
+    )
+
+
+def mark_overdue_invoices(today=None):
+    """Move every overdue invoice from ``sent`` to ``overdue`` in one UPDATE.
+
+    No invoice is loaded. Returns the number of invoices changed per company.
+    On PostgreSQL the counts come from the UPDATE itself through
+    ``RETURNING`` in a CTE; other databases count with the same filter first,
+    in the same transaction.
+    """
+    today = today or date.today()
+    invoices = Invoice.__table__
+    statement = update(invoices).where(*overdue_invoices(today)).values(status="overdue")
+    if db.engine.dialect.name == "postgresql":
+        updated = statement.returning(invoices.c.company_id).cte("updated")
+        rows = db.session.execute(
+            select(updated.c.company_id, func.count()).group_by(updated.c.company_id)
+        ).all()
+    else:
+        rows = db.session.execute(
+            select(Invoice.company_id, func.count())
+            .where(*overdue_invoices(today))
+            .group_by(Invoice.company_id)
+        ).all()
+        db.session.execute(statement)
+
+    counts = {company_id: count for company_id, count in rows}
+    for company_id in counts:
+        invalidation.publish("invoices", company_id)
+    db.session.commit()
+    return counts
+
+
+def aging_report(company_id, today=None):
+    """Open amounts per customer and aging bucket, in one grouped query.
+
+    An invoice is open when it is sent or overdue and not fully paid; its
+    open amount is ``total_amount - paid_amount``, aged by its due date (the
+    invoice date when it has none). The buckets are sums of ``CASE``
+    expressions over cutoff dates computed here, so the query is the same on
+    every database.
+    """
+    today = today or date.today()
+    open_amount = Invoice.total_amount - func.coalesce(Invoice.paid_amount, 0)
+    due = func.coalesce(Invoice.due_date, Invoice.invoice_date)
+
+    columns = []
+    newer_cutoff = None
+    for _, days in AGING_BUCKETS:
+        cutoff = today - timedelta(days=days) if days is not None else None
+        conditions = [due < newer_cutoff] if newer_cutoff is not None else []
+        if cutoff is not None:
+            conditions.append(due >= cutoff)
+        columns.append(func.coalesce(func.sum(case((and_(*conditions), open_amount), else_=0)), 0))
+        newer_cutoff = cutoff
+
+    rows = (
+        db.session.query(
+            Invoice.customer_id,
+            Customer.company_name,
+            func.count(Invoice.id),
+            func.min(due),
+            *columns,
+        )
+        .join(Customer, Customer.id == Invoice.customer_id)
+        .filter(
+            Invoice.company_id == company_id,
+            Invoice.status.in_(OPEN_STATUSES),
+            open_amount > 0,
+        )
+        .group_by(Invoice.customer_id, Customer.company_name)
+        .order_by(func.sum(open_amount).desc())
+        .all()
+    )
+
+    customers = []
+    for customer_id, customer_name, invoice_count, oldest_due_date, *amounts in rows:
+        buckets = {name: Decimal(str(amount)) for (name, _), amount in zip(AGING_BUCKETS, amounts)}
+        customers.append({
+            "customer_id": customer_id,
+            "customer_name": customer_name,
+            "invoice_count": invoice_count,
+            "oldest_due_date": oldest_due_date,
+            **buckets,
+            "total": sum(buckets.values(), Decimal("0")),
+        })
+    totals = {
+        name: sum((customer[name] for customer in customers), Decimal("0"))
+        for name in [name for name, _ in AGING_BUCKETS] + ["total"]
+    }
+    return {"as_of": today, "customers": customers, "totals": totals}
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def allocate_invoice_numbers(company_id, count, year=None):
+    """Reserve ``count`` consecutive invoice numbers for a company.
+
+    The company row is locked (``SELECT ... FOR UPDATE`` on PostgreSQL) until
+    the transaction ends, so concurrent allocations cannot hand out the same
+    numbers.
+    """
+    prefix_code = (
+        db.session.query(Company.invoice_prefix)
+        .filter(Company.id == company_id)
+        .with_for_update()
+        .scalar()
+    )
+    prefix = f"{prefix_code or 'F'}{year or datetime.now().year}-"
+    last_number = (
+        db.session.query(Invoice.invoice_number)
+        .filter(
+            Invoice.company_id == company_id,
+            Invoice.invoice_number.like(f"{prefix}%"),
+        )
+        .order_by(Invoice.invoice_number.desc())
+        .limit(1)
+        .scalar()
+    )
+    next_number = 1
+    if last_number:
+        try:
+            next_number = int(last_number.split("-")[-1]) + 1
+        except ValueError:
+            pass
+    return [f"{prefix}{number:04d}" for number in range(next_number, next_number + count)]
+
+
+def mark_time_entries_invoiced(entry_ids):
+    """Flag time entries as invoiced with set-based UPDATE statements."""
+    entry_ids = list(entry_ids)
+    for chunk in _chunks(entry_ids, IN_CLAUSE_SIZE):
+        db.session.execute(
+            update(WorkOrderTimeEntry)
+            .where(WorkOrderTimeEntry.id.in_(chunk))
+            .values(is_invoiced=True),
+            execution_options={"synchronize_session": False},
+        )
+    return len(entry_ids)
+
+
+def billing_queue(company_id):
+    """Unbilled hours per customer, computed in one aggregate query."""
+    rows = (
+        db.session.query(
+            WorkOrder.customer_id,
+            Customer.company_name,
+            func.count(WorkOrderTimeEntry.id),
+            func.count(func.distinct(WorkOrderTimeEntry.work_order_id)),
+            func.coalesce(func.sum(WorkOrderTimeEntry.hours), 0),
+            func.coalesce(func.sum(WorkOrderTimeEntry.billable_amount), 0),
+            func.min(WorkOrderTimeEntry.date),
+            func.max(WorkOrderTimeEntry.date),
+        )
+        .select_from(WorkOrderTimeEntry)
+        .join(WorkOrder, WorkOrder.id == WorkOrderTimeEntry.work_order_id)
+        .join(Customer, Customer.id == WorkOrder.customer_id)
+        .filter(WorkOrderTimeEntry.company_id == company_id, *unbilled_time_entries())
+        .group_by(WorkOrder.customer_id, Customer.company_name)
+        .order_by(func.sum(WorkOrderTimeEntry.billable_amount).desc())
+        .all()
+    )
+    return [
+        {
+            "customer_id": customer_id,
+            "customer_name": customer_name,
+            "time_entry_count": entry_count,
+            "work_order_count": work_order_count,
+            "hours": Decimal(str(hours)),
+            "amount": Decimal(str(amount)),
+            "oldest_date": oldest,
+            "newest_date": newest,
+        }
+        for customer_id, customer_name, entry_count, work_order_count, hours, amount, oldest, newest in rows
+    ]
+
+
+def collect_billable(
+    company_id,
+    date_from=None,
+    date_to=None,
+    statuses=BILLABLE_STATUSES,
+    customer_ids=None,
+    work_order_ids=None,
+):
+    """Group uninvoiced work orders, their lines and unbilled time entries by customer.
+
+    Returns a list of groups, one per customer with something to bill, each
+    holding the work orders, time entry ids and invoice line rows (without
+    ``invoice_id``) in invoice order.
+    """
+    query = db.session.query(WorkOrder).filter(
+        WorkOrder.company_id == company_id, WorkOrder.status.in_(statuses)
+    )
+    if date_from:
+        query = query.filter(WorkOrder.work_date >= date_from)
+    if date_to:
+        query = query.filter(WorkOrder.work_date <= date_to)
+    if customer_ids:
+        query = query.filter(WorkOrder.customer_id.in_(customer_ids))
+    if work_order_ids:
+        query = query.filter(WorkOrder.id.in_(work_order_ids))
+    work_orders = query.order_by(
+        WorkOrder.customer_id, WorkOrder.work_date, WorkOrder.work_order_number
+    ).all()
+
+    lines_by_work_order = defaultdict(list)
+    entries_by_work_order = defaultdict(list)
+    for chunk in _chunks([wo.id for wo in work_orders], IN_CLAUSE_SIZE):
+        lines = (
+            db.session.query(WorkOrderLine)
+            .filter(WorkOrderLine.work_order_id.in_(chunk))
+            .order_by(WorkOrderLine.sort_order)
+        )
+        for line in lines:
+            lines_by_work_order[line.work_order_id].append(line)
+        entries = (
+            db.session.query(WorkOrderTimeEntry)
+            .filter(
+                WorkOrderTimeEntry.work_order_id.in_(chunk),
+                *unbilled_time_entries(),
+            )
+            .order_by(WorkOrderTimeEntry.date)
+        )
+        for entry in entries:
+            entries_by_work_order[entry.work_order_id].append(entry)
+
+    groups = {}
+    for work_order in work_orders:
+        group = groups.setdefault(
+            work_order.customer_id,
+            {
+                "customer_id": work_order.customer_id,
+                "work_orders": [],
+                "time_entry_ids": [],
+                "rows": [],
+            },
+        )
+        group["work_orders"].append(work_order)
+        for line in lines_by_work_order[work_order.id]:
+            group["rows"].append({
+                "work_order_id": work_order.id,
+                "article_id": line.article_id,
+                "description": f"{line.description} (Work Order: {work_order.work_order_number})",
+                "quantity": line.quantity,
+                "unit_price": line.unit_price,
+                "vat_rate": line.vat_rate,
+                "line_total": line.line_total,
+            })
+        for entry in entries_by_work_order[work_order.id]:
+            group["time_entry_ids"].append(entry.id)
+            group["rows"].append({
+                "work_order_id": work_order.id,
+                "article_id": None,
+                "description": f"{entry.description} ({entry.date.isoformat()}, Work Order: {work_order.work_order_number})",
+                "quantity": entry.hours,
+                "unit_price": entry.hourly_rate or Decimal("0"),
+                "vat_rate": entry.vat_rate,
+                "line_total": entry.billable_amount,
+            })
+
+    return [group for group in groups.values() if group["rows"]]
+
+
+def _group_totals(group):
+    if "totals" not in group:
+        rows = group["rows"]
+        group["totals"] = compute_totals(
+            [row["quantity"] for row in rows],
+            [row["unit_price"] for row in rows],
+            [row["vat_rate"] for row in rows],
+        )
+    return group["totals"]
+
+
+def create_invoices(company_id, groups, user_id=None, invoice_date=None, payment_terms=None, chunk_size=50):
+    """Create one draft invoice per customer group in chunked transactions.
+
+    Each chunk reserves its invoice numbers, inserts the invoices and all of
+    their lines in bulk, flags the work orders and time entries as invoiced
+    with set-based updates and commits. Returns the created invoices.
+    """
+    invoice_date = invoice_date or datetime.now().date()
+    customers = {}
+    for chunk in _chunks([group["customer_id"] for group in groups], IN_CLAUSE_SIZE):
+        for customer in db.session.query(Customer).filter(Customer.id.in_(chunk)):
+            customers[customer.id] = customer
+
+    created = []
+    for chunk in _chunks(groups, chunk_size):
+        numbers = allocate_invoice_numbers(company_id, len(chunk), invoice_date.year)
+        invoices = []
+        for group, invoice_number in zip(chunk, numbers):
+            customer = customers.get(group["customer_id"])
+            terms = payment_terms if payment_terms is not None else (customer.payment_terms if customer else 30)
+            totals = _group_totals(group)
+            invoices.append(Invoice(
+                company_id=company_id,
+                invoice_number=invoice_number,
+                customer_id=group["customer_id"],
+                invoice_date=invoice_date,
+                due_date=invoice_date + timedelta(days=terms),
+                status="draft",
+                subtotal=totals["subtotal"],
+                vat_amount=totals["vat_amount"],
+                total_amount=totals["total_amount"],
+                notes=f"Combined invoice for work orders: {', '.join(wo.work_order_number for wo in group['work_orders'])}",
+                created_by_id=user_id,
+            ))
+        db.session.add_all(invoices)
+        db.session.flush()
+
+        bulk_insert_lines(InvoiceItem, [
+            dict(row, invoice_id=invoice.id, sort_order=i)
+            for group, invoice in zip(chunk, invoices)
+            for i, row in enumerate(group["rows"])
+        ])
+
+        work_order_ids = [wo.id for group in chunk for wo in group["work_orders"]]
+        for ids in _chunks(work_order_ids, IN_CLAUSE_SIZE):
+            db.session.execute(
+                update(WorkOrder).where(WorkOrder.id.in_(ids)).values(status="invoiced"),
+                execution_options={"synchronize_session": False},
+            )
+        mark_time_entries_invoiced(
+            entry_id for group in chunk for entry_id in group["time_entry_ids"]
+        )
+
+        invalidation.publish("invoices", company_id)
+        db.session.commit()
+        created.extend(invoices)
+
+    return created
+
+
+def run_billing(
+    company_id,
+    user_id=None,
+    date_from=None,
+    date_to=None,
+    statuses=BILLABLE_STATUSES,
+    customer_ids=None,
+    dry_run=False,
+    invoice_date=None,
+    payment_terms=None,
+    chunk_size=50,
+):
+    """Invoice all completed, uninvoiced work of a company, one invoice per customer.
+
+    With ``dry_run`` nothing is written; the report lists what would be
+    invoiced per customer together with the totals.
+    """
+    groups = collect_billable(company_id, date_from, date_to, statuses, customer_ids)
+
+    invoice_numbers = {}
+    if not dry_run and groups:
+        invoices = create_invoices(
+            company_id, groups, user_id, invoice_date, payment_terms, chunk_size
+        )
+        invoice_numbers = {inv.customer_id: (inv.id, inv.invoice_number) for inv in invoices}
+
+    names = {}
+    for chunk in _chunks([group["customer_id"] for group in groups], IN_CLAUSE_SIZE):
+        names.update(
+            db.session.query(Customer.id, Customer.company_name).filter(Customer.id.in_(chunk))
+        )
+
+    report = {
+        "dry_run": dry_run,
+        "invoice_count": len(groups),
+        "work_order_count": 0,
+        "time_entry_count": 0,
+        "subtotal": Decimal("0"),
+        "vat_amount": Decimal("0"),
+        "total_amount": Decimal("0"),
+        "customers": [],
+    }
+    for group in groups:
+        totals = _group_totals(group)
+        invoice_id, invoice_number = invoice_numbers.get(group["customer_id"], (None, None))
+        report["work_order_count"] += len(group["work_orders"])
+        report["time_entry_count"] += len(group["time_entry_ids"])
+        for key in ("subtotal", "vat_amount", "total_amount"):
+            report[key] += totals[key]
+        report["customers"].append({
+            "customer_id": group["customer_id"],
+            "customer_name": names.get(group["customer_id"]),
+            "invoice_id": invoice_id,
+            "invoice_number": invoice_number,
+            "work_order_count": len(group["work_orders"]),
+            "time_entry_count": len(group["time_entry_ids"]),
+            "line_count": len(group["rows"]),
+            "subtotal": totals["subtotal"],
+            "vat_amount": totals["vat_amount"],
+            "total_amount": totals["total_amount"],
+            "vat_breakdown": totals["vat_breakdown"],
+        })
+    return report
@@ -0,0 +1,199 @@
+"""Tenant-aware cache for reference data that is read often and rarely changes.
+
+Values live in a per-process LRU with a short TTL and, when configured, in a
+shared backend (Redis via ``CACHE_REDIS_URL``, or the in-process ``memory``
+stand-in) with a longer TTL. Keys are namespaced per company, and writes
+invalidate the affected keys explicitly, in the other workers through the
+invalidation bus (see ``invalidation.py``). Without it, on SQLite, other
+processes may serve a value from their local LRU for up to
+``CACHE_LOCAL_TTL`` seconds after an invalidation. Values going through a
+shared backend must be JSON serializable; they are encoded like API
+responses, so Decimals and dates come back as numbers and ISO strings.
+"""
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+from prometheus_client import Counter
+
+from src.services.json_provider import dumps_bytes, loads
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Reference data cache lookups",
+    ["cache", "result"],
+)
+
+_MISSING = object()
+
+
+class LocalCache:
+    """Thread-safe LRU with a TTL per entry."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at < monotonic():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class MemoryBackend:
+    """Shared backend stand-in: one store for every cache in the process."""
+
+    _store = {}
+    _lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._store.get(key)
+        if entry is None or entry[0] < monotonic():
+            return None
+        return entry[1]
+
+    def set(self, key, raw, ttl):
+        with self._lock:
+            self._store[key] = (monotonic() + ttl, raw)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._store.pop(key, None)
+
+
+class RedisBackend:
+    """Shared backend on Redis; needs the optional ``redis`` package."""
+
+    def __init__(self, url):
+        import redis
+
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5)
+        self._errors = redis.RedisError
+
+    # An unreachable Redis degrades to the local cache instead of failing requests
+    def get(self, key):
+        try:
+            return self._client.get(key)
+        except self._errors:
+            return None
+
+    def set(self, key, raw, ttl):
+        try:
+            self._client.set(key, raw, ex=max(1, int(ttl)))
+        except self._errors:
+            pass
+
+    def delete(self, *keys):
+        try:
+            if keys:
+                self._client.delete(*keys)
+        except self._errors:
+            pass
+
+
+class TenantCache:
+    """Two-level cache with per-company key namespacing."""
+
+    def __init__(self, maxsize=1024, ttl=300, local_ttl=None, backend=None, prefix="crm"):
+        self.local = LocalCache(maxsize)
+        self.ttl = ttl
+        self.local_ttl = local_ttl if local_ttl is not None else ttl
+        self.backend = backend
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, company_id, name):
+        return f"{self.prefix}:{company_id or 'global'}:{name}"
+
+    def get_or_set(self, company_id, name, loader, ttl=None):
+        """Return the cached value, calling ``loader()`` to fill it on a miss."""
+        key = self.key(company_id, name)
+        label = name.split(":", 1)[0]
+
+        value = self.local.get(key)
+        if value is _MISSING and self.backend is not None:
+            raw = self.backend.get(key)
+            if raw is not None:
+                value = loads(raw)
+                self.local.set(key, value, self.local_ttl)
+        if value is not _MISSING:
+            self.hits += 1
+            CACHE_REQUESTS.labels(label, "hit").inc()
+            return value
+
+        self.misses += 1
+        CACHE_REQUESTS.labels(label, "miss").inc()
+        value = loader()
+        ttl = ttl or self.ttl
+        if self.backend is not None:
+            self.backend.set(key, dumps_bytes(value), ttl)
+        self.local.set(key, value, min(ttl, self.local_ttl))
+        return value
+
+    def invalidate(self, company_id, *names):
+        keys = [self.key(company_id, name) for name in names]
+        for key in keys:
+            self.local.delete(key)
+        if self.backend is not None:
+            self.backend.delete(*keys)
+
+    def evict_local(self, company_id, *names):
+        """Drop keys from this process only, after another one invalidated them."""
+        for name in names:
+            self.local.delete(self.key(company_id, name))
+
+    def clear(self):
+        """Drop the local entries (the shared backend expires on its own)."""
+        self.local.clear()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+cache = TenantCache()
+
+
+def init_app(app):
+    """Configure the module-level cache from the app config."""
+    url = app.config.get("CACHE_REDIS_URL")
+    backend_name = app.config.get("CACHE_BACKEND", "redis" if url else None)
+    backend = None
+    if backend_name == "redis" and url:
+        try:
+            backend = RedisBackend(url)
+        except ImportError:
+            app.logger.warning("CACHE_REDIS_URL is set but redis is not installed; using the local cache only")
+    elif backend_name == "memory":
+        backend = MemoryBackend()
+
+    cache.local = LocalCache(app.config.get("CACHE_MAXSIZE", 1024))
+    cache.ttl = app.config.get("CACHE_TTL", 300)
+    cache.local_ttl = app.config.get("CACHE_LOCAL_TTL", 5 if backend else cache.ttl)
+    cache.backend = backend
+    app.extensions["cache"] = cache
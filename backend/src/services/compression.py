@@ -0,0 +1,78 @@
+"""Response compression negotiated with ``Accept-Encoding``.
+
+Responses are compressed with brotli when the optional ``brotli`` package is
+installed and the client accepts it, otherwise with gzip. Small bodies
+(``COMPRESS_MIN_SIZE`` bytes, default 500) are sent as is: below roughly
+one TCP segment compression saves no round trips and only costs CPU.
+Streamed and file responses pass through untouched.
+"""
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from flask import current_app, request
+
+COMPRESSIBLE_MIMETYPES = frozenset({
+    "application/json",
+    "application/javascript",
+    "text/css",
+    "text/csv",
+    "text/html",
+    "text/plain",
+})
+
+
+def _encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def compress(data, encoding, config):
+    if encoding == "br":
+        return brotli.compress(data, quality=config.get("COMPRESS_BR_LEVEL", 4))
+    return gzip.compress(data, compresslevel=config.get("COMPRESS_LEVEL", 6), mtime=0)
+
+
+def _compress_response(response):
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add("Accept-Encoding")
+
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or "Content-Encoding" in response.headers
+        or "no-transform" in response.headers.get("Cache-Control", "")
+    ):
+        return response
+
+    config = current_app.config
+    data = response.get_data()
+    if len(data) < config.get("COMPRESS_MIN_SIZE", 500):
+        return response
+
+    encoding = request.accept_encodings.best_match(_encodings())
+    if encoding is None:
+        return response
+
+    response.set_data(compress(data, encoding, config))
+    response.headers["Content-Encoding"] = encoding
+    # The representation changed, so a strong validator would be wrong
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app):
+    """Register the compression hook.
+
+    Call this before the other ``init_app`` functions: ``after_request``
+    hooks run in reverse order, and compression has to see the final body.
+    """
+    app.config.setdefault("COMPRESS_MIN_SIZE", 500)
+    app.after_request(_compress_response)
@@ -0,0 +1,74 @@
+import uuid
+from decimal import Decimal, ROUND_HALF_UP
+
+from sqlalchemy import insert
+
+from src.models.database import db, Article
+
+CENT = Decimal("0.01")
+
+
+def _as_uuid(value):
+    if isinstance(value, uuid.UUID):
+        return value
+    return uuid.UUID(str(value))
+
+
+def prefetch_articles(company_id, article_ids):
+    """Load every referenced article of a company with a single IN query.
+
+    Returns a dict keyed by article id. Invalid ids raise ``ValueError``.
+    """
+    ids = {_as_uuid(article_id) for article_id in article_ids if article_id}
+    if not ids:
+        return {}
+    articles = (
+        db.session.query(Article)
+        .filter(Article.company_id == company_id, Article.id.in_(ids))
+        .all()
+    )
+    return {article.id: article for article in articles}
+
+
+def find_missing_article(lines_data, articles):
+    """Return the first referenced article id that was not prefetched."""
+    for line_data in lines_data:
+        article_id = line_data.get("article_id")
+        if article_id and _as_uuid(article_id) not in articles:
+            return article_id
+    return None
+
+
+def build_line_row(parent_key, parent_id, line_data, sort_order, articles=None):
+    """Build the column values of one document line from request data.
+
+    ``articles`` is the mapping returned by :func:`prefetch_articles`; the
+    article name is used when the line carries no description of its own.
+    """
+    # Rounded like the Numeric(10, 2) columns store them and the totals in
+    # vat.py compute with them, so lines and document totals agree
+    quantity = Decimal(str(line_data["quantity"])).quantize(CENT, rounding=ROUND_HALF_UP)
+    unit_price = Decimal(str(line_data["unit_price"])).quantize(CENT, rounding=ROUND_HALF_UP)
+    vat_rate = Decimal(str(line_data.get("vat_rate", 21.00)))
+    article_id = _as_uuid(line_data["article_id"]) if line_data.get("article_id") else None
+    article = (articles or {}).get(article_id)
+    return {
+        parent_key: parent_id,
+        "article_id": article_id,
+        "description": line_data.get("description") or (article.name if article else ""),
+        "quantity": quantity,
+        "unit_price": unit_price,
+        "vat_rate": vat_rate,
+        "line_total": (quantity * unit_price).quantize(CENT, rounding=ROUND_HALF_UP),
+        "sort_order": sort_order,
+    }
+
+
+def bulk_insert_lines(model, rows):
+    """Insert all line rows with one executemany INSERT.
+
+    SQLAlchemy batches the parameter sets through insertmanyvalues, so a
+    300-line document costs a handful of statements instead of one per line.
+    """
+    if rows:
+        db.session.execute(insert(model), rows)
@@ -0,0 +1,130 @@
+from decimal import Decimal
+
+from flask import current_app
+from sqlalchemy import inspect
+
+from src.services.vat import compute_totals, split_amount
+
+ZERO = Decimal("0")
+
+
+class TotalsMismatch(Exception):
+    """Raised when incrementally maintained totals drift from a full recompute."""
+
+
+def _dec(value):
+    if value is None:
+        return ZERO
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def split_gross(amount, vat_rate):
+    """Split a VAT-inclusive amount into (net, vat), rounded to whole cents.
+
+    Rounding per item keeps the header an exact sum of its items, so adding
+    and later removing an item always restores the previous totals.
+    """
+    return split_amount(amount, vat_rate, prices_include_vat=True)
+
+
+def _gross_amount(item):
+    if hasattr(item, "billable_amount"):
+        return item.billable_amount if item.is_billable else ZERO
+    return item.line_total
+
+
+def item_contribution(item):
+    """Return the (net, vat) share of a document line or time entry."""
+    return split_gross(_gross_amount(item), item.vat_rate)
+
+
+def apply_totals_delta(document, added=(), removed=()):
+    """Apply added and removed (net, vat) contributions to a document header.
+
+    A changed item is passed as the contribution it had before the change in
+    ``removed`` and its new contribution in ``added``.
+    """
+    subtotal = _dec(document.subtotal)
+    vat_amount = _dec(document.vat_amount)
+    for net, vat in added:
+        subtotal += net
+        vat_amount += vat
+    for net, vat in removed:
+        subtotal -= net
+        vat_amount -= vat
+    document.subtotal = subtotal
+    document.vat_amount = vat_amount
+    document.total_amount = subtotal + vat_amount
+
+
+def reset_totals(document, added=()):
+    """Replace the document totals with the sum of ``added`` contributions."""
+    document.subtotal = ZERO
+    document.vat_amount = ZERO
+    apply_totals_delta(document, added=added)
+
+
+def _reload_items(document):
+    """Expire the eagerly loaded item collections of a persistent document.
+
+    Lines are often written with bulk INSERTs and time entries added by
+    foreign key, neither of which updates a collection loaded earlier in
+    the request, so a full recompute reads them again.
+    """
+    state = inspect(document, raiseerr=False)
+    if state is not None and state.persistent:
+        names = [name for name in ("lines", "time_entries") if name in state.mapper.relationships]
+        state.session.expire(document, names)
+
+
+def full_totals(document):
+    """Recompute (subtotal, vat_amount) from every line and time entry."""
+    _reload_items(document)
+    items = list(document.lines)
+    if hasattr(document, "time_entries"):
+        items.extend(document.time_entries)
+    totals = compute_totals(
+        [1] * len(items),
+        [_gross_amount(item) for item in items],
+        [item.vat_rate for item in items],
+        prices_include_vat=True,
+    )
+    return totals["subtotal"], totals["vat_amount"]
+
+
+def recalculate_totals(document):
+    """Full recompute of the document header from its lines and time entries."""
+    subtotal, vat_amount = full_totals(document)
+    document.subtotal = subtotal
+    document.vat_amount = vat_amount
+    document.total_amount = subtotal + vat_amount
+
+
+def verify_totals(document):
+    """Compare the header against a full recompute.
+
+    Raises :class:`TotalsMismatch` when the incrementally maintained totals
+    differ from the recomputed ones.
+    """
+    subtotal, vat_amount = full_totals(document)
+    if _dec(document.subtotal) != subtotal or _dec(document.vat_amount) != vat_amount:
+        raise TotalsMismatch(
+            f"expected subtotal={subtotal} vat={vat_amount}, "
+            f"header has subtotal={document.subtotal} vat={document.vat_amount}"
+        )
+
+
+def maybe_verify_totals(document):
+    """Check the header against a full recompute when ``TOTALS_VERIFY`` is set.
+
+    Drifted totals are logged and repaired from the recompute.
+    """
+    if not current_app.config.get("TOTALS_VERIFY"):
+        return
+    try:
+        verify_totals(document)
+    except TotalsMismatch as e:
+        current_app.logger.warning(
+            "Totals drift on %s %s: %s", type(document).__name__, document.id, e
+        )
+        recalculate_totals(document)
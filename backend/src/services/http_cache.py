@@ -0,0 +1,174 @@
+"""Conditional GET support: weak ETags, 304 responses and Cache-Control policies.
+
+A validator is a cheap query returning the values a representation depends
+on, typically ``updated_at`` columns, or ``max(updated_at)`` and a count for
+collections. The ETag is a hash of those values, so an ``If-None-Match``
+request is answered with ``304 Not Modified`` without loading or
+serializing the object. Line and time entry changes bump the ``updated_at``
+of their document, which keeps document validators down to the header row.
+"""
+import hashlib
+import uuid
+from functools import wraps
+
+from flask import jsonify, make_response, request
+from flask_jwt_extended import get_jwt
+from sqlalchemy import func
+from sqlalchemy.exc import StatementError
+
+from src.models.database import (
+    db,
+    Article,
+    ArticleCategory,
+    Customer,
+    Invoice,
+    Location,
+    Quote,
+    WorkOrder,
+)
+
+# Cache-Control per blueprint for GET responses. API data is per user, so
+# shared caches must not store it; "no-cache" makes browsers revalidate
+# with the ETag on every poll.
+CACHE_POLICIES = {
+    "customers": "private, no-cache",
+    "articles": "private, max-age=30, must-revalidate",
+    "quotes": "private, no-cache",
+    "work_orders": "private, no-cache",
+    "invoices": "private, no-cache",
+    "auth": "no-store",
+}
+
+
+def weak_etag(*values):
+    """ETag value (without quotes) for the given validator values."""
+    return hashlib.blake2b(repr(values).encode(), digest_size=12).hexdigest()
+
+
+def _is_uuid(value):
+    try:
+        uuid.UUID(str(value))
+    except ValueError:
+        return False
+    return True
+
+
+def conditional(validator):
+    """Answer GET requests with 304 when the validator's ETag still matches.
+
+    ``validator(company_id, **view_args)`` returns the values the response
+    depends on, or None when the object does not exist; the view then runs
+    as usual (and answers 404). Successful responses get the weak ETag.
+    The view arguments are ids: one that is not a UUID names no object and
+    is answered with 404 right away.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not all(_is_uuid(value) for value in kwargs.values()):
+                return jsonify({"error": "Not found"}), 404
+            company_id = get_jwt().get("company_id")
+            try:
+                values = validator(company_id, **kwargs) if company_id else None
+            except (ValueError, TypeError, AttributeError, StatementError):
+                # Malformed ids, which GUID columns reject while binding;
+                # leave the error response to the view
+                db.session.rollback()
+                values = None
+            if values is None:
+                return view(*args, **kwargs)
+
+            etag = weak_etag(*values)
+            if request.if_none_match.contains_weak(etag):
+                response = make_response("", 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def _row(query):
+    row = query.first()
+    return tuple(row) if row is not None else None
+
+
+def _document_validator(model):
+    def validator(company_id, **view_args):
+        (object_id,) = view_args.values()
+        return _row(
+            db.session.query(model.updated_at, Customer.updated_at, Location.updated_at)
+            .outerjoin(Customer, Customer.id == model.customer_id)
+            .outerjoin(Location, Location.id == model.location_id)
+            .filter(model.id == object_id, model.company_id == company_id)
+        )
+
+    return validator
+
+
+quote_validator = _document_validator(Quote)
+work_order_validator = _document_validator(WorkOrder)
+
+
+def invoice_validator(company_id, invoice_id):
+    return _row(
+        db.session.query(Invoice.updated_at, Customer.updated_at)
+        .outerjoin(Customer, Customer.id == Invoice.customer_id)
+        .filter(Invoice.id == invoice_id, Invoice.company_id == company_id)
+    )
+
+
+def customer_validator(company_id, customer_id):
+    return _row(
+        db.session.query(
+            Customer.updated_at, func.count(Location.id), func.max(Location.updated_at)
+        )
+        .outerjoin(Location, Location.customer_id == Customer.id)
+        .filter(Customer.id == customer_id, Customer.company_id == company_id)
+        .group_by(Customer.id, Customer.updated_at)
+    )
+
+
+def article_validator(company_id, article_id):
+    return _row(
+        db.session.query(Article.updated_at, ArticleCategory.updated_at)
+        .outerjoin(ArticleCategory, ArticleCategory.id == Article.category_id)
+        .filter(Article.id == article_id, Article.company_id == company_id)
+    )
+
+
+def categories_validator(company_id):
+    categories = (
+        db.session.query(func.count(ArticleCategory.id), func.max(ArticleCategory.updated_at))
+        .filter(ArticleCategory.company_id == company_id)
+        .first()
+    )
+    articles = (
+        db.session.query(func.count(Article.id), func.max(Article.updated_at))
+        .filter(Article.company_id == company_id)
+        .first()
+    )
+    return tuple(categories) + tuple(articles)
+
+
+def init_app(app, policies=None):
+    """Set the Cache-Control policy of each blueprint on GET responses."""
+    policies = CACHE_POLICIES if policies is None else policies
+
+    @app.after_request
+    def _cache_control(response):
+        if "Cache-Control" in response.headers:
+            return response
+        policy = policies.get(request.blueprint)
+        if policy is None:
+            return response
+        if request.method in ("GET", "HEAD") and response.status_code in (200, 304):
+            response.headers["Cache-Control"] = policy
+        else:
+            response.headers["Cache-Control"] = "no-store"
+        return response
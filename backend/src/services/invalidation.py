@@ -0,0 +1,217 @@
+"""Cache invalidation across workers.
+
+Write paths call :func:`publish` with the table, company and id of the row
+they change. When the transaction commits, the cache keys depending on that
+table are evicted in this worker (and from the shared cache backend), and the
+event goes to the other workers:
+
+* on PostgreSQL through ``NOTIFY`` on ``CACHE_INVALIDATION_CHANNEL``, sent in
+  the writing transaction so a rolled back write notifies nobody. A listener
+  thread in every worker ``LISTEN``s and evicts the matching keys from its
+  local cache;
+* elsewhere (SQLite, tests) in-process only, which covers a single worker.
+
+Which keys depend on a table is declared with :func:`subscribe` by the module
+owning the cached value. The time from commit to eviction in another worker
+is exported as ``cache_invalidation_lag_seconds``.
+"""
+import logging
+import os
+import select
+import socket
+import threading
+import time
+from collections import defaultdict
+
+from flask import current_app, has_app_context
+from prometheus_client import Counter, Histogram
+from sqlalchemy import event, func
+from sqlalchemy import select as sql_select
+
+from src.models.database import db
+from src.services.cache import cache
+from src.services.json_provider import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+INVALIDATIONS = Counter(
+    "cache_invalidations_total",
+    "Cache invalidation events applied",
+    ["table", "transport"],
+)
+INVALIDATION_LAG = Histogram(
+    "cache_invalidation_lag_seconds",
+    "Time from the commit of a write to the eviction in a worker",
+    ["transport"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+_PENDING = "cache_invalidations"
+_subscribers = defaultdict(list)
+
+
+def subscribe(table, keys):
+    """Declare cached values depending on ``table``.
+
+    ``keys(company_id, entity_id)`` returns the ``(company_id, name)`` pairs
+    to evict when a row of the table changes.
+    """
+    _subscribers[table].append(keys)
+
+
+def _keys(change):
+    for keys in _subscribers.get(change["table"], ()):
+        yield from keys(change["company_id"], change["id"])
+
+
+def _apply(change, transport, shared):
+    for company_id, name in _keys(change):
+        if shared:
+            cache.invalidate(company_id, name)
+        else:
+            cache.evict_local(company_id, name)
+    INVALIDATIONS.labels(change["table"], transport).inc()
+    INVALIDATION_LAG.labels(transport).observe(max(0.0, time.time() - change["committed_at"]))
+
+
+class InvalidationBus:
+    """Sends the changes of this worker and applies those of the others."""
+
+    def __init__(self, engine, transport, channel):
+        self.engine = engine
+        self.transport = transport
+        self.channel = channel
+        self.origin = f"{socket.gethostname()}:{os.getpid()}"
+        self._thread = None
+        self._stop = threading.Event()
+
+    def notify(self, connection, changes):
+        """Send ``changes`` with NOTIFY on ``connection``."""
+        for change in changes:
+            payload = dumps(dict(change, origin=self.origin))
+            connection.execute(sql_select(func.pg_notify(self.channel, payload)))
+
+    def start(self):
+        self._thread = threading.Thread(target=self._listen, name="cache-invalidation", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _connect(self):
+        # A connection of its own: it is never returned to the pool
+        dialect = self.engine.dialect
+        cargs, cparams = dialect.create_connect_args(self.engine.url)
+        connection = dialect.connect(*cargs, **cparams)
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}"')
+        return connection
+
+    def _listen(self):
+        delay = 1
+        while not self._stop.is_set():
+            try:
+                connection = self._connect()
+            except Exception:
+                logger.exception("Cannot listen for cache invalidations; retrying in %s s", delay)
+                self._stop.wait(delay)
+                delay = min(delay * 2, 60)
+                continue
+            delay = 1
+            # Changes may have been missed while disconnected
+            cache.clear()
+            try:
+                self._receive(connection)
+            except Exception:
+                logger.exception("Lost the cache invalidation listener connection")
+            finally:
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+
+    def _receive(self, connection):
+        while not self._stop.is_set():
+            if select.select([connection], [], [], 5) == ([], [], []):
+                continue
+            connection.poll()
+            while connection.notifies:
+                change = loads(connection.notifies.pop(0).payload)
+                if change.pop("origin", None) != self.origin:
+                    _apply(change, "notify", shared=False)
+
+
+def _bus():
+    if not has_app_context():
+        return None
+    return current_app.extensions.get("invalidation")
+
+
+def publish(table, company_id, entity_id=None):
+    """Announce a change of a ``table`` row, effective when the session commits.
+
+    Outside a transaction the change is applied and sent right away.
+    """
+    change = {
+        "table": table,
+        "company_id": str(company_id) if company_id is not None else None,
+        "id": str(entity_id) if entity_id is not None else None,
+    }
+    session = db.session()
+    if session.in_transaction():
+        session.info.setdefault(_PENDING, []).append(change)
+        return
+    change["committed_at"] = time.time()
+    bus = _bus()
+    if bus is not None and bus.transport == "notify":
+        with db.engine.begin() as connection:
+            bus.notify(connection, [change])
+    _apply(change, "local", shared=True)
+
+
+def _before_commit(session):
+    changes = session.info.get(_PENDING)
+    if not changes:
+        return
+    now = time.time()
+    for change in changes:
+        change["committed_at"] = now
+    bus = _bus()
+    if bus is not None and bus.transport == "notify":
+        bus.notify(session, changes)
+
+
+def _after_commit(session):
+    for change in session.info.pop(_PENDING, ()):
+        _apply(change, "local", shared=True)
+
+
+def _after_rollback(session):
+    session.info.pop(_PENDING, None)
+
+
+def init_app(app):
+    """Hook into the session and start the listener on PostgreSQL.
+
+    ``CACHE_INVALIDATION`` selects the transport: ``notify`` (the default on
+    PostgreSQL with psycopg2) or ``local``.
+    """
+    app.config.setdefault("CACHE_INVALIDATION_CHANNEL", "cache_invalidation")
+    if not event.contains(db.session, "before_commit", _before_commit):
+        event.listen(db.session, "before_commit", _before_commit)
+        event.listen(db.session, "after_commit", _after_commit)
+        event.listen(db.session, "after_rollback", _after_rollback)
+
+    with app.app_context():
+        engine = db.engine
+    native = engine.dialect.name == "postgresql" and engine.dialect.driver == "psycopg2"
+    transport = app.config.get("CACHE_INVALIDATION", "notify" if native else "local")
+    if transport == "notify" and not native:
+        app.logger.warning("CACHE_INVALIDATION=notify needs PostgreSQL with psycopg2; invalidating in-process only")
+        transport = "local"
+
+    bus = InvalidationBus(engine, transport, app.config["CACHE_INVALIDATION_CHANNEL"])
+    if transport == "notify" and not app.config.get("TESTING"):
+        bus.start()
+    app.extensions["invalidation"] = bus
@@ -0,0 +1,91 @@
+"""JSON provider for API responses, backed by orjson when it is installed.
+
+Views hand model values straight to ``jsonify``: UUIDs become strings,
+dates, datetimes and times ISO 8601 strings, and Decimals JSON numbers.
+Money and quantity columns are ``Numeric(10, 2)`` and friends, whose values
+survive the conversion to a float unchanged (``Decimal("12.30")`` is
+written as ``12.3``), so clients keep receiving numbers as before.
+
+Without orjson the stdlib encoder is used with the same conversions, so
+both produce the same documents apart from whitespace.
+"""
+import dataclasses
+import json
+import uuid
+from datetime import date, time
+from decimal import Decimal
+
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+
+def default(value):
+    """Convert the types neither encoder handles natively."""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if hasattr(value, "__html__"):
+        return str(value.__html__())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps_bytes(obj, indent=False):
+        """Serialize ``obj`` to UTF-8 encoded JSON."""
+        return orjson.dumps(obj, default=default, option=_OPTIONS | (orjson.OPT_INDENT_2 if indent else 0))
+
+    loads = orjson.loads
+else:
+    def dumps_bytes(obj, indent=False):
+        """Serialize ``obj`` to UTF-8 encoded JSON."""
+        if indent:
+            text = json.dumps(obj, default=default, ensure_ascii=False, indent=2)
+        else:
+            text = json.dumps(obj, default=default, ensure_ascii=False, separators=(",", ":"))
+        return text.encode()
+
+    loads = json.loads
+
+
+def dumps(obj, indent=False):
+    """Serialize ``obj`` to a JSON string."""
+    return dumps_bytes(obj, indent).decode()
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider writing response bodies with :func:`dumps_bytes`.
+
+    Keys are not sorted and non-ASCII characters are not escaped. Responses
+    are indented in debug mode, like Flask's default provider.
+    """
+
+    mimetype = "application/json"
+    compact = None
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # Arguments for the stdlib encoder, e.g. from extensions
+            kwargs.setdefault("default", default)
+            return json.dumps(obj, **kwargs)
+        return dumps(obj)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return json.loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(dumps_bytes(obj, indent), mimetype=self.mimetype)
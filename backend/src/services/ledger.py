@@ -0,0 +1,186 @@
+"""Running open balance per customer, for credit checks.
+
+``Customer.open_balance`` is the sum of ``total_amount - paid_amount`` over the
+customer's sent and overdue invoices, the amounts the aging report shows. It
+is maintained in the transaction that changes the invoices: after every flush
+the invoices inserted, updated and deleted are turned into a delta per
+customer, added with ``UPDATE customers SET open_balance = open_balance +
+:delta``. Concurrent transactions add up instead of overwriting each other,
+and a rolled back transaction takes its deltas with it.
+
+Bulk ``update()`` and ``delete()`` statements bypass the unit of work and are
+not seen; the only one on invoices, ``mark_overdue_invoices``, moves invoices
+between two open statuses and leaves the balance alone. :func:`reconcile`
+recomputes all balances from the invoices in one grouped query and reports
+drift; ``flask reconcile_balances`` runs it, ``--fix`` corrects the drift.
+"""
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+import click
+from sqlalchemy import bindparam, case, event, func, inspect, select, update
+
+from src.models.database import db, Customer, Invoice
+from src.services.billing import OPEN_STATUSES
+
+logger = logging.getLogger(__name__)
+
+# Invoice attributes the balance depends on
+_TRACKED = ("customer_id", "status", "total_amount", "paid_amount")
+
+
+def _amount(status, total_amount, paid_amount):
+    if status not in OPEN_STATUSES:
+        return Decimal("0")
+    return Decimal(str(total_amount or 0)) - Decimal(str(paid_amount or 0))
+
+
+def open_amount(invoice):
+    """What ``invoice`` adds to its customer's open balance."""
+    return _amount(invoice.status, invoice.total_amount, invoice.paid_amount)
+
+
+def _committed(invoice, name):
+    """The value of ``name`` in the database before this flush."""
+    history = inspect(invoice).attrs[name].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(invoice, name)
+
+
+def _deltas(session):
+    deltas = defaultdict(Decimal)
+    for invoice in session.new:
+        if isinstance(invoice, Invoice):
+            deltas[invoice.customer_id] += open_amount(invoice)
+    for invoice in session.dirty:
+        if isinstance(invoice, Invoice) and session.is_modified(invoice):
+            old = [_committed(invoice, name) for name in _TRACKED]
+            deltas[old[0]] -= _amount(*old[1:])
+            deltas[invoice.customer_id] += open_amount(invoice)
+    for invoice in session.deleted:
+        if isinstance(invoice, Invoice):
+            old = [_committed(invoice, name) for name in _TRACKED]
+            deltas[old[0]] -= _amount(*old[1:])
+    return {customer_id: delta for customer_id, delta in deltas.items() if delta}
+
+
+def _after_flush(session, flush_context):
+    deltas = _deltas(session)
+    if not deltas:
+        return
+    customers = Customer.__table__
+    session.connection().execute(
+        update(customers)
+        .where(customers.c.id == bindparam("b_customer_id"))
+        .values(open_balance=customers.c.open_balance + bindparam("b_delta", type_=customers.c.open_balance.type)),
+        [{"b_customer_id": customer_id, "b_delta": delta} for customer_id, delta in deltas.items()],
+    )
+    # Loaded customers reload the balance on next access
+    for customer_id in deltas:
+        customer = session.identity_map.get(session.identity_key(Customer, customer_id))
+        if customer is not None:
+            session.expire(customer, ["open_balance"])
+
+
+def _track_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+def over_credit_limit(customer_id, amount=0):
+    """Whether ``amount`` on top of the open balance exceeds the credit limit.
+
+    Reads two columns of one row. The row stays locked (``FOR UPDATE`` on
+    PostgreSQL) until the transaction ends, so two concurrent checks cannot
+    both spend the remaining credit. Customers without a limit never exceed it.
+    """
+    open_balance, credit_limit = (
+        db.session.query(Customer.open_balance, Customer.credit_limit)
+        .filter(Customer.id == customer_id)
+        .with_for_update()
+        .one()
+    )
+    if credit_limit is None:
+        return False
+    return Decimal(str(open_balance)) + Decimal(str(amount or 0)) > Decimal(str(credit_limit))
+
+
+def expected_balances():
+    """Select of every customer's stored and recomputed open balance."""
+    open_amount_sum = func.coalesce(
+        func.sum(
+            case(
+                (Invoice.status.in_(OPEN_STATUSES), Invoice.total_amount - Invoice.paid_amount),
+                else_=0,
+            )
+        ),
+        0,
+    )
+    return (
+        select(
+            Customer.id,
+            Customer.company_id,
+            Customer.company_name,
+            Customer.open_balance,
+            open_amount_sum.label("expected"),
+        )
+        .outerjoin(Invoice, Invoice.customer_id == Customer.id)
+        .group_by(Customer.id, Customer.company_id, Customer.company_name, Customer.open_balance)
+    )
+
+
+def reconcile(fix=False):
+    """Compare every stored balance with its invoices, in one query.
+
+    Returns the drifting customers as dicts with the stored ``open_balance``,
+    the ``expected`` balance and their difference. With ``fix`` the stored
+    balances are set to the expected ones and committed.
+    """
+    drift = []
+    for customer_id, company_id, company_name, stored, expected in db.session.execute(expected_balances()):
+        stored, expected = Decimal(str(stored or 0)), Decimal(str(expected))
+        if stored != expected:
+            drift.append({
+                "customer_id": customer_id,
+                "company_id": company_id,
+                "customer_name": company_name,
+                "open_balance": stored,
+                "expected": expected,
+                "difference": stored - expected,
+            })
+
+    if fix and drift:
+        customers = Customer.__table__
+        db.session.execute(
+            update(customers)
+            .where(customers.c.id == bindparam("b_customer_id"))
+            .values(open_balance=bindparam("b_expected", type_=customers.c.open_balance.type)),
+            [{"b_customer_id": row["customer_id"], "b_expected": row["expected"]} for row in drift],
+        )
+        db.session.commit()
+        logger.warning("Corrected the open balance of %d customers", len(drift))
+    return drift
+
+
+def init_app(app):
+    """Maintain balances on flush and add the ``reconcile_balances`` command."""
+    if not event.contains(db.session, "after_flush", _after_flush):
+        event.listen(db.session, "after_flush", _after_flush)
+        # Load the previous value on assignment, so the delta is known even
+        # when the attribute was expired before it was changed
+        for name in _TRACKED:
+            event.listen(getattr(Invoice, name), "set", _track_old_value, active_history=True)
+
+    @app.cli.command("reconcile_balances")
+    @click.option("--fix", is_flag=True, help="Set drifting balances to the invoice totals.")
+    def reconcile_balances(fix):
+        """Verify customer open balances against their invoices."""
+        drift = reconcile(fix=fix)
+        for row in drift:
+            click.echo(
+                f"{row['customer_id']} {row['customer_name']}: "
+                f"stored {row['open_balance']:.2f}, invoices {row['expected']:.2f}, "
+                f"drift {row['difference']:+.2f}"
+            )
+        click.echo(f"{len(drift)} customers drifting{', corrected' if fix and drift else ''}")
@@ -0,0 +1,123 @@
+"""Prometheus metrics for requests, database queries and the connection pool.
+
+Metrics are exposed on ``/metrics`` in the text exposition format. When
+``PROMETHEUS_MULTIPROC_DIR`` is set every worker process writes its values
+to its own files in that directory and a scrape aggregates all workers. The
+Dockerfile sets it, entrypoint.sh defaults it to /tmp/prometheus_multiproc,
+and gunicorn.conf.py empties the directory when the server starts.
+"""
+import os
+import threading
+from time import perf_counter
+
+from flask import Response, abort, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Request duration by endpoint, method and status",
+    ["endpoint", "method", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database queries executed per request",
+    ["endpoint"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 250),
+)
+DB_QUERY_SECONDS = Histogram(
+    "http_request_db_seconds",
+    "Time spent in database queries per request",
+    ["endpoint"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+DB_QUERIES_TOTAL = Counter(
+    "db_queries_total",
+    "Database queries executed, including outside requests",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Connections currently checked out of the pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_open_connections",
+    "Connections currently opened by the pool",
+    multiprocess_mode="livesum",
+)
+
+# Per-thread request state; gunicorn serves requests on worker threads
+_state = threading.local()
+
+_EXCLUDED_PATHS = ("/metrics", "/health")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _state.query_start = perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    DB_QUERIES_TOTAL.inc()
+    if getattr(_state, "active", False):
+        _state.queries += 1
+        _state.query_seconds += perf_counter() - _state.query_start
+
+
+def _before_request():
+    _state.active = request.path not in _EXCLUDED_PATHS
+    _state.start = perf_counter()
+    _state.queries = 0
+    _state.query_seconds = 0.0
+
+
+def _after_request(response):
+    if getattr(_state, "active", False):
+        _state.active = False
+        endpoint = request.endpoint or "unmatched"
+        REQUEST_DURATION.labels(endpoint, request.method, response.status_code).observe(
+            perf_counter() - _state.start
+        )
+        DB_QUERIES.labels(endpoint).observe(_state.queries)
+        DB_QUERY_SECONDS.labels(endpoint).observe(_state.query_seconds)
+    return response
+
+
+def _registry():
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def metrics_view():
+    token = os.environ.get("METRICS_TOKEN")
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        abort(401)
+    return Response(generate_latest(_registry()), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_app(app, db):
+    """Register the request hooks, database listeners and the /metrics route."""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
+
+    with app.app_context():
+        engine = db.engine
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "checkout", lambda *args: DB_POOL_CHECKED_OUT.inc())
+        event.listen(engine, "checkin", lambda *args: DB_POOL_CHECKED_OUT.dec())
+        event.listen(engine, "connect", lambda *args: DB_POOL_CONNECTIONS.inc())
+        event.listen(engine, "close", lambda *args: DB_POOL_CONNECTIONS.dec())
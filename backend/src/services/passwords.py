@@ -0,0 +1,162 @@
+"""Password hashing with argon2id or bcrypt, run in a bounded process pool.
+
+``PASSWORD_HASHER`` selects the scheme for new hashes: ``argon2id`` (the
+default, needs the optional ``argon2-cffi`` package) or ``bcrypt``. Stored
+hashes of any supported scheme, including werkzeug's ``pbkdf2:``/``scrypt:``
+hashes, keep verifying; :func:`needs_rehash` tells the login view when a
+hash should be replaced with one of the configured scheme and parameters.
+
+Hashing is CPU bound for tens of milliseconds. With ``PASSWORD_HASH_WORKERS``
+greater than zero it runs in a process pool of that size, so a login storm
+keeps at most that many cores busy with hashing while the request threads
+wait, instead of competing with every other request for the CPU. With 0 it
+runs inline, which is what the tests use. The pool's processes are started
+by a fork server (spawned where that is unavailable): a gunicorn worker
+creating the pool already runs threads, and a forked copy of a process with
+threads can deadlock on a lock one of them held.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+from werkzeug.security import check_password_hash
+
+try:
+    import argon2
+except ImportError:
+    argon2 = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "PASSWORD_HASHER": "argon2id",
+    # OWASP's baseline for argon2id: 19 MiB, 2 iterations, 1 lane
+    "ARGON2_TIME_COST": 2,
+    "ARGON2_MEMORY_COST": 19456,
+    "ARGON2_PARALLELISM": 1,
+    "BCRYPT_ROUNDS": 12,
+    "PASSWORD_HASH_WORKERS": min(4, os.cpu_count() or 1),
+    "PASSWORD_HASH_TIMEOUT": 10,
+}
+
+_settings = dict(DEFAULTS, PASSWORD_HASHER="argon2id" if argon2 is not None else "bcrypt")
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def scheme_of(password_hash):
+    if password_hash.startswith("$argon2id$"):
+        return "argon2id"
+    if password_hash.startswith(("$2b$", "$2a$", "$2y$")):
+        return "bcrypt"
+    return "werkzeug"
+
+
+def _argon2_hasher(params):
+    return argon2.PasswordHasher(
+        time_cost=params["ARGON2_TIME_COST"],
+        memory_cost=params["ARGON2_MEMORY_COST"],
+        parallelism=params["ARGON2_PARALLELISM"],
+        type=argon2.Type.ID,
+    )
+
+
+# The functions below run in the pool workers; they get everything they
+# need as arguments.
+
+def _hash(password, params):
+    if params["PASSWORD_HASHER"] == "argon2id":
+        return _argon2_hasher(params).hash(password)
+    salt = bcrypt.gensalt(rounds=params["BCRYPT_ROUNDS"])
+    return bcrypt.hashpw(password.encode(), salt).decode()
+
+
+def _verify(password_hash, password, params):
+    scheme = scheme_of(password_hash)
+    if scheme == "argon2id":
+        try:
+            return _argon2_hasher(params).verify(password_hash, password)
+        except (argon2.exceptions.VerificationError, argon2.exceptions.InvalidHashError):
+            return False
+    if scheme == "bcrypt":
+        return bcrypt.checkpw(password.encode(), password_hash.encode())
+    return check_password_hash(password_hash, password)
+
+
+def _mp_context():
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def _executor():
+    global _pool, _pool_pid
+    workers = _settings["PASSWORD_HASH_WORKERS"]
+    if workers <= 0:
+        return None
+    with _pool_lock:
+        # A pool inherited through fork (gunicorn workers) is unusable
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context())
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _run(func, *args):
+    executor = _executor()
+    if executor is None:
+        return func(*args)
+    return executor.submit(func, *args).result(timeout=_settings["PASSWORD_HASH_TIMEOUT"])
+
+
+def hash_password(password):
+    """Hash ``password`` with the configured scheme."""
+    return _run(_hash, password, dict(_settings))
+
+
+def verify_password(password_hash, password):
+    """Check ``password`` against a stored hash of any supported scheme."""
+    if not password_hash or password is None:
+        return False
+    if scheme_of(password_hash) == "argon2id" and argon2 is None:
+        logger.error("Found an argon2id password hash but argon2-cffi is not installed")
+        return False
+    return _run(_verify, password_hash, password, dict(_settings))
+
+
+def needs_rehash(password_hash):
+    """Whether a hash uses another scheme or other parameters than configured."""
+    scheme = scheme_of(password_hash)
+    if scheme != _settings["PASSWORD_HASHER"]:
+        return True
+    if scheme == "argon2id":
+        return _argon2_hasher(_settings).check_needs_rehash(password_hash)
+    # "$2b$12$..." carries the cost factor
+    return int(password_hash.split("$")[2]) != _settings["BCRYPT_ROUNDS"]
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def init_app(app):
+    """Read the hashing settings from the app config."""
+    for key, value in DEFAULTS.items():
+        app.config.setdefault(key, value)
+    settings = {key: app.config[key] for key in DEFAULTS}
+    if settings["PASSWORD_HASHER"] not in ("argon2id", "bcrypt"):
+        raise ValueError(f"Unknown PASSWORD_HASHER: {settings['PASSWORD_HASHER']}")
+    if settings["PASSWORD_HASHER"] == "argon2id" and argon2 is None:
+        app.logger.warning("argon2-cffi is not installed; hashing new passwords with bcrypt")
+        settings["PASSWORD_HASHER"] = "bcrypt"
+
+    if settings["PASSWORD_HASH_WORKERS"] != _settings["PASSWORD_HASH_WORKERS"]:
+        shutdown()
+    _settings.update(settings)
@@ -0,0 +1,313 @@
+"""Background scheduler for periodic jobs.
+
+Jobs are registered by name with :func:`job`, to run every ``every`` seconds
+or on a ``cron`` schedule (minute, hour, day of month, month, day of week,
+in UTC), optionally delayed by a random ``jitter`` of up to that many
+seconds so workers and jobs do not all hit the database at once.
+
+Every gunicorn worker runs a scheduler thread (started from
+gunicorn.conf.py). When a job is due, the worker takes the job's lock, a
+PostgreSQL advisory lock or, on SQLite, an flock on a file next to the
+database, and checks the run history in ``job_runs`` before running it.
+Workers that lose the race find the run recorded and skip it, so each
+scheduled run happens exactly once. Durations are exported as
+``scheduler_job_duration_seconds``.
+"""
+import contextlib
+import hashlib
+import logging
+import os
+import random
+import socket
+import tempfile
+import threading
+import time
+import weakref
+from datetime import datetime, timedelta
+
+import click
+from prometheus_client import Histogram
+from sqlalchemy import func, select
+
+from src.models.database import db, JobRun
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+JOB_DURATION = Histogram(
+    "scheduler_job_duration_seconds",
+    "Duration of scheduled job runs",
+    ["job", "status"],
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600),
+)
+
+_jobs = {}
+_schedulers = weakref.WeakSet()
+
+
+class Cron:
+    """A five-field cron expression: minute hour day month weekday.
+
+    Fields take ``*``, numbers, ranges ``a-b``, steps ``*/n`` or ``a-b/n``
+    and comma separated lists of those. Weekday 0 and 7 are Sunday. As in
+    cron, a day matches when either the day of month or the weekday field
+    matches if both are restricted.
+    """
+
+    _RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        self.expression = expression
+        parsed = [self._parse(field, low, high) for field, (low, high) in zip(fields, self._RANGES)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {day % 7 for day in weekdays}
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    @staticmethod
+    def _parse(field, low, high):
+        values = set()
+        for part in field.split(","):
+            spec, _, step = part.partition("/")
+            if spec == "*":
+                start, end = low, high
+            elif "-" in spec:
+                start, end = (int(value) for value in spec.split("-", 1))
+            else:
+                start = end = int(spec)
+                if step:
+                    end = high
+            if not low <= start <= end <= high:
+                raise ValueError(f"Cron field out of range: {field!r}")
+            values.update(range(start, end + 1, int(step) if step else 1))
+        return values
+
+    def _day_matches(self, moment):
+        day = moment.day in self.days
+        weekday = (moment.isoweekday() % 7) in self.weekdays
+        if self._any_day:
+            return weekday
+        if self._any_weekday:
+            return day
+        return day or weekday
+
+    def next_after(self, moment):
+        """The first matching minute after ``moment``."""
+        moment = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 5)
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f"Cron expression never matches: {self.expression!r}")
+
+
+class Job:
+    def __init__(self, name, func, every=None, cron=None, jitter=0):
+        if (every is None) == (cron is None):
+            raise ValueError(f"Job {name} needs either every or cron")
+        self.name = name
+        self.func = func
+        self.every = timedelta(seconds=every) if every is not None else None
+        self.cron = Cron(cron) if cron is not None else None
+        self.jitter = jitter
+
+    def next_run(self, last_started_at, now):
+        """When the run after one started at ``last_started_at`` is due."""
+        if self.every is not None:
+            return last_started_at + self.every if last_started_at else now
+        return self.cron.next_after(last_started_at or now)
+
+    @property
+    def lock_key(self):
+        # Advisory locks take a signed 64-bit key
+        return int.from_bytes(hashlib.blake2b(self.name.encode(), digest_size=8).digest(), "big", signed=True)
+
+
+def job(name, every=None, cron=None, jitter=0):
+    """Register the decorated function as the periodic job ``name``."""
+    def decorator(func):
+        _jobs[name] = Job(name, func, every=every, cron=cron, jitter=jitter)
+        return func
+    return decorator
+
+
+class Scheduler:
+    """Runs the registered jobs of one app in a background thread."""
+
+    def __init__(self, app):
+        self.app = app
+        self.instance = f"{socket.gethostname()}:{os.getpid()}"
+        self._next_check = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def jobs(self):
+        return _jobs
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.instance = f"{socket.gethostname()}:{os.getpid()}"
+        # Workers starting together spread their first checks over the jitter
+        now = datetime.utcnow()
+        self._next_check = {
+            name: now + timedelta(seconds=random.uniform(0, scheduled.jitter))
+            for name, scheduled in self.jobs.items()
+        }
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            now = datetime.utcnow()
+            for name, scheduled in list(self.jobs.items()):
+                if self._next_check.get(name, now) <= now:
+                    try:
+                        self.run_pending(scheduled)
+                        self._next_check[name] = self._plan(scheduled)
+                    except Exception:
+                        logger.exception("Scheduler failed to check job %s", name)
+                        self._next_check[name] = now + timedelta(minutes=1)
+            wait = min(self._next_check.values(), default=now + timedelta(minutes=1)) - datetime.utcnow()
+            self._stop.wait(min(max(wait.total_seconds(), 1), 60))
+
+    def _plan(self, scheduled):
+        with self.app.app_context():
+            last = _last_started_at(scheduled.name)
+        due = scheduled.next_run(last, datetime.utcnow())
+        return due + timedelta(seconds=random.uniform(0, scheduled.jitter))
+
+    def run_pending(self, scheduled, force=False):
+        """Run ``scheduled`` if it is due and no other worker has the lock.
+
+        Returns the recorded :class:`JobRun`, or None when the job did not run.
+        """
+        with self.app.app_context(), self._lock(scheduled) as acquired:
+            if not acquired:
+                return None
+            now = datetime.utcnow()
+            if not force and scheduled.next_run(_last_started_at(scheduled.name), now) > now:
+                return None
+            return self._run(scheduled)
+
+    def _run(self, scheduled):
+        run = JobRun(job_name=scheduled.name, instance=self.instance, started_at=datetime.utcnow())
+        db.session.add(run)
+        db.session.commit()
+        run_id = run.id
+
+        start = time.perf_counter()
+        status, result, error = "success", None, None
+        try:
+            result = scheduled.func()
+        except Exception as e:
+            logger.exception("Job %s failed", scheduled.name)
+            db.session.rollback()
+            status, error = "failed", str(e)
+        elapsed = time.perf_counter() - start
+        JOB_DURATION.labels(scheduled.name, status).observe(elapsed)
+
+        run = db.session.get(JobRun, run_id)
+        run.status = status
+        run.result = result
+        run.error = error
+        run.finished_at = datetime.utcnow()
+        run.duration_ms = int(elapsed * 1000)
+        db.session.commit()
+        db.session.refresh(run)
+        logger.info("Job %s %s in %.1f s", scheduled.name, status, elapsed)
+        return run
+
+    @contextlib.contextmanager
+    def _lock(self, scheduled):
+        if db.engine.dialect.name == "postgresql":
+            # Session-level advisory lock, released with the connection
+            with db.engine.connect() as connection:
+                acquired = connection.execute(select(func.pg_try_advisory_lock(scheduled.lock_key))).scalar()
+                try:
+                    yield acquired
+                finally:
+                    if acquired:
+                        connection.execute(select(func.pg_advisory_unlock(scheduled.lock_key)))
+                        connection.commit()
+            return
+
+        if fcntl is None:
+            yield True
+            return
+        path = os.path.join(self._lock_dir(), f"scheduler-{scheduled.name}.lock")
+        with open(path, "w") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _lock_dir(self):
+        configured = self.app.config.get("SCHEDULER_LOCK_DIR")
+        if configured:
+            return configured
+        database = db.engine.url.database
+        if database and database != ":memory:":
+            return os.path.dirname(os.path.abspath(database))
+        return tempfile.gettempdir()
+
+
+def _last_started_at(name):
+    return db.session.execute(
+        select(func.max(JobRun.started_at)).where(JobRun.job_name == name)
+    ).scalar()
+
+
+def start():
+    """Start the schedulers of the apps in this process, if enabled."""
+    for scheduler in list(_schedulers):
+        if scheduler.app.config.get("SCHEDULER_ENABLED"):
+            scheduler.start()
+
+
+def init_app(app):
+    """Create the app's scheduler and the ``run_job`` command.
+
+    The thread is not started here: gunicorn workers start it after forking,
+    so scripts and CLI commands creating the app run no jobs.
+    """
+    app.config.setdefault("SCHEDULER_ENABLED", True)
+    scheduler = Scheduler(app)
+    _schedulers.add(scheduler)
+    app.extensions["scheduler"] = scheduler
+
+    @app.cli.command("run_job")
+    @click.argument("name")
+    def run_job(name):
+        """Run a scheduled job now, recording it in the run history."""
+        if name not in _jobs:
+            raise click.BadParameter(f"Unknown job; choose from {', '.join(sorted(_jobs))}")
+        run = scheduler.run_pending(_jobs[name], force=True)
+        if run is None:
+            raise click.ClickException(f"Job {name} is running in another worker")
+        click.echo(f"{name}: {run.status} in {run.duration_ms} ms {run.result or run.error or ''}")
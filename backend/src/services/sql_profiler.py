@@ -0,0 +1,172 @@
+"""Per-request SQL profiler and N+1 detector for development and staging.
+
+Enable it with ``SQL_PROFILER = True``. Every request then gets a
+``Server-Timing`` header with the query count and time, and statements that
+repeat with the same shape (fingerprint) at least
+``SQL_PROFILER_N_PLUS_ONE_THRESHOLD`` times are logged as N+1 loops with the
+route that issued them. Add ``?_sqlprofile=json`` or ``?_sqlprofile=html`` to
+a request to get the summary instead of the response body.
+"""
+import html
+import re
+import threading
+from collections import deque
+from time import perf_counter
+
+from flask import Response, current_app, jsonify, request
+from sqlalchemy import event
+
+# Per-thread profile of the current request
+_state = threading.local()
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM = re.compile(r"%\(\w+\)s|%s|:\w+|\?")
+_IN_LIST = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+_VALUES_LIST = re.compile(r"(\(\?(?:, \?)*\))(?:, \1)+")
+
+
+def fingerprint(statement):
+    """Statement shape with literals, parameters and IN lists collapsed."""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _STRING.sub("?", shape)
+    shape = _PARAM.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    shape = _IN_LIST.sub("(?)", shape)
+    return _VALUES_LIST.sub(r"\1", shape)
+
+
+class RequestProfile:
+    """Queries of one request, grouped by fingerprint."""
+
+    def __init__(self, method, route, endpoint=None):
+        self.method = method
+        self.route = route
+        self.endpoint = endpoint
+        self.start = perf_counter()
+        self.duration = None
+        self.query_count = 0
+        self.query_seconds = 0.0
+        self.statements = {}
+
+    def add(self, statement, seconds):
+        self.query_count += 1
+        self.query_seconds += seconds
+        shape = fingerprint(statement)
+        entry = self.statements.get(shape)
+        if entry is None:
+            entry = self.statements[shape] = {"fingerprint": shape, "count": 0, "seconds": 0.0}
+        entry["count"] += 1
+        entry["seconds"] += seconds
+
+    def repeated(self, threshold):
+        """Fingerprints executed at least ``threshold`` times, most frequent first."""
+        return sorted(
+            (entry for entry in self.statements.values() if entry["count"] >= threshold),
+            key=lambda entry: entry["count"],
+            reverse=True,
+        )
+
+    def to_dict(self, threshold):
+        return {
+            "method": self.method,
+            "route": self.route,
+            "endpoint": self.endpoint,
+            "duration_ms": round((self.duration or 0) * 1000, 2),
+            "query_count": self.query_count,
+            "query_ms": round(self.query_seconds * 1000, 2),
+            "n_plus_one": [
+                dict(entry, seconds=round(entry["seconds"], 6)) for entry in self.repeated(threshold)
+            ],
+            "statements": [
+                dict(entry, seconds=round(entry["seconds"], 6))
+                for entry in sorted(self.statements.values(), key=lambda entry: entry["seconds"], reverse=True)
+            ],
+        }
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if getattr(_state, "profile", None) is not None:
+        _state.query_start = perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = getattr(_state, "profile", None)
+    if profile is not None:
+        profile.add(statement, perf_counter() - _state.query_start)
+
+
+def _before_request():
+    if not current_app.config.get("SQL_PROFILER"):
+        _state.profile = None
+        return
+    route = request.url_rule.rule if request.url_rule else request.path
+    _state.profile = RequestProfile(request.method, route, request.endpoint)
+
+
+def _render_html(summary):
+    rows = "".join(
+        f"<tr><td>{entry['count']}</td><td>{entry['seconds'] * 1000:.2f}</td>"
+        f"<td><code>{html.escape(entry['fingerprint'])}</code></td></tr>"
+        for entry in summary["statements"]
+    )
+    flagged = "".join(
+        f"<li>{entry['count']} &times; <code>{html.escape(entry['fingerprint'])}</code></li>"
+        for entry in summary["n_plus_one"]
+    )
+    return (
+        f"<html><head><title>SQL profile</title></head><body>"
+        f"<h1>{html.escape(summary['method'])} {html.escape(summary['route'])}</h1>"
+        f"<p>{summary['query_count']} queries, {summary['query_ms']} ms of "
+        f"{summary['duration_ms']} ms</p>"
+        f"<h2>N+1 candidates</h2><ul>{flagged or '<li>none</li>'}</ul>"
+        f"<h2>Statements</h2><table><tr><th>Count</th><th>ms</th><th>Statement</th></tr>{rows}</table>"
+        f"</body></html>"
+    )
+
+
+def _after_request(response):
+    profile = getattr(_state, "profile", None)
+    if profile is None:
+        return response
+    _state.profile = None
+    profile.duration = perf_counter() - profile.start
+
+    config = current_app.config
+    threshold = config.get("SQL_PROFILER_N_PLUS_ONE_THRESHOLD", 5)
+    for entry in profile.repeated(threshold):
+        current_app.logger.warning(
+            "Possible N+1 on %s %s: %d x %s",
+            profile.method, profile.route, entry["count"], entry["fingerprint"],
+        )
+
+    history = current_app.extensions["sql_profiler"]
+    history.append(profile)
+
+    output = request.args.get("_sqlprofile")
+    if output == "json":
+        response = jsonify(profile.to_dict(threshold))
+    elif output == "html":
+        response = Response(_render_html(profile.to_dict(threshold)), mimetype="text/html")
+
+    response.headers.add(
+        "Server-Timing",
+        f'db;dur={profile.query_seconds * 1000:.2f};desc="{profile.query_count} queries", '
+        f"app;dur={profile.duration * 1000:.2f}",
+    )
+    return response
+
+
+def init_app(app, db):
+    """Register the profiler hooks; they stay idle unless SQL_PROFILER is set."""
+    app.config.setdefault("SQL_PROFILER", False)
+    app.config.setdefault("SQL_PROFILER_N_PLUS_ONE_THRESHOLD", 5)
+    # The most recent request profiles, used by the query budget pytest plugin
+    app.extensions["sql_profiler"] = deque(maxlen=app.config.get("SQL_PROFILER_HISTORY", 100))
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(db.engine, "after_cursor_execute", _after_cursor_execute)
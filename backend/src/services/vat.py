@@ -0,0 +1,128 @@
+"""Shared line total and VAT calculation for quotes, work orders and invoices.
+
+Amounts are handled as integers in cents, quantities and VAT rates in
+hundredths, so a whole document is computed in one batched numpy pass with
+exact half-up rounding to the cent, per line.
+"""
+import operator
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+
+# Products above this bound could overflow int64; fall back to Python ints.
+_INT64_SAFE = 2 ** 62
+
+
+_HUNDRED = Decimal(100)
+
+
+def _scaled(values):
+    """Convert decimal-like values to integers in hundredths (cents)."""
+    try:
+        # Fast path for Decimal and int columns that already fit in cents.
+        hundredths = list(map(_HUNDRED.__mul__, values))
+        scaled = list(map(int, hundredths))
+        if all(map(operator.eq, scaled, hundredths)):
+            return scaled
+    except TypeError:
+        pass
+    scaled = []
+    for value in values:
+        if not isinstance(value, Decimal):
+            value = Decimal(str(value if value is not None else 0))
+        scaled.append(int((value * _HUNDRED).to_integral_value(rounding=ROUND_HALF_UP)))
+    return scaled
+
+
+def _as_arrays(*columns):
+    """Build int64 arrays, or Python-int object arrays when products could overflow."""
+    arrays = [np.asarray(column) for column in columns]
+    bound = max((int(abs(array).max()) for array in arrays if len(array)), default=0)
+    dtype = np.int64 if bound * bound * 100 < _INT64_SAFE else object
+    return [array.astype(dtype) for array in arrays]
+
+
+def _div_round(numerator, denominator):
+    """Integer division rounding half away from zero, like ROUND_HALF_UP."""
+    magnitude = (abs(numerator) * 2 + denominator) // (denominator * 2)
+    if isinstance(magnitude, np.ndarray):
+        return np.where(numerator < 0, -magnitude, magnitude)
+    return -magnitude if numerator < 0 else magnitude
+
+
+def _to_decimal(cents):
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def split_cents(line_cents, rate_hundredths, prices_include_vat):
+    """Split line totals in cents into (net, vat) cents."""
+    if prices_include_vat:
+        net = _div_round(line_cents * 10000, rate_hundredths + 10000)
+        return net, line_cents - net
+    return line_cents, _div_round(line_cents * rate_hundredths, 10000)
+
+
+def compute_totals_cents(quantities, unit_prices, vat_rates, prices_include_vat=False):
+    """Batched kernel over integer arrays.
+
+    ``quantities`` and ``vat_rates`` are in hundredths, ``unit_prices`` in
+    cents. Returns line totals and per-rate net/VAT sums as integer arrays in
+    cents, plus the document subtotal and VAT as ints.
+    """
+    quantity, price, rate = _as_arrays(quantities, unit_prices, vat_rates)
+    if not len(quantity) == len(price) == len(rate):
+        raise ValueError("quantities, unit_prices and vat_rates must have equal length")
+
+    line = _div_round(quantity * price, 100)
+    net, vat = split_cents(line, rate, prices_include_vat)
+
+    rates, group = np.unique(rate, return_inverse=True)
+    net_by_rate = np.zeros(len(rates), dtype=net.dtype)
+    vat_by_rate = np.zeros(len(rates), dtype=vat.dtype)
+    np.add.at(net_by_rate, group, net)
+    np.add.at(vat_by_rate, group, vat)
+
+    return {
+        "line_totals": line,
+        "vat_rates": rates,
+        "subtotal_by_rate": net_by_rate,
+        "vat_by_rate": vat_by_rate,
+        "subtotal": int(net_by_rate.sum()),
+        "vat_amount": int(vat_by_rate.sum()),
+    }
+
+
+def compute_totals(quantities, unit_prices, vat_rates, prices_include_vat=False):
+    """Compute document totals and the per-VAT-rate breakdown.
+
+    Takes equally long sequences of Decimal, str, int or float values.
+    Invoice prices exclude VAT; quote and work order line totals include it
+    (``prices_include_vat=True``). Every line is rounded to the cent before
+    it is summed, so the document totals equal the sum of the lines.
+    """
+    cents = compute_totals_cents(
+        _scaled(quantities), _scaled(unit_prices), _scaled(vat_rates), prices_include_vat
+    )
+    subtotal, vat_amount = cents["subtotal"], cents["vat_amount"]
+    return {
+        "subtotal": _to_decimal(subtotal),
+        "vat_amount": _to_decimal(vat_amount),
+        "total_amount": _to_decimal(subtotal + vat_amount),
+        "vat_breakdown": [
+            {
+                "vat_rate": _to_decimal(rate),
+                "subtotal": _to_decimal(net),
+                "vat_amount": _to_decimal(vat),
+            }
+            for rate, net, vat in zip(
+                cents["vat_rates"], cents["subtotal_by_rate"], cents["vat_by_rate"]
+            )
+        ],
+    }
+
+
+def split_amount(amount, vat_rate, prices_include_vat=True):
+    """Split one amount into (net, vat) with the rounding of :func:`compute_totals`."""
+    (line,), (rate,) = _scaled([amount]), _scaled([vat_rate])
+    net, vat = split_cents(line, rate, prices_include_vat)
+    return _to_decimal(net), _to_decimal(vat)
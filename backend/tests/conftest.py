@@ -2,6 +2,7 @@ import pytest
 import uuid
 from src.main import create_app
 from src.models.database import db, Company, User
+from src.services import activity
 from flask_jwt_extended import create_access_token
 
 @pytest.fixture(scope='function')
@@ -12,6 +13,13 @@ def app():
         'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
         'SECRET_KEY': 'test-secret-key',
         'JWT_SECRET_KEY': 'test-jwt-secret-key',
+        # Hash inline with cheap parameters to keep the tests fast
+        'PASSWORD_HASH_WORKERS': 0,
+        'BCRYPT_ROUNDS': 4,
+        'ARGON2_TIME_COST': 1,
+        'ARGON2_MEMORY_COST': 1024,
+        # No background flush thread; tests flush explicitly
+        'LAST_LOGIN_FLUSH_INTERVAL': 0,
     })
     yield app
 
@@ -22,6 +30,8 @@ def db_session(app):
         db.create_all()
         yield db.session
         db.session.remove()
+        # Write buffered last-login times while the tables still exist
+        activity.flush()
         db.drop_all()
 
 @pytest.fixture(scope='function')
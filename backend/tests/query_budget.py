@@ -0,0 +1,46 @@
+"""
+Pytest plugin that fails tests exceeding a declared SQL query budget.
+
+    @pytest.mark.query_budget("invoices.create_invoice", 20)
+    def test_create_invoice(client, auth_headers): ...
+
+The budget applies to every request the test makes to that endpoint (the
+Flask endpoint name or the route rule). The SQL profiler is switched on for
+marked tests and its request profiles are checked after the test body ran.
+"""
+import pytest
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "query_budget(endpoint, max_queries): fail when a request to endpoint runs more queries",
+    )
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    budgets = {marker.args[0]: marker.args[1] for marker in item.iter_markers("query_budget")}
+    app = item.funcargs.get("app") if budgets else None
+    if app is None:
+        return (yield)
+
+    app.config["SQL_PROFILER"] = True
+    history = app.extensions["sql_profiler"]
+    history.clear()
+    result = yield
+
+    threshold = app.config["SQL_PROFILER_N_PLUS_ONE_THRESHOLD"]
+    for profile in history:
+        budget = budgets.get(profile.endpoint, budgets.get(profile.route))
+        if budget is not None and profile.query_count > budget:
+            repeated = "".join(
+                f"\n    {entry['count']} x {entry['fingerprint']}"
+                for entry in profile.repeated(threshold)
+            )
+            pytest.fail(
+                f"{profile.method} {profile.route} ran {profile.query_count} queries, "
+                f"budget is {budget}{repeated}",
+                pytrace=False,
+            )
+    return result
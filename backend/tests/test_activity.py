@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from src.models.database import User, db
+from src.services import activity
+
+
+@pytest.fixture
+def statements(app, db_session):
+    """SQL statements executed while the test runs, with their parameters."""
+    recorded = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        recorded.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', _record)
+    yield recorded
+    event.remove(db.engine, 'before_cursor_execute', _record)
+
+
+def _writes(statements):
+    return [statement for statement, _ in statements if not statement.lstrip().startswith('SELECT')]
+
+
+def test_login_does_not_write_last_login(client, db_session, auth_headers, statements):
+    """
+    GIVEN a user with a current password hash
+    WHEN they log in
+    THEN the login only reads, and the time is buffered until the next flush
+    """
+    auth_headers('admin')
+    statements.clear()
+
+    response = client.post('/api/auth/login', json={"email": "admin@test.com", "password": "password123"})
+
+    assert response.status_code == 200
+    assert _writes(statements) == []
+    user = User.query.filter_by(email="admin@test.com").first()
+    assert user.last_login is None
+    assert activity.last_login(user) is not None
+
+
+def test_me_includes_the_buffered_login(client, db_session, auth_headers):
+    headers = auth_headers('admin')
+    client.post('/api/auth/login', json={"email": "admin@test.com", "password": "password123"})
+
+    response = client.get('/api/auth/me', headers=headers)
+
+    assert response.get_json()['user']['last_login'] is not None
+
+
+def test_flush_writes_all_users_in_one_statement(app, db_session, auth_headers, statements):
+    """
+    GIVEN buffered logins of several users
+    WHEN the buffer is flushed
+    THEN one UPDATE statement writes them all and the buffer is empty
+    """
+    for role in ('admin', 'manager', 'technician'):
+        auth_headers(role)
+    users = User.query.all()
+    when = datetime(2024, 5, 1, 9, 30)
+    for user in users:
+        activity.record_login(user.id, when)
+    statements.clear()
+
+    assert activity.flush() == 3
+
+    assert len(_writes(statements)) == 1
+    assert len(statements[0][1]) == 3
+    assert len(app.extensions['last_login']) == 0
+    db_session.expire_all()
+    assert {user.last_login for user in User.query.all()} == {when}
+
+
+def test_flush_never_moves_last_login_backwards(app, db_session, auth_headers):
+    auth_headers('admin')
+    user = User.query.first()
+    later = datetime(2024, 5, 2, 8, 0)
+    user.last_login = later
+    db_session.commit()
+
+    activity.record_login(user.id, later - timedelta(hours=1))
+    activity.flush()
+
+    db_session.expire_all()
+    assert User.query.first().last_login == later
+
+
+def test_full_buffer_is_flushed(app, db_session, auth_headers):
+    """
+    GIVEN a buffer limited to two users and no flush thread
+    WHEN a second user logs in
+    THEN both times are written right away
+    """
+    auth_headers('admin')
+    auth_headers('manager')
+    app.extensions['last_login'].flush_size = 2
+    first, second = User.query.all()
+
+    activity.record_login(first.id)
+    assert len(app.extensions['last_login']) == 1
+    activity.record_login(second.id)
+
+    assert len(app.extensions['last_login']) == 0
+    db_session.expire_all()
+    assert all(user.last_login is not None for user in User.query.all())
@@ -0,0 +1,230 @@
+import gzip
+import importlib.util
+import json
+import math
+import random
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from flask import Flask, g, jsonify, request
+
+
+def _load_api_logger():
+    # api_logger.py is a development tool in the repository root
+    if "api_logger" not in sys.modules:
+        path = Path(__file__).resolve().parents[2] / "api_logger.py"
+        spec = importlib.util.spec_from_file_location("api_logger", path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules["api_logger"] = module
+        spec.loader.exec_module(module)
+    return sys.modules["api_logger"]
+
+
+api_logger = _load_api_logger()
+
+
+@pytest.fixture
+def make_logger(tmp_path):
+    loggers = []
+
+    def _make(**kwargs):
+        logger = api_logger.APILogger(
+            log_file=str(tmp_path / "api_calls.log"),
+            issues_file=str(tmp_path / "api_issues.log"),
+            flush_interval=0.01,
+            **kwargs,
+        )
+        loggers.append(logger)
+        return logger
+
+    yield _make
+    for logger in loggers:
+        logger.close()
+
+
+def _app(logger):
+    app = Flask(__name__)
+
+    @app.route("/api/echo", methods=["POST"])
+    def echo():
+        return jsonify(echo=request.get_json())
+
+    @app.route("/api/ok")
+    def ok():
+        return jsonify(ok=True)
+
+    @app.route("/api/missing")
+    def missing():
+        return jsonify(error="Not found"), 404
+
+    logger.init_app(app)
+    return app
+
+
+def _records(tmp_path):
+    lines = (tmp_path / "api_calls.log").read_text().splitlines()
+    return [json.loads(line[line.index("{"):]) for line in lines]
+
+
+def test_records_are_written_in_batches_by_the_writer(make_logger, tmp_path):
+    """
+    GIVEN a logger with batches of two records
+    WHEN five requests are made and the logger is flushed
+    THEN every request is written, and the issues log gets the 404
+    """
+    logger = make_logger(batch_size=2)
+    client = _app(logger).test_client()
+
+    for _ in range(4):
+        client.get("/api/ok")
+    client.get("/api/missing")
+    logger.flush()
+
+    records = _records(tmp_path)
+    assert [record["response"]["status_code"] for record in records] == [200, 200, 200, 200, 404]
+    assert records[0]["route"] == "/api/ok"
+    assert logger.stats() == {"enqueued": 5, "written": 5, "dropped": 0, "sampled_out": 0, "queued": 0}
+    assert "404 NOT FOUND: GET /api/missing" in (tmp_path / "api_issues.log").read_text()
+
+
+def test_full_queue_drops_and_counts_records(make_logger, monkeypatch):
+    logger = make_logger(queue_size=2)
+    # No writer draining the queue
+    monkeypatch.setattr(logger, "_ensure_writer", lambda: None)
+
+    for i in range(5):
+        logger._enqueue("INFO", {"path": f"/api/{i}"})
+
+    assert logger.stats() == {"enqueued": 2, "written": 0, "dropped": 3, "sampled_out": 0, "queued": 2}
+
+
+def test_sampling_keeps_errors_and_slow_requests(make_logger, tmp_path):
+    """
+    GIVEN a sample rate of 0
+    WHEN successful, failing and slow requests are made
+    THEN only the failing and the slow request are logged
+    """
+    logger = make_logger(sample_rate=0.0)
+    app = _app(logger)
+
+    @app.route("/api/slow")
+    def slow():
+        g.start_time -= 2  # as if the request took two seconds
+        return jsonify(ok=True)
+
+    client = app.test_client()
+    client.get("/api/ok")
+    client.get("/api/missing")
+    client.get("/api/slow")
+    logger.flush()
+
+    assert [record["path"] for record in _records(tmp_path)] == ["/api/missing", "/api/slow"]
+    assert logger.stats()["sampled_out"] == 1
+
+
+def test_bodies_are_truncated(make_logger, tmp_path):
+    logger = make_logger(max_body_bytes=16)
+    client = _app(logger).test_client()
+
+    client.post("/api/echo", data='{"notes":"' + "x" * 100 + '"}', content_type="application/json")
+    logger.flush()
+
+    [record] = _records(tmp_path)
+    assert record["request_body"] == '{"notes":"xxxxxx...[112 bytes]'
+    assert record["response_body"].startswith('{"echo":{"notes"')
+    assert record["response_body"].endswith(" bytes]")
+    assert len(record["response_body"]) < 40
+
+
+def _write_log(path, entries, opener=open):
+    with opener(path, "wt", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(f"2024-05-01 12:00:00,000 - INFO - {json.dumps(entry)}\n")
+
+
+def _entry(timestamp="2024-05-01T12:00:00", path="/api/invoices/", route="/api/invoices/",
+           status_code=200, duration_ms=10.0):
+    return {
+        "timestamp": timestamp,
+        "method": "GET",
+        "path": path,
+        "route": route,
+        "response": {"status_code": status_code, "duration_ms": duration_ms},
+    }
+
+
+def test_sketch_quantiles_are_within_their_relative_accuracy():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(4, 1.2) for _ in range(20000)]
+    sketch = api_logger.LatencySketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+
+    values.sort()
+    for q in (0.5, 0.9, 0.95, 0.99, 0.999):
+        exact = values[math.floor(q * (len(values) - 1))]
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.01)
+
+
+def test_analyzer_reads_rotated_and_gzipped_logs(tmp_path):
+    log_file = tmp_path / "api_calls.log"
+    _write_log(log_file, [_entry(duration_ms=20.0)])
+    _write_log(f"{log_file}.1.gz", [_entry(duration_ms=40.0), _entry(status_code=500)], opener=gzip.open)
+
+    result = api_logger.APICallAnalyzer(log_file=str(log_file), processes=1).collect()
+
+    stats = result["endpoints"]["GET /api/invoices/"]
+    assert result["total"] == stats.count == 3
+    assert stats.errors == {500: 1}
+    assert stats.max_ms == 40.0
+
+
+def test_analyzer_filters_by_time_window(tmp_path):
+    log_file = tmp_path / "api_calls.log"
+    _write_log(log_file, [
+        _entry(timestamp="2024-04-30T23:59:59"),
+        _entry(timestamp="2024-05-01T00:00:00"),
+        _entry(timestamp="2024-05-01T23:59:59"),
+        _entry(timestamp="2024-05-02T00:00:00"),
+    ])
+
+    result = api_logger.APICallAnalyzer(
+        log_file=str(log_file), since=datetime(2024, 5, 1), until="2024-05-02T00:00:00",
+    ).collect()
+
+    assert result["total"] == 2
+
+
+def test_parallel_analysis_merges_like_a_single_pass(tmp_path):
+    """
+    GIVEN three log files with calls to routes with ids, and unknown paths
+    WHEN they are analyzed by worker processes and in one process
+    THEN counts, errors, missing endpoints and percentiles agree
+    """
+    rng = random.Random(3)
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"part{i}.log"
+        _write_log(path, [
+            _entry(
+                path=f"/api/invoices/{rng.randrange(1000)}",
+                route=None,
+                duration_ms=rng.uniform(1, 500),
+                status_code=rng.choice([200, 200, 200, 404]),
+            )
+            for _ in range(500)
+        ])
+        paths.append(str(path))
+
+    parallel = api_logger.APICallAnalyzer(files=paths, processes=3).collect()
+    serial = api_logger.APICallAnalyzer(files=paths, processes=1).collect()
+
+    assert list(parallel["endpoints"]) == ["GET /api/invoices/<id>"]
+    assert parallel["total"] == serial["total"] == 1500
+    assert parallel["missing"] == serial["missing"] == {"GET /api/invoices/<id>"}
+    merged, single = parallel["endpoints"]["GET /api/invoices/<id>"], serial["endpoints"]["GET /api/invoices/<id>"]
+    assert merged.errors == single.errors
+    assert merged.sketch.buckets == single.sketch.buckets
+    assert merged.sketch.quantile(0.95) == single.sketch.quantile(0.95)
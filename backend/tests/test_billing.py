@@ -0,0 +1,361 @@
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import select
+
+from src.models.database import (
+    Customer,
+    Invoice,
+    InvoiceItem,
+    User,
+    WorkOrder,
+    WorkOrderLine,
+    WorkOrderTimeEntry,
+)
+from src.services.billing import (
+    aging_report,
+    mark_overdue_invoices,
+    overdue_invoices,
+    unbilled_time_entries,
+)
+
+
+def _work_order(db_session, user, customer, number, status="completed", line_total="100.00"):
+    work_order = WorkOrder(
+        company_id=user.company_id,
+        customer_id=customer.id,
+        work_order_number=number,
+        title=f"Werkbon {number}",
+        work_date=date(2024, 3, 1),
+        status=status,
+    )
+    db_session.add(work_order)
+    db_session.flush()
+    db_session.add(WorkOrderLine(
+        work_order_id=work_order.id,
+        description="Filter",
+        quantity=Decimal("1"),
+        unit_price=Decimal(line_total),
+        vat_rate=Decimal("21"),
+        line_total=Decimal(line_total),
+    ))
+    db_session.add(WorkOrderTimeEntry(
+        company_id=user.company_id,
+        user_id=user.id,
+        work_order_id=work_order.id,
+        date=date(2024, 3, 1),
+        hours=Decimal("2"),
+        hourly_rate=Decimal("50.00"),
+        description="Montage",
+        billable_amount=Decimal("100.00"),
+        vat_rate=Decimal("21"),
+    ))
+    return work_order
+
+
+def _setup(db_session, customers=2):
+    user = User.query.first()
+    work_orders = []
+    for i in range(customers):
+        customer = Customer(company_name=f"Klant {i} B.V.", company_id=user.company_id)
+        db_session.add(customer)
+        db_session.flush()
+        work_orders.append(_work_order(db_session, user, customer, f"WO-{i}-1"))
+        work_orders.append(_work_order(db_session, user, customer, f"WO-{i}-2"))
+        _work_order(db_session, user, customer, f"WO-{i}-3", status="in_progress")
+    db_session.commit()
+    return work_orders
+
+
+def test_billing_run_dry_run_writes_nothing(client, db_session, auth_headers):
+    """
+    GIVEN completed work orders for two customers
+    WHEN a dry billing run is requested
+    THEN the report lists one invoice per customer and nothing is written
+    """
+    headers = auth_headers('admin')
+    _setup(db_session)
+
+    response = client.post('/api/invoices/billing-run', headers=headers, json={"dry_run": True})
+
+    assert response.status_code == 200
+    report = response.get_json()
+    assert report["invoice_count"] == 2
+    assert report["work_order_count"] == 4
+    assert report["time_entry_count"] == 4
+    assert report["subtotal"] == 800.0
+    assert report["vat_amount"] == 168.0
+    assert all(customer["invoice_id"] is None for customer in report["customers"])
+    assert Invoice.query.count() == 0
+    assert WorkOrder.query.filter_by(status="invoiced").count() == 0
+
+
+def test_billing_run_creates_one_invoice_per_customer(client, db_session, auth_headers):
+    """
+    GIVEN completed work orders with billable hours for two customers
+    WHEN a billing run is executed
+    THEN each customer gets one invoice and the work is flagged as invoiced
+    """
+    headers = auth_headers('admin')
+    _setup(db_session)
+
+    response = client.post('/api/invoices/billing-run', headers=headers, json={"payment_terms": 14})
+
+    assert response.status_code == 201
+    report = response.get_json()
+    invoices = Invoice.query.order_by(Invoice.invoice_number).all()
+    assert len(invoices) == 2
+    assert [invoice.invoice_number[-5:] for invoice in invoices] == ["-0001", "-0002"]
+    assert {customer["invoice_id"] for customer in report["customers"]} == {str(i.id) for i in invoices}
+    for invoice in invoices:
+        assert invoice.total_amount == Decimal("484.00")
+        assert (invoice.due_date - invoice.invoice_date).days == 14
+        assert InvoiceItem.query.filter_by(invoice_id=invoice.id).count() == 4
+    assert WorkOrder.query.filter_by(status="invoiced").count() == 4
+    assert WorkOrderTimeEntry.query.filter_by(is_invoiced=False).count() == 2
+
+    # A second run finds nothing left to bill
+    response = client.post('/api/invoices/billing-run', headers=headers, json={})
+    assert response.get_json()["invoice_count"] == 0
+
+
+def test_billing_run_rejects_invoiced_status(client, db_session, auth_headers):
+    headers = auth_headers('admin')
+
+    response = client.post('/api/invoices/billing-run', headers=headers, json={"statuses": ["invoiced"]})
+
+    assert response.status_code == 400
+
+
+def test_billing_run_requires_financial_role(client, db_session, auth_headers):
+    headers = auth_headers('technician')
+
+    response = client.post('/api/invoices/billing-run', headers=headers, json={"dry_run": True})
+
+    assert response.status_code == 403
+
+
+def test_combined_invoice_from_work_orders(client, db_session, auth_headers):
+    """
+    GIVEN two completed work orders of the same customer
+    WHEN a combined invoice is requested for them
+    THEN one invoice holds their lines and unbilled hours
+    """
+    headers = auth_headers('admin')
+    work_orders = _setup(db_session, customers=1)
+
+    response = client.post('/api/invoices/from-work-orders', headers=headers,
+                           json={"work_order_ids": [str(wo.id) for wo in work_orders]})
+
+    assert response.status_code == 201
+    data = response.get_json()
+    assert data["work_orders_count"] == 2
+    assert data["total_amount"] == 484.0
+
+
+def test_billing_queue_aggregates_unbilled_hours(client, db_session, auth_headers):
+    """
+    GIVEN work orders with unbilled hours for two customers
+    WHEN the billing queue is requested
+    THEN unbilled hours and amounts are summed per customer
+    """
+    headers = auth_headers('admin')
+    _setup(db_session)
+
+    response = client.get('/api/invoices/billing-queue', headers=headers)
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert len(data["customers"]) == 2
+    for customer in data["customers"]:
+        assert customer["time_entry_count"] == 3
+        assert customer["work_order_count"] == 3
+        assert customer["hours"] == 6.0
+        assert customer["amount"] == 300.0
+    assert data["total_amount"] == 600.0
+
+
+def test_unbilled_filter_matches_partial_index(db_session):
+    """
+    GIVEN the unbilled time entry filter
+    WHEN SQLite is forced to plan the lookup on the partial billing queue index
+    THEN the filter implies the index predicate, so the index is usable
+    """
+    query = select(WorkOrderTimeEntry.work_order_id).where(
+        WorkOrderTimeEntry.company_id == uuid.uuid4(), *unbilled_time_entries()
+    )
+    compiled = str(query.compile(db_session.get_bind())).replace(
+        "FROM time_registrations", "FROM time_registrations INDEXED BY idx_time_registrations_unbilled"
+    )
+
+    # SQLite raises "no query solution" when the index cannot be used
+    plan = db_session.connection().exec_driver_sql(
+        f"EXPLAIN QUERY PLAN {compiled}", (str(uuid.uuid4()),)
+    ).all()
+
+    assert "idx_time_registrations_unbilled" in " ".join(str(row) for row in plan)
+
+
+def _invoice(db_session, user, customer, number, status, due_date, total="121.00", paid="0"):
+    invoice = Invoice(
+        company_id=user.company_id,
+        customer_id=customer.id,
+        invoice_number=number,
+        status=status,
+        due_date=due_date,
+        total_amount=Decimal(total),
+        paid_amount=Decimal(paid),
+    )
+    db_session.add(invoice)
+    return invoice
+
+
+def test_mark_overdue_invoices(db_session, auth_headers):
+    """
+    GIVEN sent, paid, draft and not yet due invoices
+    WHEN overdue invoices are marked
+    THEN only sent invoices past their due date with an open amount change, counted per company
+    """
+    auth_headers('admin')
+    user = User.query.first()
+    customer = Customer(company_name="Klant B.V.", company_id=user.company_id)
+    db_session.add(customer)
+    db_session.flush()
+    overdue = _invoice(db_session, user, customer, "F-1", "sent", date(2024, 4, 1))
+    partly_paid = _invoice(db_session, user, customer, "F-2", "sent", date(2024, 4, 1), paid="21.00")
+    paid = _invoice(db_session, user, customer, "F-3", "sent", date(2024, 4, 1), paid="121.00")
+    not_due = _invoice(db_session, user, customer, "F-4", "sent", date(2024, 5, 1))
+    draft = _invoice(db_session, user, customer, "F-5", "draft", date(2024, 4, 1))
+    db_session.commit()
+
+    counts = mark_overdue_invoices(today=date(2024, 5, 1))
+
+    assert counts == {user.company_id: 2}
+    db_session.expire_all()
+    assert [overdue.status, partly_paid.status, paid.status, not_due.status, draft.status] == [
+        "overdue", "overdue", "sent", "sent", "draft",
+    ]
+    assert mark_overdue_invoices(today=date(2024, 5, 1)) == {}
+
+
+def test_overdue_filter_matches_partial_index(db_session):
+    query = select(Invoice.id).where(*overdue_invoices(date(2024, 5, 1)))
+    compiled = str(query.compile(db_session.get_bind(), compile_kwargs={"render_postcompile": True})).replace(
+        "FROM invoices", "FROM invoices INDEXED BY idx_invoices_sent_due_date"
+    )
+
+    # SQLite raises "no query solution" when the index cannot be used
+    plan = db_session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", ("2024-05-01",)).all()
+
+    assert "idx_invoices_sent_due_date" in " ".join(str(row) for row in plan)
+
+
+def test_aging_report_buckets_open_amounts_per_customer(db_session, auth_headers):
+    """
+    GIVEN open invoices of two customers due 10 to 120 days ago, and settled ones
+    WHEN the aging report is computed
+    THEN open amounts are summed per customer in their bucket by days past due
+    """
+    auth_headers('admin')
+    user = User.query.first()
+    bakker = Customer(company_name="Bakker B.V.", company_id=user.company_id)
+    jansen = Customer(company_name="Jansen B.V.", company_id=user.company_id)
+    db_session.add_all([bakker, jansen])
+    db_session.flush()
+    today = date(2024, 5, 1)
+    _invoice(db_session, user, bakker, "F-1", "sent", today + timedelta(days=14))
+    _invoice(db_session, user, bakker, "F-2", "overdue", today - timedelta(days=30), paid="21.00")
+    _invoice(db_session, user, bakker, "F-3", "overdue", today - timedelta(days=31))
+    _invoice(db_session, user, bakker, "F-4", "overdue", today - timedelta(days=91), total="500.00")
+    _invoice(db_session, user, jansen, "F-5", "overdue", today - timedelta(days=75))
+    _invoice(db_session, user, jansen, "F-6", "paid", today - timedelta(days=75), paid="121.00")
+    _invoice(db_session, user, jansen, "F-7", "draft", today - timedelta(days=75))
+    _invoice(db_session, user, jansen, "F-8", "sent", today - timedelta(days=75), paid="121.00")
+    db_session.commit()
+
+    report = aging_report(user.company_id, today)
+
+    assert [customer["customer_name"] for customer in report["customers"]] == ["Bakker B.V.", "Jansen B.V."]
+    bakker_row, jansen_row = report["customers"]
+    assert bakker_row["invoice_count"] == 4
+    assert bakker_row["oldest_due_date"] == today - timedelta(days=91)
+    assert [bakker_row[name] for name in ("days_0_30", "days_31_60", "days_61_90", "days_90_plus")] == [
+        Decimal("221.00"), Decimal("121.00"), Decimal("0"), Decimal("500.00"),
+    ]
+    assert jansen_row["days_61_90"] == jansen_row["total"] == Decimal("121.00")
+    assert report["totals"]["total"] == Decimal("963.00")
+
+
+def test_aging_endpoint_is_cached_until_an_invoice_changes(client, db_session, auth_headers):
+    """
+    GIVEN a cached aging report
+    WHEN an invoice is updated through the API
+    THEN the next request reflects the payment, also as CSV
+    """
+    headers = auth_headers('financial')
+    user = User.query.first()
+    customer = Customer(company_name="Klant B.V.", company_id=user.company_id)
+    db_session.add(customer)
+    db_session.flush()
+    invoice = _invoice(db_session, user, customer, "F-1", "overdue", date.today() - timedelta(days=45))
+    db_session.commit()
+
+    first = client.get('/api/invoices/aging', headers=headers)
+    assert first.status_code == 200
+    assert first.get_json()["totals"]["days_31_60"] == 121.0
+
+    # Changed behind the API's back, so the cached report is still served
+    invoice.paid_amount = Decimal("100.00")
+    db_session.commit()
+    assert client.get('/api/invoices/aging', headers=headers).get_json()["totals"]["days_31_60"] == 121.0
+
+    response = client.put(f'/api/invoices/{invoice.id}', headers=headers, json={"notes": "Deels betaald"})
+    assert response.status_code == 200
+
+    assert client.get('/api/invoices/aging', headers=headers).get_json()["totals"]["days_31_60"] == 21.0
+    csv_response = client.get('/api/invoices/aging?format=csv', headers=headers)
+    assert csv_response.mimetype == "text/csv"
+    lines = csv_response.get_data(as_text=True).splitlines()
+    assert lines[0].startswith("customer_id,customer_name,invoice_count,oldest_due_date,days_0_30")
+    assert lines[1].endswith("Klant B.V.,1,%s,0.00,21.00,0.00,0.00,21.00" % (date.today() - timedelta(days=45)))
+    assert lines[-1] == ",Total,,,0.00,21.00,0.00,0.00,21.00"
+
+
+def test_aging_endpoint_requires_financial_role(client, auth_headers):
+    response = client.get('/api/invoices/aging', headers=auth_headers('technician'))
+
+    assert response.status_code == 403
+
+
+
+def test_invoice_list_reports_payment_terms(client, db_session, auth_headers):
+    """
+    GIVEN an invoice created with 14 days payment terms
+    WHEN the invoice list is requested
+    THEN the terms are derived from its invoice and due dates
+    """
+    headers = auth_headers('financial')
+    user = User.query.first()
+    customer = Customer(company_name="Klant B.V.", company_id=user.company_id)
+    db_session.add(customer)
+    db_session.commit()
+    response = client.post('/api/invoices/', headers=headers, json={
+        "customer_id": str(customer.id),
+        "invoice_date": "2024-05-01",
+        "payment_terms": 14,
+        "invoice_lines": [{"description": "Onderhoud", "quantity": 1, "unit_price": "100.00"}],
+    })
+    assert response.status_code == 201
+    invoice_id = response.get_json()["id"]
+
+    response = client.get('/api/invoices/', headers=headers)
+
+    assert response.status_code == 200
+    [invoice] = response.get_json()["invoices"]
+    assert invoice["payment_terms"] == 14
+    assert invoice["due_date"] == "2024-05-15"
+    assert invoice["items_count"] == 1
+    response = client.put(f'/api/invoices/{invoice_id}', headers=headers,
+                          json={"payment_terms": 30, "work_order_ids": [], "notes": "Herinnering"})
+    assert response.status_code == 200
@@ -0,0 +1,89 @@
+import time
+
+from src.models.database import ArticleCategory, User
+from src.services.cache import _MISSING, LocalCache, MemoryBackend, TenantCache, cache
+
+
+def test_local_cache_evicts_least_recently_used():
+    local = LocalCache(maxsize=2)
+    local.set("a", 1, ttl=60)
+    local.set("b", 2, ttl=60)
+    local.get("a")
+    local.set("c", 3, ttl=60)
+
+    assert local.get("a") == 1
+    assert local.get("c") == 3
+    assert local.get("b") is _MISSING
+
+
+def test_entries_expire_after_ttl():
+    tenant_cache = TenantCache(ttl=0.01)
+    loads = []
+
+    tenant_cache.get_or_set("c1", "categories", lambda: loads.append(1) or ["x"])
+    time.sleep(0.02)
+    tenant_cache.get_or_set("c1", "categories", lambda: loads.append(1) or ["x"])
+
+    assert len(loads) == 2
+
+
+def test_keys_are_namespaced_per_company_and_shared_between_processes():
+    """
+    GIVEN two caches sharing one backend, as two workers would
+    WHEN one worker fills and later invalidates a company key
+    THEN the other worker reads it from the backend, and other companies are unaffected
+    """
+    backend = MemoryBackend()
+    worker_a = TenantCache(backend=backend, local_ttl=0, prefix="test-shared")
+    worker_b = TenantCache(backend=backend, local_ttl=0, prefix="test-shared")
+
+    assert worker_a.get_or_set("c1", "settings", lambda: {"vat": 21}) == {"vat": 21}
+    assert worker_b.get_or_set("c1", "settings", lambda: {"vat": 0}) == {"vat": 21}
+    assert worker_b.get_or_set("c2", "settings", lambda: {"vat": 9}) == {"vat": 9}
+    assert worker_b.stats() == {"hits": 1, "misses": 1}
+
+    worker_a.invalidate("c1", "settings")
+
+    assert worker_b.get_or_set("c1", "settings", lambda: {"vat": 0}) == {"vat": 0}
+    assert worker_b.get_or_set("c2", "settings", lambda: {"vat": 0}) == {"vat": 9}
+
+
+def test_categories_are_cached_until_a_write(app, client, db_session, auth_headers):
+    """
+    GIVEN article categories of a company
+    WHEN the category list is read twice and a category is added through the API
+    THEN the second read is a cache hit and the write invalidates the list
+    """
+    headers = auth_headers('admin')
+    company_id = User.query.first().company_id
+    db_session.add_all([ArticleCategory(company_id=company_id, name=f"Groep {i}") for i in range(5)])
+    db_session.commit()
+
+    app.config['SQL_PROFILER'] = True
+    response = client.get('/api/articles/categories?_sqlprofile=json', headers=headers)
+    statements = [entry['fingerprint'] for entry in response.get_json()['statements']]
+    assert not any(statement.startswith('SELECT count(*)') for statement in statements)
+    app.config['SQL_PROFILER'] = False
+
+    hits = cache.hits
+    assert len(client.get('/api/articles/categories', headers=headers).get_json()['categories']) == 5
+    assert cache.hits == hits + 1
+
+    client.post('/api/articles/categories', headers=headers, json={"name": "Groep 5"})
+
+    assert len(client.get('/api/articles/categories', headers=headers).get_json()['categories']) == 6
+
+
+def test_company_settings_are_invalidated_on_update(client, db_session, auth_headers):
+    headers = auth_headers('admin')
+    company_id = User.query.first().company_id
+
+    response = client.get(f'/api/companies/{company_id}/settings', headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()['company_info']['name'] == "Test Bedrijf B.V."
+
+    response = client.put(f'/api/companies/{company_id}', headers=headers, json={"name": "Nieuw B.V."})
+    assert response.status_code == 200
+
+    response = client.get(f'/api/companies/{company_id}/settings', headers=headers)
+    assert response.get_json()['company_info']['name'] == "Nieuw B.V."
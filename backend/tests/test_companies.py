@@ -0,0 +1,39 @@
+from decimal import Decimal
+
+from src.models.database import Article, Company, Customer, Invoice, InvoiceItem, Location
+
+
+def test_delete_company_removes_its_customers_and_articles(client, db_session, auth_headers):
+    """
+    GIVEN a company without users, with a customer, location, invoice and article
+    WHEN an admin deletes the company
+    THEN the database's ON DELETE CASCADE removes all of them, also on SQLite
+    """
+    headers = auth_headers('admin')
+    company = Company(name="Opgeheven B.V.")
+    db_session.add(company)
+    db_session.flush()
+    customer = Customer(company_id=company.id, company_name="Klant B.V.")
+    db_session.add_all([customer, Article(
+        company_id=company.id, code="B-15", name="Bocht 15mm", selling_price=Decimal("2.95"),
+    )])
+    db_session.flush()
+    invoice = Invoice(company_id=company.id, customer_id=customer.id, invoice_number="F-1")
+    db_session.add_all([invoice, Location(customer_id=customer.id, name="Hoofdlocatie", address="Dorpsstraat 1")])
+    db_session.flush()
+    db_session.add(InvoiceItem(
+        invoice_id=invoice.id, description="Onderhoud", quantity=Decimal("1"),
+        unit_price=Decimal("100.00"), vat_rate=Decimal("21"), line_total=Decimal("100.00"),
+    ))
+    db_session.commit()
+    company_id = company.id
+
+    response = client.delete(f'/api/companies/{company_id}', headers=headers)
+
+    assert response.status_code == 200
+    db_session.expire_all()
+    assert Customer.query.filter_by(company_id=company_id).count() == 0
+    assert Article.query.filter_by(company_id=company_id).count() == 0
+    assert Invoice.query.filter_by(company_id=company_id).count() == 0
+    assert Location.query.count() == 0
+    assert InvoiceItem.query.count() == 0
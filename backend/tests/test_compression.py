@@ -0,0 +1,80 @@
+import gzip
+
+from sqlalchemy import event
+
+from src.models.database import Customer, User, db
+
+
+def _add_customers(db_session, count=20):
+    company_id = User.query.first().company_id
+    db_session.add_all([
+        Customer(
+            company_id=company_id,
+            company_name=f"Klant {i:02d} B.V.",
+            city="Utrecht",
+            notes="Sleutel ligt bij de buren. " * 20,
+        )
+        for i in range(count)
+    ])
+    db_session.commit()
+
+
+def test_large_responses_are_gzipped(client, db_session, auth_headers):
+    """
+    GIVEN a customer list larger than the compression threshold
+    WHEN a client accepting gzip requests it
+    THEN the body is gzip encoded and caches are told it varies by encoding
+    """
+    headers = auth_headers('admin')
+    _add_customers(db_session)
+
+    plain = client.get('/api/customers/', headers=headers)
+    response = client.get('/api/customers/', headers={**headers, 'Accept-Encoding': 'gzip, deflate'})
+
+    assert plain.headers.get('Content-Encoding') is None
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert int(response.headers['Content-Length']) < len(plain.data) / 4
+    assert gzip.decompress(response.data) == plain.data
+
+
+def test_small_responses_are_not_compressed(client, db_session, auth_headers):
+    headers = {**auth_headers('admin'), 'Accept-Encoding': 'gzip'}
+
+    response = client.get('/api/customers/', headers=headers)
+
+    assert response.headers.get('Content-Encoding') is None
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+
+def test_sparse_fieldset_loads_only_requested_columns(app, client, db_session, auth_headers):
+    """
+    GIVEN customers with long notes
+    WHEN the list is requested with ?fields=company_name,city
+    THEN only those fields (and id) are returned and selected from the database
+    """
+    headers = auth_headers('admin')
+    _add_customers(db_session, 3)
+    statements = []
+
+    def _record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', _record)
+    try:
+        response = client.get('/api/customers/?fields=company_name,city', headers=headers)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _record)
+
+    assert response.status_code == 200
+    assert response.get_json()['customers'][0] == {"id": response.get_json()['customers'][0]['id'], "company_name": "Klant 00 B.V.", "city": "Utrecht"}
+    select = next(s for s in statements if s.startswith('SELECT customers.id') and 'LIMIT' in s)
+    assert 'customers.notes' not in select
+    assert 'locations' not in select
+
+
+def test_sparse_fieldset_rejects_unknown_fields(client, db_session, auth_headers):
+    response = client.get('/api/articles/?fields=code,password', headers=auth_headers('admin'))
+
+    assert response.status_code == 400
+    assert response.get_json()['errors'] == {"fields": ["Unknown field: password"]}
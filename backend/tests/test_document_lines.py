@@ -0,0 +1,101 @@
+import json
+from contextlib import contextmanager
+from sqlalchemy import event
+from src.models.database import db, Article, Customer, Invoice, InvoiceItem, User
+
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", _before_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", _before_execute)
+
+
+def test_create_invoice_inserts_lines_in_bulk(client, db_session, auth_headers):
+    """
+    GIVEN an invoice payload with 300 lines referencing articles
+    WHEN a POST request is made to /api/invoices/
+    THEN all lines are stored with a handful of statements instead of one per line
+    """
+    headers = auth_headers('admin')
+    company_id = User.query.first().company_id
+    customer = Customer(company_name="Bulk Klant B.V.", company_id=company_id)
+    articles = [
+        Article(company_id=company_id, code=f"A{i}", name=f"Artikel {i}", selling_price=10)
+        for i in range(3)
+    ]
+    db_session.add_all([customer, *articles])
+    db_session.commit()
+
+    payload = {
+        "customer_id": str(customer.id),
+        "invoice_lines": [
+            {"article_id": str(articles[i % 3].id), "quantity": 2, "unit_price": "12.50"}
+            for i in range(300)
+        ],
+    }
+    with count_statements() as statements:
+        response = client.post('/api/invoices/', headers=headers, data=json.dumps(payload), content_type='application/json')
+
+    assert response.status_code == 201
+    assert len(statements) < 20
+    assert sum('FROM articles' in s for s in statements) == 1
+
+    invoice = Invoice.query.get(response.get_json()['id'])
+    items = InvoiceItem.query.filter_by(invoice_id=invoice.id).order_by(InvoiceItem.sort_order).all()
+    assert len(items) == 300
+    assert items[0].description == "Artikel 0"
+    assert float(invoice.subtotal) == 7500.0
+
+
+def test_create_invoice_unknown_article(client, db_session, auth_headers):
+    """
+    GIVEN an invoice payload referencing an article of another company
+    WHEN a POST request is made to /api/invoices/
+    THEN a 404 status code should be returned and no invoice is stored
+    """
+    headers = auth_headers('admin')
+    customer = Customer(company_name="Bulk Klant B.V.", company_id=User.query.first().company_id)
+    db_session.add(customer)
+    db_session.commit()
+
+    payload = {
+        "customer_id": str(customer.id),
+        "invoice_lines": [{"article_id": "00000000-0000-0000-0000-000000000001", "quantity": 1, "unit_price": 5}],
+    }
+    response = client.post('/api/invoices/', headers=headers, data=json.dumps(payload), content_type='application/json')
+
+    assert response.status_code == 404
+    assert Invoice.query.count() == 0
+
+
+def test_sub_cent_unit_prices_match_the_invoice_totals(client, db_session, auth_headers):
+    """
+    GIVEN an invoice line with a unit price of 10.005
+    WHEN the invoice is created
+    THEN the line is priced at 10.01 and its total equals the invoice subtotal
+    """
+    headers = auth_headers('admin')
+    customer = Customer(company_name="Bulk Klant B.V.", company_id=User.query.first().company_id)
+    db_session.add(customer)
+    db_session.commit()
+
+    payload = {
+        "customer_id": str(customer.id),
+        "invoice_lines": [{"description": "Koppeling", "quantity": 2, "unit_price": "10.005"}],
+    }
+    response = client.post('/api/invoices/', headers=headers, data=json.dumps(payload), content_type='application/json')
+
+    assert response.status_code == 201
+    invoice = Invoice.query.one()
+    [line] = InvoiceItem.query.filter_by(invoice_id=invoice.id).all()
+    assert str(line.unit_price) == "10.01"
+    assert str(line.line_total) == "20.02"
+    assert invoice.subtotal == line.line_total
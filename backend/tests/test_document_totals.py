@@ -0,0 +1,107 @@
+import random
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from src.models.database import Customer, User, WorkOrder
+from src.services.document_totals import (
+    TotalsMismatch,
+    apply_totals_delta,
+    full_totals,
+    item_contribution,
+    verify_totals,
+)
+
+VAT_RATES = [Decimal("0"), Decimal("9"), Decimal("21")]
+
+
+def _random_line(rng):
+    quantity = Decimal(rng.randint(1, 400)) / 4
+    unit_price = Decimal(rng.randint(1, 100000)) / 100
+    return SimpleNamespace(line_total=quantity * unit_price, vat_rate=rng.choice(VAT_RATES))
+
+
+def _random_time_entry(rng):
+    return SimpleNamespace(
+        is_billable=rng.random() < 0.8,
+        billable_amount=Decimal(rng.randint(0, 50000)) / 100,
+        vat_rate=rng.choice(VAT_RATES),
+    )
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_incremental_totals_match_full_recompute(seed):
+    """
+    GIVEN a random sequence of added, changed and removed lines and time entries
+    WHEN each step is applied to the header as a delta
+    THEN the header always equals a full recompute, to the cent
+    """
+    rng = random.Random(seed)
+    document = SimpleNamespace(lines=[], time_entries=[], subtotal=None, vat_amount=None, total_amount=None)
+
+    for _ in range(60):
+        collection = rng.choice([document.lines, document.time_entries])
+        factory = _random_line if collection is document.lines else _random_time_entry
+        action = rng.choice(["add", "add", "change", "remove"]) if collection else "add"
+
+        if action == "add":
+            item = factory(rng)
+            collection.append(item)
+            apply_totals_delta(document, added=[item_contribution(item)])
+        elif action == "change":
+            item = rng.choice(collection)
+            before = item_contribution(item)
+            vars(item).update(vars(factory(rng)))
+            apply_totals_delta(document, added=[item_contribution(item)], removed=[before])
+        else:
+            item = collection.pop(rng.randrange(len(collection)))
+            apply_totals_delta(document, removed=[item_contribution(item)])
+
+        verify_totals(document)
+        assert document.total_amount == sum(full_totals(document))
+
+
+def test_verify_totals_detects_drift():
+    line = SimpleNamespace(line_total=Decimal("121.00"), vat_rate=Decimal("21"))
+    document = SimpleNamespace(lines=[line], subtotal=Decimal("100.00"), vat_amount=Decimal("20.00"))
+
+    with pytest.raises(TotalsMismatch):
+        verify_totals(document)
+
+
+def test_time_entries_update_totals_incrementally(app, client, db_session, auth_headers):
+    """
+    GIVEN a work order with lines and the TOTALS_VERIFY mode enabled
+    WHEN time entries are added, changed and removed
+    THEN the work order totals follow every change
+    """
+    app.config['TOTALS_VERIFY'] = True
+    headers = auth_headers('admin')
+    customer = Customer(company_name="Uren Klant B.V.", company_id=User.query.first().company_id)
+    db_session.add(customer)
+    db_session.commit()
+
+    response = client.post('/api/work-orders/', headers=headers, json={
+        "customer_id": str(customer.id),
+        "title": "Onderhoud",
+        "lines": [{"description": "Filter", "quantity": 1, "unit_price": "121.00", "vat_rate": 21}],
+    })
+    assert response.status_code == 201
+    work_order_id = response.get_json()['work_order_id']
+
+    response = client.post(f'/api/work-orders/{work_order_id}/time-entries', headers=headers,
+                           json={"hours": 2, "hourly_rate": "60.50", "description": "Montage"})
+    assert response.status_code == 201
+    entry_id = response.get_json()['time_entry_id']
+    assert WorkOrder.query.get(work_order_id).total_amount == Decimal("242.00")
+
+    response = client.put(f'/api/work-orders/{work_order_id}/time-entries/{entry_id}', headers=headers,
+                          json={"hours": 1})
+    assert response.status_code == 200
+    work_order = WorkOrder.query.get(work_order_id)
+    assert (work_order.subtotal, work_order.vat_amount) == (Decimal("150.00"), Decimal("31.50"))
+
+    response = client.delete(f'/api/work-orders/{work_order_id}/time-entries/{entry_id}', headers=headers)
+    assert response.status_code == 200
+    assert WorkOrder.query.get(work_order_id).total_amount == Decimal("121.00")
@@ -0,0 +1,41 @@
+import uuid
+
+import sqlalchemy as sa
+
+from src.models.database import Company
+
+
+def test_sqlite_stores_ids_as_16_byte_blobs(db_session):
+    company = Company(name="Blob B.V.")
+    db_session.add(company)
+    db_session.commit()
+
+    stored = db_session.execute(sa.text("SELECT id, typeof(id) FROM companies")).one()
+
+    assert stored[1] == 'blob'
+    assert stored[0] == company.id.bytes
+
+
+def test_text_ids_from_older_databases_still_load(db_session):
+    """
+    GIVEN a row whose id is stored in the earlier CHAR(36) text form
+    WHEN it is read through the model
+    THEN its id comes back as the same UUID
+    """
+    company = Company(name="Tekst B.V.")
+    db_session.add(company)
+    db_session.commit()
+    company_id = company.id
+    db_session.execute(sa.text("UPDATE companies SET id = :id"), {"id": str(company_id)})
+    db_session.expire_all()
+
+    assert db_session.execute(sa.select(Company.id)).scalar_one() == company_id
+
+
+def test_string_ids_bind_like_uuids(db_session):
+    company = Company(name="Tekst B.V.")
+    db_session.add(company)
+    db_session.commit()
+    db_session.expire_all()
+
+    assert db_session.get(Company, str(company.id)).name == "Tekst B.V."
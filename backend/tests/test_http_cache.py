@@ -0,0 +1,99 @@
+from src.models.database import ArticleCategory, Customer, Invoice, User
+
+
+def test_customer_etag_returns_304_until_changed(client, db_session, auth_headers):
+    """
+    GIVEN a customer fetched once with its ETag
+    WHEN it is requested again with If-None-Match
+    THEN the API answers 304 until the customer changes
+    """
+    headers = auth_headers('admin')
+    customer = Customer(company_name="Jansen B.V.", company_id=User.query.first().company_id)
+    db_session.add(customer)
+    db_session.commit()
+
+    response = client.get(f'/api/customers/{customer.id}', headers=headers)
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert etag.startswith('W/"')
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+
+    response = client.get(f'/api/customers/{customer.id}', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+
+    client.put(f'/api/customers/{customer.id}', headers=headers, json={"company_name": "Jansen & Zn B.V."})
+    response = client.get(f'/api/customers/{customer.id}', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_categories_etag_follows_article_changes(client, db_session, auth_headers):
+    headers = auth_headers('admin')
+    company_id = User.query.first().company_id
+    category = ArticleCategory(company_id=company_id, name="Ketels")
+    db_session.add(category)
+    db_session.commit()
+
+    etag = client.get('/api/articles/categories', headers=headers).headers['ETag']
+    assert client.get('/api/articles/categories', headers={**headers, 'If-None-Match': etag}).status_code == 304
+
+    response = client.post('/api/articles/', headers=headers, json={
+        "category_id": str(category.id), "code": "K1", "name": "Ketel", "selling_price": 1000,
+    })
+    assert response.status_code == 201
+
+    response = client.get('/api/articles/categories', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['categories'][0]['article_count'] == 1
+
+
+def test_not_modified_does_not_load_the_invoice(app, client, db_session, auth_headers):
+    """
+    GIVEN an invoice and its current ETag
+    WHEN it is requested with If-None-Match
+    THEN the 304 is answered by the validator query alone
+    """
+    headers = auth_headers('admin')
+    user = User.query.first()
+    customer = Customer(company_name="Klant B.V.", company_id=user.company_id)
+    db_session.add(customer)
+    db_session.flush()
+    invoice = Invoice(company_id=user.company_id, customer_id=customer.id, invoice_number="F2024-0001",
+                      subtotal=0, vat_amount=0, total_amount=0)
+    db_session.add(invoice)
+    db_session.commit()
+
+    response = client.get(f'/api/invoices/{invoice.id}', headers=headers)
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+
+    app.config['SQL_PROFILER'] = True
+    response = client.get(f'/api/invoices/{invoice.id}?_sqlprofile=json', headers={**headers, 'If-None-Match': etag})
+    statements = [entry['fingerprint'] for entry in response.get_json()['statements']]
+    assert not any(statement.startswith('SELECT invoices.id') for statement in statements)
+
+
+def test_write_responses_are_not_cached(client, db_session, auth_headers):
+    headers = auth_headers('admin')
+
+    response = client.post('/api/articles/categories', headers=headers, json={"name": "Pompen"})
+
+    assert response.headers['Cache-Control'] == 'no-store'
+
+
+def test_malformed_ids_are_not_found(client, db_session, auth_headers):
+    """
+    GIVEN ids that are not UUIDs
+    WHEN they are requested from views with conditional GET support
+    THEN the answer is 404, and the session stays usable for the next request
+    """
+    headers = auth_headers('admin')
+
+    for url in ('/api/customers/abc', '/api/invoices/abc', '/api/work-orders/abc', '/api/articles/1'):
+        response = client.get(url, headers=headers)
+        assert response.status_code == 404, url
+        assert response.get_json() == {"error": "Not found"}
+
+    assert client.get('/api/customers/', headers=headers).status_code == 200
@@ -0,0 +1,104 @@
+import socket
+import time
+
+from prometheus_client import REGISTRY
+
+from src.models.database import ArticleCategory, User
+from src.services import invalidation
+from src.services.cache import cache
+from src.services.json_provider import dumps
+
+
+def _lag_count(transport):
+    return REGISTRY.get_sample_value("cache_invalidation_lag_seconds_count", {"transport": transport}) or 0
+
+
+def _fill(company_id):
+    return cache.get_or_set(str(company_id), 'categories', lambda: ["Leidingwerk"])
+
+
+def _cached(company_id):
+    return cache.get_or_set(str(company_id), 'categories', lambda: None)
+
+
+def test_changes_are_applied_when_the_transaction_commits(app, db_session, auth_headers):
+    """
+    GIVEN cached categories of a company
+    WHEN a category is added and the change published
+    THEN the cache keeps its value until the commit, and evicts it afterwards
+    """
+    auth_headers('admin')
+    company_id = User.query.first().company_id
+    _fill(company_id)
+    lag_before = _lag_count("local")
+
+    category = ArticleCategory(company_id=company_id, name="Sanitair")
+    db_session.add(category)
+    db_session.flush()
+    invalidation.publish('article_categories', company_id, category.id)
+    assert _cached(company_id) == ["Leidingwerk"]
+
+    db_session.commit()
+
+    assert _cached(company_id) is None
+    assert _lag_count("local") == lag_before + 1
+
+
+def test_rolled_back_changes_are_dropped(app, db_session, auth_headers):
+    auth_headers('admin')
+    company_id = User.query.first().company_id
+    _fill(company_id)
+
+    db_session.add(ArticleCategory(company_id=company_id, name="Sanitair"))
+    db_session.flush()
+    invalidation.publish('article_categories', company_id)
+    db_session.rollback()
+    db_session.commit()
+
+    assert _cached(company_id) == ["Leidingwerk"]
+
+
+class _Notification:
+    def __init__(self, payload):
+        self.payload = payload
+
+
+class _ListenConnection:
+    """Stands in for a psycopg2 connection with notifications waiting."""
+
+    def __init__(self, bus, payloads):
+        self.bus = bus
+        self.notifies = [_Notification(payload) for payload in payloads]
+        self._reader, self._writer = socket.socketpair()
+        self._writer.send(b"x")
+
+    def fileno(self):
+        return self._reader.fileno()
+
+    def poll(self):
+        self.bus.stop()
+
+
+def test_listener_evicts_changes_of_other_workers(app, db_session):
+    """
+    GIVEN categories cached in this worker
+    WHEN notifications arrive from another worker and from this one
+    THEN the other worker's change evicts the local entry and records its lag
+    """
+    bus = invalidation.InvalidationBus(None, "notify", "cache_invalidation")
+    cache.get_or_set("c1", 'categories', lambda: ["Leidingwerk"])
+    cache.get_or_set("c2", 'categories', lambda: ["Sanitair"])
+    lag_before = _lag_count("notify")
+    change = {"table": "article_categories", "id": None, "committed_at": time.time() - 0.2}
+
+    bus._receive(_ListenConnection(bus, [
+        dumps(dict(change, company_id="c1", origin="worker-2:41")),
+        dumps(dict(change, company_id="c2", origin=bus.origin)),
+    ]))
+
+    assert cache.get_or_set("c1", 'categories', lambda: None) is None
+    assert cache.get_or_set("c2", 'categories', lambda: None) == ["Sanitair"]
+    assert _lag_count("notify") == lag_before + 1
+    assert REGISTRY.get_sample_value(
+        "cache_invalidation_lag_seconds_bucket", {"transport": "notify", "le": "0.1"}
+    ) < _lag_count("notify")
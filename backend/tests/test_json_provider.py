@@ -0,0 +1,64 @@
+import json
+import uuid
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from src.models.database import Customer, User
+from src.services.json_provider import default, dumps, loads
+
+
+def test_model_values_are_serialized_natively():
+    customer_id = uuid.uuid4()
+    payload = {
+        "id": customer_id,
+        "credit_limit": Decimal("1500.50"),
+        "vat_rate": Decimal("21.00"),
+        "invoice_date": date(2024, 3, 1),
+        "created_at": datetime(2024, 3, 1, 9, 30, 15, 120000),
+        "start_time": time(8, 0),
+        "name": "Café de Brug",
+    }
+
+    assert loads(dumps(payload)) == {
+        "id": str(customer_id),
+        "credit_limit": 1500.5,
+        "vat_rate": 21.0,
+        "invoice_date": "2024-03-01",
+        "created_at": "2024-03-01T09:30:15.120000",
+        "start_time": "08:00:00",
+        "name": "Café de Brug",
+    }
+
+
+def test_stdlib_fallback_produces_the_same_document():
+    payload = {
+        "id": uuid.uuid4(),
+        "amounts": [Decimal("0.10"), Decimal("99999999.99"), None],
+        "created_at": datetime(2024, 1, 2, 3, 4, 5),
+    }
+
+    assert json.dumps(payload, default=default, ensure_ascii=False, separators=(",", ":")) == dumps(payload)
+
+
+def test_responses_use_the_fast_provider(client, db_session, auth_headers):
+    """
+    GIVEN a customer with a credit limit
+    WHEN it is fetched through the API
+    THEN decimals are numbers and timestamps ISO 8601 strings
+    """
+    headers = auth_headers('admin')
+    customer = Customer(
+        company_id=User.query.first().company_id,
+        company_name="Klant B.V.",
+        credit_limit=Decimal("2500.00"),
+    )
+    db_session.add(customer)
+    db_session.commit()
+
+    response = client.get(f'/api/customers/{customer.id}', headers=headers)
+    body = response.get_json()['customer']
+
+    assert response.mimetype == 'application/json'
+    assert body['id'] == str(customer.id)
+    assert body['credit_limit'] == 2500.0
+    assert datetime.fromisoformat(body['created_at']) == customer.created_at
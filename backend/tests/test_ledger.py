@@ -0,0 +1,132 @@
+from decimal import Decimal
+
+from src.models.database import Customer, Invoice, User
+from src.services.ledger import reconcile
+
+
+def _customer(db_session, credit_limit=None):
+    customer = Customer(
+        company_name="Klant B.V.",
+        company_id=User.query.first().company_id,
+        credit_limit=credit_limit,
+    )
+    db_session.add(customer)
+    db_session.commit()
+    return customer
+
+
+def _create_invoice(client, headers, customer, unit_price, status="sent"):
+    return client.post('/api/invoices/', headers=headers, json={
+        "customer_id": str(customer.id),
+        "status": status,
+        "invoice_lines": [{"description": "Onderhoud", "quantity": 1, "unit_price": unit_price, "vat_rate": 21}],
+    })
+
+
+def _balance(customer_id):
+    return Customer.query.get(customer_id).open_balance
+
+
+def test_open_balance_follows_invoice_writes(client, db_session, auth_headers):
+    """
+    GIVEN a customer without invoices
+    WHEN invoices are created, sent, paid and deleted
+    THEN the open balance always equals the open amount of sent and overdue invoices
+    """
+    headers = auth_headers('financial')
+    customer = _customer(db_session)
+
+    sent = _create_invoice(client, headers, customer, "100.00").get_json()["id"]
+    draft = _create_invoice(client, headers, customer, "50.00", status="draft").get_json()["id"]
+    assert _balance(customer.id) == Decimal("121.00")
+
+    assert client.put(f'/api/invoices/{draft}', headers=headers, json={"status": "sent"}).status_code == 200
+    assert _balance(customer.id) == Decimal("181.50")
+
+    response = client.post(f'/api/invoices/{sent}/payments', headers=headers, json={"amount": "21.00"})
+    assert response.status_code == 200
+    assert _balance(customer.id) == Decimal("160.50")
+
+    response = client.post(f'/api/invoices/{sent}/payments', headers=headers, json={"amount": "100.00"})
+    assert response.get_json()["status"] == "paid"
+    assert _balance(customer.id) == Decimal("60.50")
+
+    db_session.delete(Invoice.query.get(draft))
+    db_session.commit()
+    assert _balance(customer.id) == Decimal("0.00")
+    assert reconcile() == []
+
+
+def test_rolled_back_invoice_leaves_the_balance_alone(db_session, auth_headers):
+    auth_headers('admin')
+    customer = _customer(db_session)
+
+    db_session.add(Invoice(
+        company_id=customer.company_id, customer_id=customer.id, invoice_number="F-1",
+        status="sent", total_amount=Decimal("121.00"),
+    ))
+    db_session.flush()
+    assert _balance(customer.id) == Decimal("121.00")
+    db_session.rollback()
+
+    assert _balance(customer.id) == Decimal("0.00")
+
+
+def test_credit_limit_blocks_new_invoices_and_work_orders(client, db_session, auth_headers):
+    """
+    GIVEN a customer with a credit limit of 200
+    WHEN invoices and work orders are created
+    THEN an invoice taking the open balance over the limit is refused, also as a draft,
+    and so are work orders once the balance is over the limit
+    """
+    headers = auth_headers('admin')
+    customer = _customer(db_session, credit_limit=Decimal("200.00"))
+
+    assert _create_invoice(client, headers, customer, "100.00").status_code == 201
+    response = _create_invoice(client, headers, customer, "100.00", status="draft")
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Customer credit limit exceeded"
+    assert Invoice.query.count() == 1
+
+    work_order = {"customer_id": str(customer.id), "title": "Onderhoud"}
+    assert client.post('/api/work-orders/', headers=headers, json=work_order).status_code == 201
+
+    customer.credit_limit = Decimal("100.00")
+    db_session.commit()
+    response = client.post('/api/work-orders/', headers=headers, json=work_order)
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Customer credit limit exceeded"
+
+
+def test_reconcile_balances_command_reports_and_fixes_drift(app, db_session, auth_headers):
+    """
+    GIVEN a balance changed behind the ledger's back
+    WHEN the balances are reconciled
+    THEN the drift is reported, and corrected with --fix
+    """
+    auth_headers('admin')
+    customer = _customer(db_session)
+    untouched = _customer(db_session)
+    db_session.add(Invoice(
+        company_id=customer.company_id, customer_id=customer.id, invoice_number="F-1",
+        status="overdue", total_amount=Decimal("121.00"), paid_amount=Decimal("21.00"),
+    ))
+    db_session.commit()
+    db_session.execute(Customer.__table__.update().values(open_balance=Decimal("40.00")).where(
+        Customer.__table__.c.id == customer.id
+    ))
+    db_session.commit()
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(args=["reconcile_balances"])
+
+    assert result.exit_code == 0, result.output
+    assert "stored 40.00, invoices 100.00, drift -60.00" in result.output
+    assert str(untouched.id) not in result.output
+    assert _balance(customer.id) == Decimal("40.00")
+
+    result = runner.invoke(args=["reconcile_balances", "--fix"])
+
+    assert "1 customers drifting, corrected" in result.output
+    assert _balance(customer.id) == Decimal("100.00")
+    assert reconcile() == []
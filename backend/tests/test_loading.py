@@ -0,0 +1,87 @@
+import re
+
+import pytest
+from sqlalchemy import event
+
+from src.models.database import Customer, Location, User, db
+
+
+@pytest.fixture
+def statements(app, db_session):
+    """SQL statements executed while the test runs."""
+    recorded = []
+
+    def _record(conn, cursor, statement, *args):
+        recorded.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', _record)
+    yield recorded
+    event.remove(db.engine, 'before_cursor_execute', _record)
+
+
+def _tables(statement):
+    return set(re.findall(r'(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)', statement))
+
+
+def _selects(statements):
+    return [statement for statement in statements if statement.lstrip().startswith('SELECT')]
+
+
+def test_login_reads_only_the_user_and_company(client, db_session, auth_headers, statements):
+    """
+    GIVEN a company with several users
+    WHEN one of them logs in
+    THEN the user and company are read in a single query without the other users
+    """
+    for role in ('admin', 'manager', 'technician'):
+        auth_headers(role)
+    statements.clear()
+
+    response = client.post('/api/auth/login', json={"email": "admin@test.com", "password": "password123"})
+
+    assert response.status_code == 200
+    assert response.get_json()['user']['company_name'] == "Test Bedrijf B.V."
+    assert len(_selects(statements)) == 1
+    assert all(_tables(statement) <= {'users', 'companies'} for statement in statements)
+    assert 'users_1' not in statements[0]
+
+
+def test_me_reads_only_the_user_and_company(client, db_session, auth_headers, statements):
+    headers = auth_headers('admin')
+    auth_headers('technician')
+    client.get('/api/auth/me', headers=headers)
+    statements.clear()
+
+    response = client.get('/api/auth/me', headers=headers)
+
+    assert response.status_code == 200
+    assert len(_selects(statements)) == 1
+    assert _tables(statements[0]) == {'users', 'companies'}
+
+
+def test_work_order_detail_loads_lines_without_n_plus_one(client, db_session, auth_headers, statements):
+    headers = auth_headers('admin')
+    customer = Customer(company_name="Klant B.V.", company_id=User.query.first().company_id)
+    db_session.add(customer)
+    db_session.flush()
+    location = Location(customer_id=customer.id, name="Hoofdlocatie", address="Dorpsstraat 1")
+    db_session.add(location)
+    db_session.commit()
+    response = client.post('/api/work-orders/', headers=headers, json={
+        "customer_id": str(customer.id),
+        "location_id": str(location.id),
+        "title": "Onderhoud",
+        "lines": [{"description": f"Onderdeel {i}", "quantity": 1, "unit_price": "10.00", "vat_rate": 21} for i in range(8)],
+    })
+    work_order_id = response.get_json()['work_order_id']
+    statements.clear()
+
+    response = client.get(f'/api/work-orders/{work_order_id}', headers=headers)
+
+    assert response.status_code == 200
+    assert response.get_json()['work_order']['location_name'] == "Hoofdlocatie"
+    assert len(response.get_json()['work_order']['lines']) == 8
+    assert len(_selects(statements)) <= 4
+
+    response = client.get('/api/work-orders/', headers=headers)
+    assert response.get_json()['work_orders'][0]['location_name'] == "Hoofdlocatie"
@@ -0,0 +1,41 @@
+from prometheus_client import REGISTRY
+
+LABELS = {"endpoint": "customers.get_customers", "method": "GET", "status": "200"}
+
+
+def _requests():
+    return REGISTRY.get_sample_value("http_request_duration_seconds_count", LABELS) or 0
+
+
+def test_metrics_exposes_request_and_query_histograms(client, db_session, auth_headers):
+    """
+    GIVEN an authenticated API request that queries the database
+    WHEN /metrics is scraped
+    THEN the request duration and per-request query histograms include it
+    """
+    headers = auth_headers('admin')
+    requests_before = _requests()
+    queries_before = REGISTRY.get_sample_value(
+        "http_request_db_queries_sum", {"endpoint": "customers.get_customers"}
+    ) or 0
+
+    assert client.get('/api/customers/', headers=headers).status_code == 200
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    body = response.get_data(as_text=True)
+    assert 'http_request_duration_seconds_bucket{endpoint="customers.get_customers"' in body
+    assert "db_pool_checked_out_connections" in body
+    assert 'endpoint="metrics"' not in body
+    assert _requests() == requests_before + 1
+    assert REGISTRY.get_sample_value(
+        "http_request_db_queries_sum", {"endpoint": "customers.get_customers"}
+    ) > queries_before
+
+
+def test_metrics_token(app, client, monkeypatch):
+    monkeypatch.setenv("METRICS_TOKEN", "s3cret")
+
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={"Authorization": "Bearer s3cret"}).status_code == 200
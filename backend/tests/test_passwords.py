@@ -0,0 +1,71 @@
+import pytest
+from werkzeug.security import generate_password_hash
+
+from src.models.database import User
+from src.services import passwords
+
+
+def _login(client, password='password123'):
+    return client.post('/api/auth/login', json={"email": "admin@test.com", "password": password})
+
+
+def test_legacy_hashes_are_upgraded_on_login(app, client, db_session, auth_headers):
+    """
+    GIVEN a user whose password still has a werkzeug pbkdf2 hash
+    WHEN they log in
+    THEN the login succeeds and the hash is replaced with one of the configured scheme
+    """
+    auth_headers('admin')
+    user = User.query.filter_by(email='admin@test.com').first()
+    user.password_hash = generate_password_hash('password123', method='pbkdf2:sha256:1000')
+    db_session.commit()
+
+    assert _login(client, 'wrong-password').status_code == 401
+    assert user.password_hash.startswith('pbkdf2:')
+
+    assert _login(client).status_code == 200
+
+    db_session.refresh(user)
+    assert passwords.scheme_of(user.password_hash) == passwords._settings['PASSWORD_HASHER']
+    assert not passwords.needs_rehash(user.password_hash)
+    assert user.check_password('password123')
+
+
+def test_changed_cost_parameters_trigger_a_rehash(app):
+    password_hash = passwords.hash_password('geheim')
+
+    assert not passwords.needs_rehash(password_hash)
+
+    app.config.update(BCRYPT_ROUNDS=5, ARGON2_TIME_COST=2)
+    passwords.init_app(app)
+
+    assert passwords.needs_rehash(password_hash)
+    assert passwords.verify_password(password_hash, 'geheim')
+
+
+def test_hashing_runs_in_the_process_pool(app):
+    app.config['PASSWORD_HASH_WORKERS'] = 1
+    passwords.init_app(app)
+    try:
+        password_hash = passwords.hash_password('geheim')
+
+        assert passwords._pool is not None
+        # Never forked from the (threaded) worker process
+        assert passwords._pool._mp_context.get_start_method() in ("forkserver", "spawn")
+        assert passwords.verify_password(password_hash, 'geheim')
+        assert not passwords.verify_password(password_hash, 'fout')
+    finally:
+        app.config['PASSWORD_HASH_WORKERS'] = 0
+        passwords.init_app(app)
+
+
+def test_argon2id_hashes(app):
+    pytest.importorskip('argon2')
+    app.config['PASSWORD_HASHER'] = 'argon2id'
+    passwords.init_app(app)
+
+    password_hash = passwords.hash_password('geheim')
+
+    assert password_hash.startswith('$argon2id$')
+    assert passwords.verify_password(password_hash, 'geheim')
+    assert not passwords.verify_password(password_hash, 'fout')
@@ -0,0 +1,157 @@
+import json
+from datetime import datetime
+
+import pytest
+from prometheus_client import REGISTRY
+
+from src.models.database import JobRun
+from src.services.scheduler import Cron, Job, Scheduler, _jobs
+
+
+@pytest.mark.parametrize("expression, after, expected", [
+    ("30 3 * * *", datetime(2024, 5, 1, 3, 30), datetime(2024, 5, 2, 3, 30)),
+    ("*/15 * * * 1-5", datetime(2024, 5, 3, 23, 50), datetime(2024, 5, 6, 0, 0)),
+    ("0 0 29 2 *", datetime(2024, 3, 1), datetime(2028, 2, 29)),
+    # Day of month or weekday when both are restricted, 7 is Sunday
+    ("0 12 1 * 7", datetime(2024, 5, 1, 13, 0), datetime(2024, 5, 5, 12, 0)),
+])
+def test_cron_next_after(expression, after, expected):
+    assert Cron(expression).next_after(after) == expected
+
+
+def test_cron_rejects_invalid_expressions():
+    with pytest.raises(ValueError):
+        Cron("61 * * * *")
+    with pytest.raises(ValueError):
+        Cron("* * *")
+
+
+def test_due_job_runs_once_and_is_recorded(app, db_session):
+    """
+    GIVEN an hourly job that never ran
+    WHEN two workers check it one after the other
+    THEN the first runs it and records the run, the second finds it done
+    """
+    calls = []
+    job = Job("test_hourly", lambda: calls.append(1) or {"rows": 3}, every=3600)
+    worker_a, worker_b = Scheduler(app), Scheduler(app)
+
+    run = worker_a.run_pending(job)
+
+    assert worker_b.run_pending(job) is None
+    assert calls == [1]
+    assert run.status == "success"
+    assert run.result == {"rows": 3}
+    assert run.finished_at >= run.started_at
+    assert JobRun.query.filter_by(job_name="test_hourly").count() == 1
+
+
+def test_job_is_skipped_while_another_worker_holds_its_lock(app, db_session):
+    worker_a, worker_b = Scheduler(app), Scheduler(app)
+    seen = []
+    job = Job("test_locked", lambda: seen.append(worker_b.run_pending(job, force=True)), every=60)
+
+    worker_a.run_pending(job)
+
+    assert seen == [None]
+    assert JobRun.query.filter_by(job_name="test_locked").count() == 1
+
+
+def test_failed_run_is_recorded_with_its_error(app, db_session):
+    def broken():
+        raise RuntimeError("Drive is down")
+
+    failed_before = REGISTRY.get_sample_value(
+        "scheduler_job_duration_seconds_count", {"job": "test_broken", "status": "failed"}
+    ) or 0
+
+    run = Scheduler(app).run_pending(Job("test_broken", broken, cron="0 * * * *"), force=True)
+
+    assert run.status == "failed"
+    assert run.error == "Drive is down"
+    assert REGISTRY.get_sample_value(
+        "scheduler_job_duration_seconds_count", {"job": "test_broken", "status": "failed"}
+    ) == failed_before + 1
+
+
+def test_run_job_command(app, db_session):
+    result = app.test_cli_runner().invoke(args=["run_job", "refresh_statistics"])
+
+    assert result.exit_code == 0, result.output
+    assert "refresh_statistics: success" in result.output
+    assert JobRun.query.filter_by(job_name="refresh_statistics").one().result == {"dialect": "sqlite"}
+
+
+class _FakeDrive:
+    """Stands in for the Drive v3 service, with two pages of documents."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.queries = []
+        self.deleted = []
+        self._call = None
+
+    def files(self):
+        return self
+
+    def list(self, q, fields, pageSize, pageToken=None):
+        self.queries.append(q)
+        self._call = lambda: self.pages[int(pageToken or 0)]
+        return self
+
+    def delete(self, fileId):
+        self._call = lambda: self.deleted.append(fileId)
+        return self
+
+    def execute(self):
+        return self._call()
+
+
+def test_cleanup_drive_copies_deletes_only_document_copies(app, db_session, monkeypatch):
+    """
+    GIVEN old Drive documents: generated copies on two pages, and a template
+    WHEN the cleanup job runs
+    THEN the copies are deleted and the template is left alone
+    """
+    from src.routes import documents
+
+    drive = _FakeDrive([
+        {"files": [
+            {"id": "copy-1", "name": "invoice_0190b0c2-1a2b-7c3d-8e4f-123456789abc_20240501_120000"},
+            {"id": "template", "name": "Factuur sjabloon"},
+        ], "nextPageToken": "1"},
+        {"files": [
+            {"id": "copy-2", "name": "quote_0190b0c2-1a2b-7c3d-8e4f-123456789abc_20240502_083000"},
+        ]},
+    ])
+    monkeypatch.setattr(documents, "get_google_drive_service", lambda: drive)
+
+    run = Scheduler(app).run_pending(_jobs["cleanup_drive_copies"], force=True)
+
+    assert run.status == "success", run.error
+    assert run.result == {"deleted": 2}
+    assert drive.deleted == ["copy-1", "copy-2"]
+    assert "createdTime < '" in drive.queries[0]
+
+
+def test_drive_service_is_built_from_service_account_credentials(monkeypatch):
+    pytest.importorskip("googleapiclient")
+    serialization = pytest.importorskip("cryptography.hazmat.primitives.serialization")
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    from src.routes import documents
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    monkeypatch.setenv("GOOGLE_API_CREDENTIALS", json.dumps({
+        "type": "service_account",
+        "client_email": "crm@example.iam.gserviceaccount.com",
+        "private_key": key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ).decode(),
+        "token_uri": "https://oauth2.googleapis.com/token",
+    }))
+
+    service = documents.get_google_drive_service()
+
+    assert service is not None
+    assert service._http.credentials.scopes == documents.GOOGLE_SCOPES
@@ -0,0 +1,93 @@
+from decimal import Decimal
+
+from src.models.database import Article, ArticleCategory, Customer, Location, User
+from src.schemas import article_list_schema, customer_list_schema
+from src.services.json_provider import dumps, loads
+
+
+def _json(value):
+    return loads(dumps(value))
+
+
+def test_list_schemas_match_to_dict(db_session, auth_headers):
+    """
+    GIVEN customers with locations and articles with a category
+    WHEN they are dumped with the slim list schemas
+    THEN the documents equal the to_dict() output, without nested relationships
+    """
+    auth_headers('admin')
+    company_id = User.query.first().company_id
+    customer = Customer(company_id=company_id, company_name="Klant B.V.", credit_limit=Decimal("1200.00"))
+    category = ArticleCategory(company_id=company_id, name="Leidingwerk")
+    db_session.add_all([customer, category])
+    db_session.flush()
+    db_session.add(Location(customer_id=customer.id, name="Hoofdlocatie", address="Dorpsstraat 1"))
+    db_session.add(Article(
+        company_id=company_id, category_id=category.id, code="B-15", name="Bocht 15mm",
+        selling_price=Decimal("2.95"), stock_quantity=Decimal("4"), min_stock_level=Decimal("10"),
+    ))
+    db_session.commit()
+
+    customers = Customer.query.all()
+    articles = Article.query.all()
+
+    assert _json(customer_list_schema.dump(customers)) == _json([c.to_dict() for c in customers])
+    assert _json(article_list_schema.dump(articles)) == _json([a.to_dict() for a in articles])
+    assert "locations" not in customer_list_schema.dump(customers)[0]
+
+
+def test_create_customer_validates_with_the_schema(client, db_session, auth_headers):
+    headers = auth_headers('admin')
+
+    response = client.post('/api/customers/', headers=headers, json={"company_name": "Klant B.V.", "email": "geen-email"})
+
+    assert response.status_code == 400
+    assert list(response.get_json()['errors']) == ['email']
+
+
+def test_customer_list_loads_location_counts_in_one_query(app, client, db_session, auth_headers):
+    headers = auth_headers('admin')
+    company_id = User.query.first().company_id
+    for i in range(6):
+        customer = Customer(company_id=company_id, company_name=f"Klant {i}")
+        db_session.add(customer)
+        db_session.flush()
+        db_session.add(Location(customer_id=customer.id, name="Hoofdlocatie", address="Dorpsstraat 1"))
+    db_session.commit()
+
+    app.config['SQL_PROFILER'] = True
+    profile = client.get('/api/customers/?_sqlprofile=json', headers=headers).get_json()
+    app.config['SQL_PROFILER'] = False
+
+    assert profile['n_plus_one'] == []
+    body = client.get('/api/customers/', headers=headers).get_json()
+    assert [customer['location_count'] for customer in body['customers']] == [1] * 6
+
+
+def test_create_ignores_the_id_of_an_existing_row(client, db_session, auth_headers):
+    """
+    GIVEN an existing customer and article
+    WHEN customers and articles are created with their ids in the body
+    THEN new rows are inserted and the existing ones are left unchanged
+    """
+    headers = auth_headers('admin')
+    company_id = User.query.first().company_id
+    customer = Customer(company_id=company_id, company_name="Klant B.V.", email="klant@example.nl")
+    article = Article(company_id=company_id, code="B-15", name="Bocht 15mm", selling_price=Decimal("2.95"))
+    db_session.add_all([customer, article])
+    db_session.commit()
+
+    response = client.post('/api/customers/', headers=headers, json={
+        "id": str(customer.id), "company_name": "Hijack BV", "email": "hijack@example.nl",
+    })
+    assert response.status_code == 201, response.get_json()
+    response = client.post('/api/articles/', headers=headers, json={
+        "id": str(article.id), "code": "B-22", "name": "Bocht 22mm", "selling_price": "3.50",
+    })
+    assert response.status_code == 201, response.get_json()
+
+    db_session.expire_all()
+    assert sorted(c.company_name for c in Customer.query.all()) == ["Hijack BV", "Klant B.V."]
+    assert Customer.query.get(customer.id).company_name == "Klant B.V."
+    assert sorted(a.code for a in Article.query.all()) == ["B-15", "B-22"]
+    assert Article.query.get(article.id).name == "Bocht 15mm"
@@ -0,0 +1,92 @@
+import pytest
+
+from src.models.database import ArticleCategory, Customer, User
+from src.services.sql_profiler import RequestProfile, fingerprint
+
+
+def test_fingerprint_collapses_literals_and_in_lists():
+    first = fingerprint("SELECT * FROM customers WHERE id = ? AND name = 'Jansen'")
+    second = fingerprint("SELECT *\n  FROM customers WHERE id = %(id_1)s AND name = 'De Vries'")
+    in_list = fingerprint("SELECT * FROM articles WHERE id IN (?, ?, ?) LIMIT 10")
+
+    assert first == second == "SELECT * FROM customers WHERE id = ? AND name = ?"
+    assert in_list == "SELECT * FROM articles WHERE id IN (?) LIMIT ?"
+
+
+def test_repeated_statements_are_flagged():
+    profile = RequestProfile("GET", "/api/articles/categories")
+    profile.add("SELECT 1 FROM article_categories", 0.001)
+    for category_id in range(6):
+        profile.add(f"SELECT count(*) FROM articles WHERE category_id = {category_id}", 0.001)
+
+    (repeated,) = profile.repeated(threshold=5)
+
+    assert repeated["count"] == 6
+    assert repeated["fingerprint"] == "SELECT count(*) FROM articles WHERE category_id = ?"
+
+
+def test_profiled_request_reports_server_timing_and_summary(app, client, db_session, auth_headers):
+    """
+    GIVEN the SQL profiler is enabled
+    WHEN a request is made with ?_sqlprofile=json
+    THEN the response carries a Server-Timing header and the query summary
+    """
+    app.config['SQL_PROFILER'] = True
+    headers = auth_headers('admin')
+    company_id = User.query.first().company_id
+    db_session.add_all([ArticleCategory(company_id=company_id, name=f"Groep {i}") for i in range(6)])
+    db_session.commit()
+
+    response = client.get('/api/articles/categories?_sqlprofile=json', headers=headers)
+
+    assert response.status_code == 200
+    assert response.headers['Server-Timing'].startswith('db;dur=')
+    summary = response.get_json()
+    assert summary['endpoint'] == 'articles.get_categories'
+    assert summary['query_count'] == sum(entry['count'] for entry in summary['statements'])
+
+    response = client.get('/api/articles/categories?_sqlprofile=html', headers=headers)
+    assert response.mimetype == 'text/html'
+
+
+@pytest.mark.query_budget("invoices.get_billing_queue", 3)
+def test_billing_queue_query_budget(client, db_session, auth_headers):
+    headers = auth_headers('admin')
+    company_id = User.query.first().company_id
+    db_session.add_all([Customer(company_name=f"Klant {i}", company_id=company_id) for i in range(20)])
+    db_session.commit()
+
+    response = client.get('/api/invoices/billing-queue', headers=headers)
+
+    assert response.status_code == 200
+
+
+def test_query_budget_fails_when_exceeded(pytester):
+    pytester.makepyfile(
+        """
+        import pytest
+        from collections import deque
+        from types import SimpleNamespace
+
+        from src.services.sql_profiler import RequestProfile
+
+        @pytest.fixture
+        def app():
+            return SimpleNamespace(
+                config={"SQL_PROFILER_N_PLUS_ONE_THRESHOLD": 5},
+                extensions={"sql_profiler": deque()},
+            )
+
+        @pytest.mark.query_budget("customers.get_customers", 2)
+        def test_over_budget(app):
+            profile = RequestProfile("GET", "/api/customers/", "customers.get_customers")
+            for _ in range(3):
+                profile.add("SELECT 1", 0.0)
+            app.extensions["sql_profiler"].append(profile)
+        """
+    )
+
+    result = pytester.runpytest("-p", "tests.query_budget")
+
+    result.assert_outcomes(failed=1)
+    result.stdout.fnmatch_lines(["*ran 3 queries, budget is 2*"])
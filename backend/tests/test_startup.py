@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Generous enough for a loaded CI machine; pandas and the Google client alone
+# used to add about 250 ms. Override with STARTUP_BUDGET_MS.
+STARTUP_BUDGET_MS = int(os.getenv("STARTUP_BUDGET_MS", "1500"))
+
+CREATE_APP = """
+import sys, time
+start = time.perf_counter()
+from src.main import create_app
+create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": "sqlite://",
+            "SECRET_KEY": "x" * 32, "JWT_SECRET_KEY": "x" * 32})
+print("create_app_ms", (time.perf_counter() - start) * 1000)
+print("loaded", " ".join(sorted(name for name in sys.modules if name.split(".")[0] in ("pandas", "googleapiclient"))))
+"""
+
+
+@pytest.fixture(scope="module")
+def startup():
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CREATE_APP],
+        cwd=BACKEND, capture_output=True, text=True, check=True,
+    )
+    imports = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            # Nested imports are indented below the module importing them
+            if cumulative.strip().isdigit() and not name.startswith("  "):
+                imports[name.strip()] = int(cumulative) / 1000
+    output = dict(line.split(" ", 1) if " " in line else (line, "") for line in result.stdout.splitlines())
+    return imports, output
+
+
+def test_create_app_fits_the_startup_budget(startup):
+    """
+    GIVEN a fresh interpreter
+    WHEN it imports src.main and calls create_app()
+    THEN both together stay within the startup budget
+    """
+    imports, output = startup
+
+    assert imports["src.main"] < STARTUP_BUDGET_MS
+    assert float(output["create_app_ms"]) < STARTUP_BUDGET_MS
+
+
+def test_heavy_libraries_load_on_first_use_only(startup):
+    _, output = startup
+
+    assert output["loaded"] == ""
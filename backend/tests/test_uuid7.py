@@ -0,0 +1,53 @@
+import uuid
+
+from src.models import database
+from src.models.database import Company, uuid7
+
+
+def test_uuid7_layout():
+    value = uuid7()
+
+    assert value.version == 7
+    assert value.variant == uuid.RFC_4122
+    # The first 48 bits are the creation time in milliseconds
+    assert abs((value.int >> 80) - database.time.time_ns() // 1_000_000) < 1000
+
+
+def test_uuid7_increases_within_a_millisecond_and_when_the_clock_steps_back(monkeypatch):
+    """
+    GIVEN a clock that stands still and then jumps back
+    WHEN ids are generated
+    THEN every id is larger than the one before, as a UUID and as a string
+    """
+    now = [1_700_000_000_000_000_000]
+    monkeypatch.setattr(database.time, 'time_ns', lambda: now[0])
+
+    ids = [uuid7() for _ in range(1000)]
+    now[0] -= 5_000_000_000
+    ids += [uuid7() for _ in range(1000)]
+
+    assert ids == sorted(ids)
+    assert [str(value) for value in ids] == sorted(str(value) for value in ids)
+    assert len(set(ids)) == len(ids)
+
+
+def test_uuid7_counter_overflow_moves_to_the_next_millisecond(monkeypatch):
+    monkeypatch.setattr(database.time, 'time_ns', lambda: 1_700_000_000_000_000_000)
+    first = uuid7()
+    monkeypatch.setattr(database, '_uuid7_counter', 0x3FF_FFFF_FFFF)
+
+    second = uuid7()
+
+    assert second > first
+    assert (second.int >> 80) == (first.int >> 80) + 1
+
+
+def test_new_rows_get_uuid7_and_existing_uuid4_ids_still_load(db_session):
+    legacy = Company(id=uuid.uuid4(), name="Oud B.V.")
+    company = Company(name="Nieuw B.V.")
+    db_session.add_all([legacy, company])
+    db_session.commit()
+    db_session.expire_all()
+
+    assert company.id.version == 7
+    assert db_session.get(Company, legacy.id).name == "Oud B.V."
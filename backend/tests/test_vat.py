@@ -0,0 +1,99 @@
+import random
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+import pytest
+
+from src.services.vat import compute_totals, compute_totals_cents, split_amount
+
+CENT = Decimal("0.01")
+
+
+def _reference(quantities, unit_prices, vat_rates, prices_include_vat):
+    """Per-line Decimal reference with explicit half-up rounding to the cent."""
+    subtotal = vat_amount = Decimal("0")
+    for quantity, unit_price, vat_rate in zip(quantities, unit_prices, vat_rates):
+        line = (quantity.quantize(CENT, ROUND_HALF_UP) * unit_price.quantize(CENT, ROUND_HALF_UP)).quantize(CENT, ROUND_HALF_UP)
+        if prices_include_vat:
+            net = (line / (1 + vat_rate / 100)).quantize(CENT, ROUND_HALF_UP)
+            vat = line - net
+        else:
+            net = line
+            vat = (line * vat_rate / 100).quantize(CENT, ROUND_HALF_UP)
+        subtotal += net
+        vat_amount += vat
+    return subtotal, vat_amount
+
+
+@pytest.mark.parametrize("amount, vat_rate, prices_include_vat, expected", [
+    ("10.00", 21, True, ("8.26", "1.74")),
+    ("121.00", 21, True, ("100.00", "21.00")),
+    ("0.05", 9, True, ("0.05", "0.00")),
+    ("0.06", 9, True, ("0.06", "0.00")),
+    ("0.13", 9, False, ("0.13", "0.01")),
+    ("0.02", 21, False, ("0.02", "0.00")),
+    ("0.10", 25, False, ("0.10", "0.03")),
+    ("-10.00", 21, True, ("-8.26", "-1.74")),
+    ("-0.10", 25, False, ("-0.10", "-0.03")),
+    ("99.99", 0, True, ("99.99", "0.00")),
+])
+def test_split_amount_rounds_half_up_to_the_cent(amount, vat_rate, prices_include_vat, expected):
+    net, vat = split_amount(amount, vat_rate, prices_include_vat)
+    assert (str(net), str(vat)) == expected
+
+
+def test_line_totals_round_half_up():
+    totals = compute_totals_cents([150, 100, 33], [333, 1, 5], [2100, 2100, 900])
+
+    # 1.50 x 3.33 = 4.995 and 0.33 x 0.05 = 0.0165
+    assert totals["line_totals"].tolist() == [500, 1, 2]
+
+
+def test_vat_breakdown_per_rate():
+    totals = compute_totals(
+        ["2", "1", "3", "1"],
+        ["50.00", "19.99", "0.10", "100"],
+        ["21", "9", "21", "0"],
+    )
+
+    assert totals["vat_breakdown"] == [
+        {"vat_rate": Decimal("0"), "subtotal": Decimal("100.00"), "vat_amount": Decimal("0.00")},
+        {"vat_rate": Decimal("9"), "subtotal": Decimal("19.99"), "vat_amount": Decimal("1.80")},
+        {"vat_rate": Decimal("21"), "subtotal": Decimal("100.30"), "vat_amount": Decimal("21.06")},
+    ]
+    assert totals["subtotal"] == Decimal("220.29")
+    assert totals["vat_amount"] == Decimal("22.86")
+    assert totals["total_amount"] == Decimal("243.15")
+
+
+def test_empty_document():
+    totals = compute_totals([], [], [])
+
+    assert totals["total_amount"] == Decimal("0")
+    assert totals["vat_breakdown"] == []
+
+
+def test_large_amounts_do_not_overflow():
+    totals = compute_totals(["99999999.99"], ["99999999.99"], ["21"])
+
+    assert totals["subtotal"] == Decimal("9999999998000000.00")
+    assert totals["vat_amount"] == Decimal("2099999999580000.00")
+
+
+def test_mismatched_lengths_are_rejected():
+    with pytest.raises(ValueError):
+        compute_totals_cents(np.array([100]), np.array([100, 200]), np.array([2100]))
+
+
+@pytest.mark.parametrize("prices_include_vat", [True, False])
+def test_matches_decimal_reference(prices_include_vat):
+    rng = random.Random(7)
+    quantities = [Decimal(rng.randint(-400, 4000)) / 1000 for _ in range(2000)]
+    unit_prices = [Decimal(rng.randint(0, 10_000_000)) / 1000 for _ in range(2000)]
+    vat_rates = [Decimal(rng.choice(["0", "9", "21", "5.5"])) for _ in range(2000)]
+
+    totals = compute_totals(quantities, unit_prices, vat_rates, prices_include_vat)
+
+    assert (totals["subtotal"], totals["vat_amount"]) == _reference(
+        quantities, unit_prices, vat_rates, prices_include_vat
+    )
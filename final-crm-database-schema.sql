@@ -60,6 +60,7 @@ CREATE TABLE customers (
     vat_number VARCHAR(50),
     payment_terms INTEGER DEFAULT 30, -- days
     credit_limit DECIMAL(10,2),
+    open_balance DECIMAL(12,2) NOT NULL DEFAULT 0, -- open amount of sent and overdue invoices
     notes TEXT,
     is_active BOOLEAN DEFAULT true,
     created_by UUID REFERENCES users(id) ON DELETE SET NULL,
@@ -91,7 +92,8 @@ CREATE TABLE article_categories (
     company_id UUID NOT NULL REFERENCES companies(id) ON DELETE CASCADE,
     name VARCHAR(255) NOT NULL,
     description TEXT,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 -- Articles table (artikelen)
@@ -331,3 +333,40 @@ CREATE INDEX idx_audit_log_user_id ON audit_log(user_id);
 CREATE INDEX idx_audit_log_entity_type ON audit_log(entity_type);
 CREATE INDEX idx_audit_log_entity_id ON audit_log(entity_id);
 CREATE INDEX idx_audit_log_created_at ON audit_log(created_at);
+
+-- Billing queue: billable hours that still have to be invoiced
+CREATE INDEX idx_time_registrations_unbilled ON time_registrations(company_id, work_order_id)
+    WHERE is_billable = true AND is_invoiced = false;
+
+CREATE VIEW billing_queue AS
+SELECT tr.company_id,
+       wo.customer_id,
+       c.company_name AS customer_name,
+       COUNT(tr.id) AS time_entry_count,
+       COUNT(DISTINCT tr.work_order_id) AS work_order_count,
+       COALESCE(SUM(tr.hours), 0) AS hours,
+       COALESCE(SUM(tr.billable_amount), 0) AS amount,
+       MIN(tr.date) AS oldest_date,
+       MAX(tr.date) AS newest_date
+FROM time_registrations tr
+JOIN work_orders wo ON wo.id = tr.work_order_id
+JOIN customers c ON c.id = wo.customer_id
+WHERE tr.is_billable = true AND tr.is_invoiced = false
+GROUP BY tr.company_id, wo.customer_id, c.company_name;
+
+-- Run history of the background scheduler
+CREATE TABLE job_runs (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    job_name VARCHAR(100) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'running',
+    instance VARCHAR(100),
+    started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP,
+    duration_ms INTEGER,
+    result JSONB,
+    error TEXT
+);
+CREATE INDEX ix_job_runs_job_name_started_at ON job_runs(job_name, started_at);
+
+-- Overdue detection: only invoices still waiting for payment
+CREATE INDEX idx_invoices_sent_due_date ON invoices(company_id, due_date) WHERE status = 'sent';